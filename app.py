@@ -1,17 +1,23 @@
 import logging
 import sys
 import threading
-from typing import Tuple, Union
+from typing import Optional, Tuple, Union
 
 from bson import ObjectId
 from flask import Flask, Response, jsonify, render_template, request
 
+from models.data_models import ReportFilters, ReviewFilters
+from models.enums import JobType
 from models.response_models import (FileError, FileResponse, JobResponse,
                                     ReviewError, ReviewResponse)
 from refresher.refresh import Refresher
+from scanner.auto_scan import AutoScanQueue
+from scanner.batch_review import BatchReviewer
 from scanner.scan import Scanner
+from scanner.scheduler import ScanScheduler
 from utils.config_verifier import ConfigVerifier
 from utils.mongo_utils import MongoUtils
+from utils.schema import SchemaManager
 
 # --- Initialize app and logger ---
 app = Flask(__name__)
@@ -26,11 +32,35 @@ if not config:
     sys.exit(1)
 
 mongo_utils: MongoUtils = MongoUtils(config)
+# migrations are run by the entrypoint before gunicorn starts the workers
+if not SchemaManager(mongo_utils).check():
+    sys.exit(1)
 deployment = config["deployment"]
-github_token = config.get("tokens", {}).get("github_token", None)
 
 scanner: Scanner = Scanner(config, mongo_utils)
-refresher: Refresher = Refresher(github_token, mongo_utils)
+auto_scan: AutoScanQueue = AutoScanQueue(config, mongo_utils)
+refresher: Refresher = Refresher(config, mongo_utils, auto_scan)
+scheduler: ScanScheduler = ScanScheduler(config, scanner, mongo_utils)
+batch_reviewer: BatchReviewer = BatchReviewer(config, scanner, mongo_utils)
+scheduler.start()
+
+
+def parse_report_filters(args) -> ReportFilters:
+    """
+    Build report filters from query parameters. Raises ValueError on
+    malformed numbers.
+    """
+    has_repo: Optional[str] = args.get("has_repo")
+
+    return ReportFilters(
+        query=args.get("q") or None,
+        ecosystem=args.get("ecosystem") or None,
+        severity=args.get("severity") or None,
+        cvss_min=float(args["cvss_min"]) if args.get("cvss_min") else None,
+        cvss_max=float(args["cvss_max"]) if args.get("cvss_max") else None,
+        min_stars=int(args["min_stars"]) if args.get("min_stars") else None,
+        has_repo=(has_repo.lower() == "true") if has_repo else None,
+    )
 
 
 # --- Routes ---
@@ -53,9 +83,8 @@ def submit_scan() -> Union[Response, Tuple]:
     job_id: ObjectId = mongo_utils.add_job_to_db(job)
     job._id = job_id
 
-    threading.Thread(
-        target=scanner.run_scan_job, args=(job._id, repo_url), daemon=True
-    ).start()
+    # picked up by the scheduler's worker pool
+    scheduler.notify()
 
     return jsonify(job.to_dict()), 200
 
@@ -70,24 +99,97 @@ def get_sarif(id: str) -> Union[Response, Tuple]:
 
 
 @app.route("/api/sarif/<id>/suppress")
-def suppress_finding(id: str) -> Response:
+def suppress_finding(id: str) -> Union[Response, Tuple]:
     fingerprint: str = request.args.get("fingerprint") or ""
-    sarif_with_suppressions = scanner.mark_sarif_suppressed_by_fingerprint(
-        id, fingerprint, True
+    finding = scanner.mark_sarif_suppressed_by_fingerprint(id, fingerprint, True)
+    if not finding:
+        return jsonify({"error": "finding not found"}), 404
+    return jsonify(finding), 200
+
+
+@app.route("/api/sarif/<id>/suppress", methods=["POST"])
+def suppress_findings(id: str) -> Union[Response, Tuple]:
+    data = request.get_json()
+    if not data or not isinstance(data.get("fingerprints"), list):
+        return jsonify({"error": "fingerprints list missing in request body"}), 400
+
+    findings = scanner.mark_findings_suppressed(
+        id, data["fingerprints"], data.get("suppress", True)
+    )
+    return jsonify({"findings": findings, "count": len(findings)}), 200
+
+
+@app.route("/api/sarif/<id>/findings")
+def get_findings(id: str) -> Union[Response, Tuple]:
+    if not ObjectId.is_valid(id) or not mongo_utils.scan_exists(id):
+        return jsonify({"error": "scan not found"}), 404
+
+    suppressed: Optional[str] = request.args.get("suppressed")
+    try:
+        offset: int = max(int(request.args.get("offset", 0)), 0)
+        limit: int = min(max(int(request.args.get("limit", 100)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    findings = mongo_utils.find_findings(
+        id,
+        rule_id=request.args.get("rule") or None,
+        file=request.args.get("file") or None,
+        suppressed=(suppressed.lower() == "true") if suppressed else None,
+        offset=offset,
+        limit=limit,
+        index_only=request.args.get("index", "").lower() == "true",
     )
-    return jsonify(sarif_with_suppressions)
+    return jsonify(findings), 200
+
+
+@app.route("/api/sarif/<id>/review", methods=["POST"])
+def review_findings(id: str) -> Union[Response, Tuple]:
+    if not batch_reviewer.client:
+        return jsonify({"error": ReviewError.NO_API_KEY.value}), 400
+    if not ObjectId.is_valid(id) or not mongo_utils.scan_exists(id):
+        return jsonify({"error": "scan not found"}), 404
+
+    data = request.get_json(silent=True) or {}
+    filters: ReviewFilters = ReviewFilters(
+        rule_id=data.get("rule") or None,
+        file=data.get("file") or None,
+        include_suppressed=bool(data.get("include_suppressed", False)),
+        include_reviewed=bool(data.get("include_reviewed", False)),
+    )
+
+    job: JobResponse = JobResponse(job_type=JobType.REVIEW)
+    job_id: ObjectId = mongo_utils.add_job_to_db(job)
+    job._id = job_id
+
+    batch_reviewer.submit(job._id, id, filters)
+
+    return jsonify(job.to_dict()), 200
 
 
 @app.route("/api/scans/<path:repo>")
-def get_scans_by_repo(repo) -> Response:
-    results = mongo_utils.get_scans_from_db(repo)
-    return jsonify(results)
+def get_scans_by_repo(repo) -> Union[Response, Tuple]:
+    try:
+        offset: int = max(int(request.args.get("offset", 0)), 0)
+        limit: int = min(max(int(request.args.get("limit", 20)), 1), 100)
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+
+    return jsonify(mongo_utils.get_scans_from_db(repo, offset, limit)), 200
 
 
 @app.route("/api/reports")
-def get_reports():
-    reports = mongo_utils.get_reports_by_pkg()
-    return jsonify(reports)
+def get_reports() -> Union[Response, Tuple]:
+    try:
+        filters: ReportFilters = parse_report_filters(request.args)
+        limit: int = min(int(request.args.get("limit", 50)), 200)
+        reports = mongo_utils.get_reports_by_pkg(
+            filters, request.args.get("cursor"), max(limit, 1)
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(reports), 200
 
 
 @app.route("/api/scans/delete/<id>", methods=["DELETE"])
@@ -106,6 +208,13 @@ def get_scan_status(job_id) -> Union[Response, Tuple]:
     return jsonify(job.to_dict()), 200
 
 
+@app.route("/api/scan_queue")
+def get_scan_queue() -> Response:
+    return jsonify(
+        {"auto_scan": auto_scan.enabled, **mongo_utils.get_scan_queue_stats()}
+    )
+
+
 @app.route("/api/refresh_reports")
 def refresh_reports() -> Union[Response, Tuple]:
     if not refresher.token:
@@ -113,7 +222,7 @@ def refresh_reports() -> Union[Response, Tuple]:
 
     days: int = int(request.args.get("days", 7))
 
-    job: JobResponse = JobResponse()
+    job: JobResponse = JobResponse(job_type=JobType.REFRESH)
     job_id: ObjectId = mongo_utils.add_job_to_db(job)
     job._id = job_id
 
@@ -124,6 +233,37 @@ def refresh_reports() -> Union[Response, Tuple]:
     return jsonify(job.to_dict()), 200
 
 
+@app.route("/api/cache_stats")
+def get_cache_stats() -> Response:
+    return jsonify(mongo_utils.get_cache_stats())
+
+
+@app.route("/api/import_advisories", methods=["POST"])
+def import_advisories() -> Union[Response, Tuple]:
+    source: Optional[str] = config["paths"].get("advisory_db_dir")
+    if not source:
+        return jsonify({"error": "advisory_db_dir not configured"}), 400
+
+    data = request.get_json(silent=True) or {}
+    offline: bool = bool(data.get("offline", not refresher.token))
+
+    job: JobResponse = JobResponse(job_type=JobType.IMPORT)
+    job_id: ObjectId = mongo_utils.add_job_to_db(job)
+    job._id = job_id
+
+    threading.Thread(
+        target=refresher.import_advisories, args=(job._id, source, offline), daemon=True
+    ).start()
+
+    return jsonify(job.to_dict()), 200
+
+
+@app.route("/api/github_metrics")
+def get_github_metrics() -> Response:
+    # per gunicorn worker
+    return jsonify(refresher.gh_apis.client.get_metrics())
+
+
 @app.route("/api/scan/file", methods=["POST"])
 def get_file() -> Union[Response, Tuple]:
     data = request.get_json()
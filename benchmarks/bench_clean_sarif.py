@@ -0,0 +1,138 @@
+"""
+Times Scanner.clean_sarif on synthetic SARIF of increasing size, against
+the per-result any() substring scan it replaced.
+
+    python -m benchmarks.bench_clean_sarif [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import copy
+import random
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from scanner.scan import Scanner
+
+RULES_DIR = "/rules"
+LANGS = ["go", "python", "javascript", "java", "ruby", "php", "c", "rust"]
+CATEGORIES = ["security", "correctness", "best-practice", "performance", "audit"]
+
+
+def make_rule_ids(count: int) -> List[str]:
+    return [
+        f"{random.choice(LANGS)}.lang.{random.choice(CATEGORIES)}.rule-{i}"
+        for i in range(count)
+    ]
+
+
+def make_sarif(results: int, rule_ids: List[str]) -> Dict[str, Any]:
+    prefix: str = RULES_DIR.strip("/").replace("/", ".")
+    return {
+        "version": "2.1.0",
+        "runs": [
+            {
+                "tool": {
+                    "driver": {
+                        "name": "semgrep",
+                        "rules": [{"id": f"{prefix}.{rule}"} for rule in rule_ids],
+                    }
+                },
+                "results": [
+                    {
+                        "ruleId": f"{prefix}.{random.choice(rule_ids)}",
+                        "message": {"text": "finding"},
+                        "locations": [
+                            {
+                                "physicalLocation": {
+                                    "artifactLocation": {
+                                        "uri": f"src/file_{i % 500}.py"
+                                    },
+                                    "region": {
+                                        "startLine": i % 300 + 1,
+                                        "snippet": {"text": f"call(arg_{i})"},
+                                    },
+                                }
+                            }
+                        ],
+                    }
+                    for i in range(results)
+                ],
+            }
+        ],
+    }
+
+
+def legacy_is_suppressed(scanner: Scanner) -> Callable[[str], bool]:
+    """
+    The check clean_sarif made before the suppression matcher.
+    """
+
+    def is_suppressed(rule_id_short: str) -> bool:
+        return (
+            any(path in rule_id_short for path in scanner.suppress_paths)
+            or rule_id_short in scanner.suppress_rules
+        )
+
+    return is_suppressed
+
+
+def time_clean(scanner: Scanner, sarif: Dict[str, Any], repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        doc: Dict[str, Any] = copy.deepcopy(sarif)
+        start: float = time.perf_counter()
+        scanner.clean_sarif(doc)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--rules", type=int, default=2000, help="distinct rule ids")
+    parser.add_argument("--suppress-paths", type=int, default=200)
+    parser.add_argument("--suppress-rules", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(0)
+    rule_ids: List[str] = make_rule_ids(args.rules)
+    # a few of the paths and rules match, most do not
+    suppress_paths: List[str] = ["best-practice", "correctness"] + [
+        f"lang.unused-{i}" for i in range(args.suppress_paths - 2)
+    ]
+    suppress_rules: List[str] = random.sample(
+        rule_ids, min(len(rule_ids), args.suppress_rules // 10)
+    ) + [f"go.lang.audit.unused-{i}" for i in range(args.suppress_rules)]
+
+    with tempfile.TemporaryDirectory() as clone_dir:
+        config: Dict[str, Any] = {
+            "paths": {"semgrep_rules_dir": RULES_DIR, "clone_base_dir": clone_dir},
+            "settings": {
+                "suppress_paths": suppress_paths,
+                "suppress_rules": suppress_rules,
+            },
+            "tokens": {"gemini_api_key": ""},
+        }
+        scanner = Scanner(config, None)  # type: ignore
+        legacy = Scanner(config, None)  # type: ignore
+        legacy.suppression.is_suppressed = legacy_is_suppressed(legacy)  # type: ignore
+
+        print(
+            f"{len(suppress_paths)} suppress paths, {len(suppress_rules)} suppress "
+            f"rules, {len(rule_ids)} distinct rules"
+        )
+        print(f"{'results':>10} {'legacy s':>10} {'matcher s':>10} {'speedup':>8}")
+        for size in args.sizes:
+            sarif: Dict[str, Any] = make_sarif(size, rule_ids)
+            legacy_time: float = time_clean(legacy, sarif, args.repeat)
+            matcher_time: float = time_clean(scanner, sarif, args.repeat)
+            print(
+                f"{size:>10} {legacy_time:>10.3f} {matcher_time:>10.3f} "
+                f"{legacy_time / matcher_time:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
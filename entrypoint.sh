@@ -11,6 +11,10 @@ while ! nc -z mongo 27017; do
   sleep 1
 done
 
-echo "Mongo is up! Starting Gunicorn..."
+echo "Mongo is up! Applying schema migrations..."
+
+python -m utils.schema migrate || exit 1
+
+echo "Starting Gunicorn..."
 
 exec gunicorn --bind 0.0.0.0:$PORT app:app --workers $WORKERS
@@ -1,22 +1,32 @@
-import React, { useEffect, useState } from "react";
+import React, { useEffect, useRef, useState } from "react";
 import GhsaReportGroup from "./components/GhsaReportGroup";
 import Header from "./components/Header";
 import FilterPanel from "./components/FilterPanel";
 import "./styles.css";
 
+const PAGE_SIZE = 50;
+const SEARCH_DEBOUNCE_MS = 300;
+
 export default function IndexPage() {
     const [groups, setGroups] = useState([]);
     const [error, setError] = useState(null);
     const [query, setQuery] = useState("");
     const [showAlert, setShowAlert] = useState(false);
+    const [refreshProgress, setRefreshProgress] = useState(null);
     const [days, setDays] = useState(7);
     const [editingDays, setEditingDays] = useState(false);
     const [repoFilter, setRepoFilter] = useState("all");
     const [ecosystemFilter, setEcosystemFilter] = useState("all");
     const [severityFilter, setSeverityFilter] = useState("all");
+    const [cvssMin, setCvssMin] = useState("");
+    const [minStars, setMinStars] = useState("");
     const [showFilters, setShowFilters] = useState(false);
+    const [nextCursor, setNextCursor] = useState(null);
+    const [totals, setTotals] = useState({ groups: 0, findings: 0 });
+    const [loading, setLoading] = useState(false);
+    const requestId = useRef(0);
 
-    const pollJobStatus = (jobId, interval = 5000) => {
+    const pollJobStatus = (jobId, interval = 5000, onProgress = null) => {
         return new Promise((resolve, reject) => {
             const poll = setInterval(async () => {
                 try {
@@ -28,6 +38,8 @@ export default function IndexPage() {
                         return reject(data.error || "Failed to get job status");
                     }
 
+                    if (onProgress && data.total) onProgress(data);
+
                     if (data.status === "done") {
                         clearInterval(poll);
                         resolve(data);
@@ -46,6 +58,7 @@ export default function IndexPage() {
     const handleRefresh = async (refreshDays = days) => {
         try {
             setShowAlert("pending");
+            setRefreshProgress(null);
 
             const resp = await fetch(`/api/refresh_reports?days=${refreshDays}`);
             const data = await resp.json();
@@ -60,7 +73,9 @@ export default function IndexPage() {
             console.log("Refresh job started:", jobId);
 
             try {
-                await pollJobStatus(jobId);
+                await pollJobStatus(jobId, 2000, (job) =>
+                    setRefreshProgress({ processed: job.processed, total: job.total })
+                );
                 console.log("Refresh complete");
 
                 await loadReports();
@@ -80,44 +95,55 @@ export default function IndexPage() {
     };
 
 
-    const loadReports = async () => {
+    const buildReportParams = (cursor) => {
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (query.trim()) params.set("q", query.trim());
+        if (repoFilter === "withRepo") params.set("has_repo", "true");
+        if (repoFilter === "withoutRepo") params.set("has_repo", "false");
+        if (ecosystemFilter !== "all") params.set("ecosystem", ecosystemFilter);
+        if (severityFilter !== "all") params.set("severity", severityFilter);
+        if (cvssMin !== "") params.set("cvss_min", cvssMin);
+        if (minStars !== "") params.set("min_stars", minStars);
+        if (cursor) params.set("cursor", cursor);
+        return params;
+    };
+
+    // Loads the first page, or appends the page after `cursor`
+    const loadReports = async (cursor = null) => {
+        const id = ++requestId.current;
+        setLoading(true);
         try {
-            const resp = await fetch("/api/reports");
+            const resp = await fetch(`/api/reports?${buildReportParams(cursor)}`);
             const data = await resp.json();
-            setGroups(data);
+
+            // a newer search superseded this one
+            if (id !== requestId.current) return;
+
+            if (!resp.ok) {
+                console.error("Error loading reports:", data.error || data);
+                setError("Failed to load reports.");
+                return;
+            }
+
+            setGroups(prev => cursor ? [...prev, ...data.groups] : data.groups);
+            setNextCursor(data.next_cursor);
+            // totals are only counted for the first page
+            if (!cursor) setTotals({ groups: data.total_groups, findings: data.total_findings });
         } catch (err) {
             console.error("Error loading reports:", err);
             setError("Failed to load reports.");
+        } finally {
+            if (id === requestId.current) setLoading(false);
         }
     };
 
     useEffect(() => {
-        loadReports();
-    }, []);
+        const timer = setTimeout(() => loadReports(), SEARCH_DEBOUNCE_MS);
+        return () => clearTimeout(timer);
+    }, [query, repoFilter, ecosystemFilter, severityFilter, cvssMin, minStars]);
 
     if (error) return <div>{error}</div>;
 
-    const filteredGroups = groups
-        .map(group => {
-            const filteredFindings = group.findings.filter(report => {
-                const haystack = [
-                    report.title, report.cve, report.ghsa, report.cwe?.title,
-                    report.severity, report.package, report.ecosystem,
-                    group.repo, group.pkg
-                ].filter(Boolean).join(" ").toLowerCase();
-
-                if (!haystack.includes(query.toLowerCase())) return false;
-                if (repoFilter === "withRepo" && !group.repo) return false;
-                if (repoFilter === "withoutRepo" && group.repo) return false;
-                if (ecosystemFilter !== "all" && report.ecosystem !== ecosystemFilter) return false;
-                if (severityFilter !== "all" && report.severity?.toLowerCase() !== severityFilter) return false;
-
-                return true;
-            });
-            return { ...group, findings: filteredFindings };
-        })
-        .filter(group => group.findings.length > 0);
-
     return (
         <div className="app-container">
             <Header
@@ -130,7 +156,9 @@ export default function IndexPage() {
 
             {showAlert && (
                 <div className="refresh-alert">
-                    {showAlert === "pending" && "Refreshing..."}
+                    {showAlert === "pending" && (refreshProgress
+                        ? `Refreshing... ${refreshProgress.processed}/${refreshProgress.total}`
+                        : "Refreshing...")}
                     {showAlert === "done" && "Refresh complete!"}
                     {showAlert === "error" && "Refresh failed!"}
                 </div>
@@ -142,12 +170,24 @@ export default function IndexPage() {
                 repoFilter={repoFilter} setRepoFilter={setRepoFilter}
                 ecosystemFilter={ecosystemFilter} setEcosystemFilter={setEcosystemFilter}
                 severityFilter={severityFilter} setSeverityFilter={setSeverityFilter}
+                cvssMin={cvssMin} setCvssMin={setCvssMin}
+                minStars={minStars} setMinStars={setMinStars}
             />
 
             <div id="reports">
-                {filteredGroups.length > 0 ? filteredGroups.map((group, idx) => (
-                    <GhsaReportGroup key={idx} group={group} />
-                )) : <p>No findings match your search.</p>}
+                {groups.length > 0 && (
+                    <p className="reports-summary">
+                        Showing {groups.length} of {totals.groups} packages ({totals.findings} advisories)
+                    </p>
+                )}
+                {groups.length > 0 ? groups.map(group => (
+                    <GhsaReportGroup key={`${group.repo ?? ""}/${group.pkg}`} group={group} />
+                )) : !loading && <p>No findings match your search.</p>}
+                {nextCursor && (
+                    <button className="load-more-btn" disabled={loading} onClick={() => loadReports(nextCursor)}>
+                        {loading ? "Loading..." : "Load more"}
+                    </button>
+                )}
             </div>
         </div>
     );
@@ -4,7 +4,9 @@ export default function FilterPanel({
     showFilters, setShowFilters,
     repoFilter, setRepoFilter,
     ecosystemFilter, setEcosystemFilter,
-    severityFilter, setSeverityFilter
+    severityFilter, setSeverityFilter,
+    cvssMin, setCvssMin,
+    minStars, setMinStars
 }) {
     return (
         <>
@@ -50,6 +52,16 @@ export default function FilterPanel({
                         <option value="low">Low</option>
                     </select>
                 </div>
+
+                <div className="filter-section">
+                    <label>Min CVSS:</label>
+                    <input type="number" min="0" max="10" step="0.1" value={cvssMin} onChange={e => setCvssMin(e.target.value)} />
+                </div>
+
+                <div className="filter-section">
+                    <label>Min Stars:</label>
+                    <input type="number" min="0" step="1" value={minStars} onChange={e => setMinStars(e.target.value)} />
+                </div>
             </div>
         </>
     );
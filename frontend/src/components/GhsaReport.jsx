@@ -58,19 +58,24 @@ export default function GhsaReport({ report, idBase, index }) {
             addRow("GHSA", link);
         }
 
-        if (report.cwe) {
-            const cweNum = report.cwe?.id.split("-")[1]
-            const link = (
-                <a
-                    href={`https://cwe.mitre.org/data/definitions/${cweNum}.html`}
-                    target="_blank"
-                >
-                    {report.cwe.id}: {report.cwe.title}
-                </a>
-            );
-            addRow("CWE", link);
+        const cwes = report.cwes ?? (report.cwe ? [report.cwe] : []);
+        if (cwes.length) {
+            const links = cwes.map((cwe, i) => (
+                <div key={cwe.id || i}>
+                    <a
+                        href={`https://cwe.mitre.org/data/definitions/${cwe.id.split("-")[1]}.html`}
+                        target="_blank"
+                    >
+                        {cwe.id}: {cwe.title}
+                    </a>
+                </div>
+            ));
+            addRow(cwes.length > 1 ? "CWEs" : "CWE", links);
         }
 
+        if (report.vulnerable_version_range) addRow("Affected Versions", report.vulnerable_version_range);
+        if (report.first_patched_version) addRow("Patched In", report.first_patched_version);
+
         if (report.cvss_score) addRow("CVSS Score", report.cvss_score);
         if (report.cvss_vector) addRow("CVSS Vector", report.cvss_vector);
         if (report.severity) addRow("Severity", report.severity);
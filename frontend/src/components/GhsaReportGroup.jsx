@@ -1,10 +1,13 @@
 import { useState } from "react";
 import GhsaReport from "./GhsaReport";
 
+const SCANS_PAGE_SIZE = 20;
+
 export default function GhsaReportGroup({ group, findings }) {
     const [scanMessages, setScanMessages] = useState({});
     const [scanningRepos, setScanningRepos] = useState({});
     const [scans, setScans] = useState([]);
+    const [scansTotal, setScansTotal] = useState(0);
     const [showScans, setShowScans] = useState(false);
 
     const runScan = async (repo) => {
@@ -49,19 +52,26 @@ export default function GhsaReportGroup({ group, findings }) {
         }
     };
 
+    const loadScans = async (repo, offset = 0) => {
+        try {
+            const response = await fetch(
+                `/api/scans/${encodeURIComponent(repo)}?offset=${offset}&limit=${SCANS_PAGE_SIZE}`
+            );
+            if (!response.ok) throw new Error("Network response was not ok");
+            const data = await response.json();
+            setScans((prev) => offset ? [...prev, ...data.scans] : data.scans);
+            setScansTotal(data.total);
+            setShowScans(true);
+        } catch (error) {
+            console.error("Fetch error:", error);
+        }
+    };
+
     const handleToggleScans = async (repo) => {
         if (showScans) {
             setShowScans(false);
         } else {
-            try {
-                const response = await fetch(`/api/scans/${encodeURIComponent(repo)}`);
-                if (!response.ok) throw new Error("Network response was not ok");
-                const data = await response.json();
-                setScans(data);
-                setShowScans(true);
-            } catch (error) {
-                console.error("Fetch error:", error);
-            }
+            await loadScans(repo);
         }
     };
 
@@ -133,13 +143,17 @@ export default function GhsaReportGroup({ group, findings }) {
                                     >
                                         Scanned at {formatTimestamp(scan.timestamp)}
                                     </a>
-                                    <span>{`${scan.findings_count}`} findings</span>
+                                    <span>
+                                        {`${scan.findings_count}`} findings
+                                        {scan.stats?.suppressed ? ` (${scan.stats.suppressed} suppressed)` : ""}
+                                    </span>
                                     <button
                                         className="delete-btn"
                                         onClick={async () => {
                                             try {
                                                 await fetch(`/api/scans/delete/${scan._id}`, { method: "DELETE" });
                                                 setScans((prev) => prev.filter((s) => s._id !== scan._id));
+                                                setScansTotal((prev) => prev - 1);
                                             } catch (err) {
                                                 console.error("Failed to delete scan", err);
                                             }
@@ -149,6 +163,14 @@ export default function GhsaReportGroup({ group, findings }) {
                                     </button>
                                 </div>
                             ))}
+                            {scans.length < scansTotal && (
+                                <button
+                                    className="load-more-btn"
+                                    onClick={() => loadScans(group.repo, scans.length)}
+                                >
+                                    Load more
+                                </button>
+                            )}
                         </div>
                     ) : (
                         <p>No results found</p>
@@ -24,7 +24,7 @@ function SarifReport({ finding, onRemove }) {
         if (onRemove) onRemove(finding);
 
         try {
-            const fingerprintId = Object.values(finding.fingerprints)[0];
+            const fingerprintId = finding.fingerprints.paladin;
             const resp = await fetch(`/api/sarif/${scanId}/suppress?fingerprint=${fingerprintId}`, {
                 method: "GET",
             });
@@ -41,7 +41,7 @@ function SarifReport({ finding, onRemove }) {
 
         setLoadingAiReview(true);
         try {
-            const fingerprintId = Object.values(finding.fingerprints)[0];
+            const fingerprintId = finding.fingerprints.paladin;
             const resp = await fetch(`/api/scan/review`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
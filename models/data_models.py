@@ -1,6 +1,15 @@
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+
+@dataclass
+class ScanStats:
+    by_severity: Dict[str, int] = field(default_factory=dict)  # SARIF level
+    by_rule: List[Dict[str, Any]] = field(default_factory=list)  # rule_id, count
+    suppressed: int = 0
 
 
 @dataclass
@@ -10,6 +19,27 @@ class ScanResult:
     timestamp: int = field(
         default_factory=lambda: int(datetime.now(timezone.utc).timestamp())
     )
+    commit: Optional[str] = None  # HEAD of the checkout that was scanned
+    findings_count: int = 0
+    stats: ScanStats = field(default_factory=ScanStats)
+    # set once the scan is complete, with commit they key the result cache
+    rules_hash: Optional[str] = None
+    config_hash: Optional[str] = None
+    cached_from: Optional[ObjectId] = None  # scan the findings were copied from
+    job_id: Optional[ObjectId] = None  # job that wrote the scan
+    # set by finish_scan, scans stored before this field are complete
+    complete: bool = False
+
+
+@dataclass
+class Finding:
+    scan_id: ObjectId
+    fingerprint: str
+    seq: int  # position of the result in the scan's SARIF
+    rule_id: str
+    file: str
+    suppressed: bool
+    result: Dict[str, Any]  # SARIF result, without the suppressed flag
 
 
 @dataclass
@@ -26,19 +56,33 @@ class Cwe:
 
 
 @dataclass
-class VulnReport:
+class AffectedPackage:
+    ecosystem: str  # TODO: make this enum
     package: str
+    vulnerable_version_range: Optional[str] = None  # e.g. ">= 1.0, < 1.2.3"
+    first_patched_version: Optional[str] = None
+
+
+@dataclass
+class VulnReport:
+    """
+    One advisory with every package it affects. The report_groups collection
+    is a view of these grouped by repo and package.
+    """
+
+    ghsa: str
     repo: Optional[str]
-    ecosystem: str  # TODO: make this enum
     title: str
-    ghsa: str
     cve: Optional[str]
-    cwe: Optional[Cwe]
+    cwes: List[Cwe]
     stars: Optional[int]
     forks: Optional[int]
     severity: str  # TODO: make this enum
     cvss_score: Optional[float]
     cvss_vector: Optional[str]
+    affected: List[AffectedPackage]
+    published_at: Optional[str] = None
+    updated_at: Optional[str] = None
 
 
 @dataclass
@@ -53,3 +97,56 @@ class LocationFromSarif:
     filepath: str
     snippet: str
     description: str
+
+
+@dataclass
+class ReportFilters:
+    query: Optional[str] = None  # full text search
+    ecosystem: Optional[str] = None
+    severity: Optional[str] = None
+    cvss_min: Optional[float] = None
+    cvss_max: Optional[float] = None
+    min_stars: Optional[int] = None
+    has_repo: Optional[bool] = None
+
+
+@dataclass
+class ReviewFilters:
+    rule_id: Optional[str] = None
+    file: Optional[str] = None
+    include_suppressed: bool = False
+    include_reviewed: bool = False  # review findings that already have a review again
+
+
+@dataclass
+class GhsaFeed:
+    advisories: List[Dict[str, Any]]
+    etag: Optional[str] = None  # of the first page
+    not_modified: bool = False  # first page unchanged since the given ETag
+    resume_url: Optional[str] = None  # set when a page failed, feed is partial
+
+
+@dataclass
+class RefreshState:
+    source: str
+    high_water: Optional[str] = None  # newest updated_at processed
+    covered_since: Optional[str] = None  # oldest updated_at fully processed
+    etag: Optional[str] = None
+    # where an incomplete fetch stopped, and the window it was fetching
+    resume_url: Optional[str] = None
+    resume_since: Optional[str] = None
+    resume_high_water: Optional[str] = None
+
+
+@dataclass
+class RefreshItem:
+    advisory: Dict[str, Any]
+    repo: Optional[str]
+
+
+@dataclass
+class BulkWriteSummary:
+    matched: int = 0
+    modified: int = 0
+    upserted: int = 0
+    failed: List[Any] = field(default_factory=list)  # items still failing after retries
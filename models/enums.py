@@ -21,3 +21,16 @@ class JobStatus(Enum):
     DONE = "done"
     ERROR = "error"
     RUNNING = "running"
+
+
+class JobType(Enum):
+    SCAN = "scan"
+    REFRESH = "refresh"
+    IMPORT = "import"
+    REVIEW = "review"
+
+
+class CloneStrategy(Enum):
+    FULL = "full"
+    SHALLOW = "shallow"  # depth 1
+    PARTIAL = "partial"  # blobless, blobs are fetched on checkout
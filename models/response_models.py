@@ -6,7 +6,7 @@ from typing import Any, Dict, List, Optional
 from bson import ObjectId
 from pydantic import BaseModel
 
-from .enums import FileError, JobStatus, ReviewError
+from .enums import FileError, JobStatus, JobType, ReviewError
 
 
 @dataclass
@@ -31,6 +31,7 @@ class GeminiReview(BaseModel):
 class ReviewResponse:
     error: Optional[ReviewError] = None
     review: Optional[GeminiReview] = None
+    cached: bool = False  # the review came from the review cache
 
     def to_dict(self) -> Dict[str, Any]:
         d = asdict(self)
@@ -49,17 +50,24 @@ class JobResponse:
     error: Optional[str] = None
     _id: Optional[ObjectId] = None
     status: JobStatus = JobStatus.PENDING
-    created_at: int = field(
-        default_factory=lambda: int(datetime.now(timezone.utc).timestamp())
-    )
-    updated_at: int = field(
-        default_factory=lambda: int(datetime.now(timezone.utc).timestamp())
-    )
+    job_type: JobType = JobType.SCAN
+    worker: Optional[str] = None  # scheduler worker holding the job
+    attempts: int = 0
+    heartbeat_at: Optional[datetime] = None
+    metrics: Dict[str, Any] = field(default_factory=dict)
+    processed: int = 0  # progress of jobs that report it
+    total: int = 0
+    auto: bool = False  # queued by auto-scan after a refresh, not by a user
+    priority: float = 0  # auto scans are claimed highest priority first
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
     def to_dict(self) -> Dict[str, Any]:
         d = asdict(self)
         if isinstance(self.status, Enum):
             d["status"] = self.status.value
+        if isinstance(self.job_type, Enum):
+            d["job_type"] = self.job_type.value
         if isinstance(self._id, ObjectId):
             d["_id"] = str(self._id)
         return d
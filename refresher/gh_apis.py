@@ -1,49 +1,71 @@
 import logging
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set
 
 import requests
 
-from models.data_models import RepoInfo
+from models.data_models import GhsaFeed, RepoInfo
+
+from .gh_client import GhClient, GhPaginationError
 
 logging.basicConfig(level=logging.INFO)
 
 
 class GhApis:
-    def __init__(self, token) -> None:
+    REPO_BATCH_SIZE = 50  # aliased repository lookups per GraphQL query
+
+    def __init__(self, token, config: Optional[Dict[str, Any]] = None) -> None:
         self.github_token = token
-        self.headers = {
-            "Authorization": f"Bearer {self.github_token}",
-            "Accept": "application/vnd.github+json",
-        }
+        self.client = GhClient(token, config or {})
         self.github_graphql_api = "https://api.github.com/graphql"
         self.logger = logging.getLogger(__name__)
 
-    def query_recent_ghsa(self, days: int = 7) -> Optional[List[Dict[str, Any]]]:
-        self.logger.info("Querying GitHub REST API for GHSA advisories")
-        since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+    def query_recent_ghsa(
+        self,
+        since: str,
+        etag: Optional[str] = None,
+        resume_url: Optional[str] = None,
+    ) -> Optional[GhsaFeed]:
+        """
+        Advisories updated at or after `since` (ISO 8601, UTC), newest first.
+        When `etag` matches the first page nothing has changed and the request
+        does not count against the rate limit. If a later page keeps failing,
+        the advisories fetched so far are returned as an incomplete feed, and
+        `resume_url` of an incomplete feed continues it from that page.
+        """
+        self.logger.info(f"Querying GitHub REST API for GHSAs updated since {since}")
         all_advisories: List[Dict[str, Any]] = []
         per_page = 100
+        first_page_etag: Optional[str] = None
 
-        url = f"https://api.github.com/advisories?per_page={per_page}"
+        url: str = resume_url or (
+            "https://api.github.com/advisories"
+            f"?per_page={per_page}&sort=updated&direction=desc"
+        )
+        pages = self.client.paginate(url, {"If-None-Match": etag} if etag else None)
 
-        while url:
-            try:
-                response = requests.get(url, headers=self.headers, timeout=30)
-                response.raise_for_status()
-                advisories = response.json()
+        try:
+            for response in pages:
+                if response.status_code == 304:
+                    self.logger.info("GHSA feed unchanged since the last refresh")
+                    return GhsaFeed(advisories=[], etag=etag, not_modified=True)
+
+                if first_page_etag is None:
+                    first_page_etag = response.headers.get("ETag", "")
 
+                advisories = response.json()
                 if not advisories:
                     break
 
-                # Loop through advisories in order; stop when older than "since"
+                # Advisories are sorted by updated_at; stop at the first older one
                 for adv in advisories:
-                    published_at = adv.get("published_at")
-                    if not published_at:
+                    updated_at = adv.get("updated_at")
+                    if not updated_at:
                         continue
 
-                    if published_at < since:
-                        return all_advisories
+                    if updated_at < since:
+                        return GhsaFeed(all_advisories, first_page_etag or None)
 
                     all_advisories.append(adv)
 
@@ -51,58 +73,111 @@ class GhApis:
                 if len(advisories) < per_page:
                     break
 
-                if len(advisories) < per_page:
-                    break
-
-                link = response.headers.get("Link", "")
-                next_url = None
-                for part in link.split(","):
-                    if 'rel="next"' in part:
-                        next_url = part[part.find("<") + 1 : part.find(">")]
-                        break
-                url = next_url
-
-            except requests.exceptions.RequestException as e:
-                self.logger.error(f"Failed to fetch REST API response: {e}")
+        except GhPaginationError as e:
+            self.logger.error(f"Failed to fetch REST API response: {e}")
+            if not all_advisories:
                 return None
 
+            return GhsaFeed(
+                all_advisories, first_page_etag or None, resume_url=e.resume_url
+            )
+
         self.logger.info(f"Fetched {len(all_advisories)} advisories from REST API")
-        return all_advisories
+        return GhsaFeed(all_advisories, first_page_etag or None)
 
-    def query_repo_info(self, ecosystem: str, repo: str) -> RepoInfo:
-        self.logger.info(f"Querying repo info from Github API for {ecosystem}:{repo}")
+    def lookup_repos(self, repos: List[str]) -> Dict[str, Optional[RepoInfo]]:
+        """
+        Look up repos with one aliased GraphQL query per batch. Repos that do
+        not exist map to None; repos whose lookup failed are left out.
+        """
+        unique: List[str] = list(dict.fromkeys(repos))
+        infos: Dict[str, Optional[RepoInfo]] = {}
 
-        owner, repo = repo.split("/")[0], repo.split("/")[1]
-        query = """
-        query($owner: String!, $name: String!) {
-        repository(owner: $owner, name: $name) {
-            stargazerCount
-            forkCount
-        }
+        for start in range(0, len(unique), self.REPO_BATCH_SIZE):
+            batch: List[str] = unique[start : start + self.REPO_BATCH_SIZE]
+            try:
+                infos.update(self._query_repo_batch(batch))
+            except requests.RequestException as e:
+                self.logger.error(
+                    f"Failed to fetch repo data for {len(batch)} repos: {e}"
+                )
+
+        self.logger.info(
+            f"Queried repo info for {len(unique)} repos in "
+            f"{-(-len(unique) // self.REPO_BATCH_SIZE)} requests"
+        )
+        return infos
+
+    def _query_repo_batch(self, repos: List[str]) -> Dict[str, Optional[RepoInfo]]:
+        variables: Dict[str, str] = {}
+        declarations: List[str] = []
+        selections: List[str] = []
+        infos: Dict[str, Optional[RepoInfo]] = {}
+
+        for i, repo in enumerate(repos):
+            parts: List[str] = repo.split("/")
+            if len(parts) < 2 or not parts[0] or not parts[1]:
+                infos[repo] = None
+                continue
+
+            variables[f"owner{i}"], variables[f"name{i}"] = parts[0], parts[1]
+            declarations.append(f"$owner{i}: String!, $name{i}: String!")
+            selections.append(
+                f"r{i}: repository(owner: $owner{i}, name: $name{i}) "
+                "{ stargazerCount forkCount }"
+            )
+
+        if not selections:
+            return infos
+
+        query: str = (
+            f"query({', '.join(declarations)}) {{\n"
+            + "\n".join(selections)
+            + "\nrateLimit { cost remaining resetAt }\n}"
+        )
+        # Repos that failed come back as null with an error, the rest still resolve
+        response: Dict[str, Any] = self._query_github_graphql(query, variables)
+        data: Dict[str, Any] = response.get("data") or {}
+        self._wait_for_rate_limit(data.get("rateLimit"))
+        not_found: Set[str] = {
+            error["path"][0]
+            for error in response.get("errors") or []
+            if error.get("type") == "NOT_FOUND" and error.get("path")
         }
-        """
-        try:
-            variables = {"owner": owner, "name": repo}
-            data = self._query_github_graphql(query, variables)
-            repo_info = data.get("data", {}).get("repository")
-
-            if repo_info:
-                return RepoInfo(
-                    repo=f"{owner}/{repo}",
-                    stars=repo_info["stargazerCount"],
-                    forks=repo_info["forkCount"],
+
+        for i, repo in enumerate(repos):
+            node: Optional[Dict[str, Any]] = data.get(f"r{i}")
+            if node:
+                infos[repo] = RepoInfo(
+                    repo="/".join(repo.split("/")[:2]),
+                    stars=node["stargazerCount"],
+                    forks=node["forkCount"],
                 )
-        except requests.RequestException:
-            self.logger.error(f"Failed to fetch repo data for {owner}/{repo}")
+            elif f"r{i}" in not_found:
+                infos[repo] = None
+            # other errors, e.g. timeouts or permissions, are retried next time
+
+        return infos
+
+    def _wait_for_rate_limit(self, rate_limit: Optional[Dict[str, Any]]) -> None:
+        """
+        Sleep until the GraphQL quota resets if it cannot pay for another
+        query of the same cost.
+        """
+        if not rate_limit or rate_limit["remaining"] >= rate_limit["cost"]:
+            return
 
-        return RepoInfo(repo="", stars=0, forks=0)
+        reset_at: datetime = datetime.fromisoformat(rate_limit["resetAt"])
+        wait: float = (reset_at - datetime.now(timezone.utc)).total_seconds()
+        if wait > 0:
+            self.logger.warning(f"GraphQL rate limit exhausted, waiting {wait:.0f}s")
+            time.sleep(wait)
 
     def _query_github_graphql(
         self, query: str, variables: Dict[str, Any] = {}
     ) -> Dict[str, Any]:
-        r = requests.post(
-            "https://api.github.com/graphql",
-            headers=self.headers,
+        r = self.client.post(
+            self.github_graphql_api,
             json={"query": query, "variables": variables},
             timeout=15,
         )
@@ -0,0 +1,241 @@
+import logging
+import math
+import random
+import threading
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logging.basicConfig(level=logging.INFO)
+
+
+class GhPaginationError(requests.RequestException):
+    """
+    A page could not be fetched after retrying. `resume_url` is the page to
+    continue from.
+    """
+
+    def __init__(self, resume_url: str, cause: Exception) -> None:
+        super().__init__(f"Failed to fetch {resume_url}: {cause}")
+        self.resume_url = resume_url
+
+
+class GhClient:
+    """
+    GitHub HTTP client on a pooled keep-alive session. Requests are bounded
+    to a fixed number in flight, retried with exponential backoff and jitter,
+    and wait out primary and secondary rate limits. Latency and remaining
+    quota are tracked per endpoint.
+    """
+
+    RETRY_STATUSES = {500, 502, 503, 504}
+    SECONDARY_LIMIT_WAIT = 60  # GitHub asks for at least a minute
+
+    def __init__(self, token: Optional[str], config: Dict[str, Any]) -> None:
+        self.logger = logging.getLogger(__name__)
+
+        client_config: Dict[str, Any] = config.get("refresher", {})
+        self.max_concurrency: int = client_config.get("github_concurrency", 4)
+        self.max_retries: int = client_config.get("github_max_retries", 5)
+        self.backoff_base: float = client_config.get("github_backoff_base", 1)
+        self.backoff_max: float = client_config.get("github_backoff_max", 60)
+
+        self.session = requests.Session()
+        self.session.headers.update(
+            {
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/vnd.github+json",
+            }
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.max_concurrency, max_retries=0
+        )
+        self.session.mount("https://", adapter)
+
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self._lock = threading.Lock()
+        self._blocked_until: float = 0
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying server errors, connection errors and rate
+        limited responses. Other responses, including 4xx, are returned as is.
+        Raises the last error once retries are exhausted.
+        """
+        kwargs.setdefault("timeout", 30)
+        endpoint: str = f"{method} {urlparse(url).path}"
+
+        attempt: int = 0
+        while True:
+            self._wait_if_blocked()
+
+            start: float = time.monotonic()
+            try:
+                with self._semaphore:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(endpoint, time.monotonic() - start, None, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                self._sleep(self._backoff(attempt), f"{endpoint} failed: {e}")
+                attempt += 1
+                continue
+
+            self._record(
+                endpoint, time.monotonic() - start, response, error=not response.ok
+            )
+
+            wait: Optional[float] = self._get_retry_wait(response, attempt)
+            if wait is None or attempt >= self.max_retries:
+                return response
+
+            self._sleep(wait, f"{endpoint} returned {response.status_code}")
+            attempt += 1
+
+    def paginate(
+        self, url: str, first_page_headers: Optional[Dict[str, str]] = None
+    ) -> Iterator[requests.Response]:
+        """
+        Yield every page of a Link-paginated endpoint, starting at `url`.
+        A page that keeps failing raises GhPaginationError with the URL to
+        resume from, so the pages already fetched are not lost.
+        """
+        next_url: Optional[str] = url
+        headers: Optional[Dict[str, str]] = first_page_headers
+
+        while next_url:
+            try:
+                response = self.get(next_url, headers=headers)
+                if response.status_code != 304:
+                    response.raise_for_status()
+            except requests.RequestException as e:
+                raise GhPaginationError(next_url, e)
+
+            yield response
+
+            headers = None
+            next_url = response.links.get("next", {}).get("url")
+
+    def get_metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                endpoint: {
+                    **metrics,
+                    "avg_latency": round(
+                        metrics["total_latency"] / metrics["requests"], 3
+                    ),
+                }
+                for endpoint, metrics in self._metrics.items()
+            }
+
+    def _get_retry_wait(
+        self, response: requests.Response, attempt: int
+    ) -> Optional[float]:
+        """
+        Seconds to wait before retrying the response, or None if it should
+        not be retried.
+        """
+        if response.status_code in self.RETRY_STATUSES:
+            return self._backoff(attempt)
+
+        if response.status_code not in (403, 429):
+            return None
+
+        retry_after: Optional[str] = response.headers.get("Retry-After")
+        if retry_after:
+            return self._parse_retry_after(retry_after, attempt)
+
+        if response.headers.get("X-RateLimit-Remaining") == "0":
+            reset: float = float(response.headers.get("X-RateLimit-Reset", 0))
+            return max(reset - time.time(), 0) + 1
+
+        if "secondary rate limit" in response.text.lower():
+            return max(self.SECONDARY_LIMIT_WAIT, self._backoff(attempt))
+
+        # a plain 403 is a permission problem
+        return None if response.status_code == 403 else self._backoff(attempt)
+
+    def _parse_retry_after(self, retry_after: str, attempt: int) -> float:
+        """
+        Seconds to wait for a Retry-After header, given in seconds or as an
+        HTTP date. Falls back to the backoff if it is neither.
+        """
+        try:
+            seconds: float = float(retry_after)
+            if math.isfinite(seconds):
+                return max(seconds, 0)
+        except ValueError:
+            pass
+
+        try:
+            retry_at: datetime = parsedate_to_datetime(retry_after)
+            return max(retry_at.timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            self.logger.warning(f"Ignoring malformed Retry-After {retry_after!r}")
+            return self._backoff(attempt)
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    def _sleep(self, seconds: float, reason: str) -> None:
+        self.logger.warning(f"{reason}, retrying in {seconds:.1f}s")
+        time.sleep(seconds)
+
+    def _wait_if_blocked(self) -> None:
+        """
+        Hold new requests while the primary quota is exhausted.
+        """
+        with self._lock:
+            wait: float = self._blocked_until - time.time()
+
+        if wait > 0:
+            self._sleep(wait, "GitHub rate limit exhausted")
+
+    def _record(
+        self,
+        endpoint: str,
+        latency: float,
+        response: Optional[requests.Response],
+        error: bool,
+    ) -> None:
+        with self._lock:
+            metrics: Dict[str, Any] = self._metrics.setdefault(
+                endpoint,
+                {
+                    "requests": 0,
+                    "errors": 0,
+                    "total_latency": 0.0,
+                    "last_latency": 0.0,
+                    "rate_limit_remaining": None,
+                    "rate_limit_reset": None,
+                },
+            )
+            metrics["requests"] += 1
+            metrics["errors"] += int(error)
+            metrics["total_latency"] += latency
+            metrics["last_latency"] = round(latency, 3)
+
+            if response is None:
+                return
+
+            remaining: Optional[str] = response.headers.get("X-RateLimit-Remaining")
+            reset: Optional[str] = response.headers.get("X-RateLimit-Reset")
+            if remaining is not None:
+                metrics["rate_limit_remaining"] = int(remaining)
+            if reset is not None:
+                metrics["rate_limit_reset"] = int(reset)
+            if remaining == "0" and reset is not None:
+                self._blocked_until = max(self._blocked_until, float(reset) + 1)
@@ -0,0 +1,250 @@
+import json
+import logging
+import multiprocessing
+import os
+import tarfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+logging.basicConfig(level=logging.INFO)
+
+# OSV ecosystem names to the ones the GitHub REST API uses
+OSV_ECOSYSTEMS: Dict[str, str] = {
+    "pypi": "pip",
+    "npm": "npm",
+    "maven": "maven",
+    "go": "go",
+    "rubygems": "rubygems",
+    "nuget": "nuget",
+    "packagist": "composer",
+    "crates.io": "rust",
+    "hex": "erlang",
+    "github actions": "actions",
+    "pub": "pub",
+    "swifturl": "swift",
+}
+
+# OSV severities to the REST API's
+OSV_SEVERITIES: Dict[str, str] = {"moderate": "medium"}
+
+# OSV severity types to the REST API's cvss_severities keys
+OSV_CVSS_VERSIONS: Dict[str, str] = {"CVSS_V3": "cvss_v3", "CVSS_V4": "cvss_v4"}
+
+
+def parse_advisory_file(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Read one OSV advisory file and convert it to the REST advisory shape.
+    Runs in a worker process, so it only depends on the standard library.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            osv: Dict[str, Any] = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if osv.get("withdrawn") or not str(osv.get("id", "")).startswith("GHSA-"):
+        return None
+
+    return osv_to_rest_advisory(osv)
+
+
+def osv_to_rest_advisory(osv: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The fields of a REST API advisory that Refresher reads. OSV carries CVSS
+    vectors but no scores, and CWE ids but no names.
+    """
+    database_specific: Dict[str, Any] = osv.get("database_specific", {})
+
+    cvss_severities: Dict[str, Any] = {}
+    for severity in osv.get("severity", []):
+        version: Optional[str] = OSV_CVSS_VERSIONS.get(severity.get("type", ""))
+        if version:
+            cvss_severities[version] = {
+                "score": None,
+                "vectorString": severity["score"],
+            }
+
+    source_code_location: str = ""
+    for reference in osv.get("references", []):
+        url: str = reference.get("url", "")
+        if reference.get("type") == "PACKAGE" and url.startswith("https://github.com/"):
+            source_code_location = "/".join(url.rstrip("/").split("/")[:5])
+            break
+
+    vulnerabilities: List[Dict[str, Any]] = []
+    for affected in osv.get("affected", []):
+        package: Dict[str, Any] = affected.get("package", {})
+        if not package.get("name"):
+            continue
+
+        ecosystem: str = package.get("ecosystem", "").split(":")[0].lower()
+        for version_range, first_patched in osv_version_ranges(affected):
+            vulnerabilities.append(
+                {
+                    "package": {
+                        "ecosystem": OSV_ECOSYSTEMS.get(ecosystem, "other"),
+                        "name": package["name"],
+                    },
+                    "vulnerable_version_range": version_range,
+                    "first_patched_version": first_patched,
+                }
+            )
+
+    severity: str = database_specific.get("severity", "unknown").lower()
+
+    return {
+        "ghsa_id": osv["id"],
+        "summary": osv.get("summary") or osv.get("details", "")[:200],
+        "identifiers": [{"type": "GHSA", "value": osv["id"]}]
+        + [
+            {"type": "CVE", "value": alias}
+            for alias in osv.get("aliases", [])
+            if alias.startswith("CVE-")
+        ],
+        "severity": OSV_SEVERITIES.get(severity, severity),
+        "cvss_severities": cvss_severities,
+        "cwes": [
+            {"cwe_id": cwe_id, "name": cwe_id}
+            for cwe_id in database_specific.get("cwe_ids", [])
+        ],
+        "source_code_location": source_code_location,
+        "vulnerabilities": vulnerabilities,
+        "published_at": osv.get("published"),
+        "updated_at": osv.get("modified"),
+    }
+
+
+def osv_version_ranges(
+    affected: Dict[str, Any],
+) -> List[Tuple[Optional[str], Optional[str]]]:
+    """
+    (vulnerable_version_range, first_patched_version) for every interval of
+    an OSV affected entry, with ranges written the way the REST API does,
+    e.g. ">= 1.0, < 1.2.3".
+    """
+    # GitHub's own bound for intervals that have no fix yet
+    last_known: Optional[str] = affected.get("database_specific", {}).get(
+        "last_known_affected_version_range"
+    )
+
+    intervals: List[Tuple[Optional[str], Optional[str]]] = []
+    for version_range in affected.get("ranges", []):
+        if version_range.get("type") not in ("ECOSYSTEM", "SEMVER"):
+            continue
+
+        introduced: Optional[str] = None
+        for event in version_range.get("events", []):
+            if "introduced" in event:
+                introduced = event["introduced"]
+                continue
+
+            bounds: List[str] = (
+                [f">= {introduced}"] if introduced not in (None, "0") else []
+            )
+            if "fixed" in event:
+                intervals.append(
+                    (", ".join(bounds + [f"< {event['fixed']}"]), event["fixed"])
+                )
+            elif "last_affected" in event:
+                intervals.append(
+                    (", ".join(bounds + [f"<= {event['last_affected']}"]), None)
+                )
+            introduced = None
+
+        if introduced is not None:
+            intervals.append((last_known or f">= {introduced}", None))
+
+    return intervals or [(None, None)]
+
+
+class OsvImporter:
+    """
+    Loads GHSA advisories from a local clone of github/advisory-database or
+    a tarball of one. Only reviewed advisories are read, the ones the REST
+    API returns. Files are parsed by a process pool.
+    """
+
+    REVIEWED_DIR = "github-reviewed"
+
+    def __init__(self, config: Dict[str, Any]) -> None:
+        self.logger = logging.getLogger(__name__)
+
+        refresher_config: Dict[str, Any] = config.get("refresher", {})
+        self.processes: int = refresher_config.get(
+            "import_processes", os.cpu_count() or 1
+        )
+
+    def load(self, source: Path) -> List[Dict[str, Any]]:
+        """
+        Advisories found under `source`, in the REST advisory shape.
+        Raises OSError or tarfile.TarError if the source cannot be read.
+        """
+        if source.is_dir():
+            return self._load_dir(source)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with tarfile.open(source) as tar:
+                tar.extractall(tmp, filter="data")
+            return self._load_dir(Path(tmp))
+
+    def _load_dir(self, directory: Path) -> List[Dict[str, Any]]:
+        # advisories/unreviewed holds advisories the REST feed never returns
+        paths: List[str] = [
+            str(path)
+            for path in directory.rglob("GHSA-*.json")
+            if self.REVIEWED_DIR in path.relative_to(directory).parts
+        ]
+        self.logger.info(f"Parsing {len(paths)} advisory files from {directory}")
+
+        # spawn: forking the threaded app server is not safe
+        with ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            advisories: List[Dict[str, Any]] = [
+                advisory
+                for advisory in executor.map(
+                    parse_advisory_file,
+                    paths,
+                    chunksize=max(1, len(paths) // (self.processes * 8)),
+                )
+                if advisory
+            ]
+
+        self.logger.info(f"Loaded {len(advisories)} advisories from {directory}")
+        return advisories
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    from models.enums import JobType
+    from models.response_models import JobResponse
+    from refresher.refresh import Refresher
+    from utils.config_verifier import ConfigVerifier
+    from utils.mongo_utils import MongoUtils
+
+    parser = argparse.ArgumentParser(
+        description="Import GHSAs from a github/advisory-database clone or tarball"
+    )
+    parser.add_argument("source", help="advisory-database directory or tarball")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="skip GitHub lookups of repo stars and forks",
+    )
+    args = parser.parse_args()
+
+    config = ConfigVerifier("config.toml").verify()
+    if not config:
+        sys.exit(1)
+
+    mongo = MongoUtils(config)
+    job = JobResponse(job_type=JobType.IMPORT)
+    job_id = mongo.add_job_to_db(job)
+
+    Refresher(config, mongo).import_advisories(job_id, args.source, args.offline)
+    print(mongo.get_job_by_id(str(job_id)).to_dict())  # type: ignore
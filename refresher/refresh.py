@@ -1,91 +1,461 @@
+import asyncio
+import hashlib
+import json
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Any, Dict, List, Optional, Set
+import tarfile
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 from bson import ObjectId
 
-from models.data_models import Cwe, RepoInfo, VulnReport
+from models.data_models import (AffectedPackage, BulkWriteSummary, Cwe,
+                                GhsaFeed, RefreshItem, RefreshState, RepoInfo,
+                                VulnReport)
 from models.enums import JobStatus
+from scanner.auto_scan import AutoScanQueue
+from utils.bulk_writer import BulkWriter
 from utils.mongo_utils import MongoUtils
 
 from .gh_apis import GhApis
+from .osv_import import OsvImporter
+from .repo_cache import RepoInfoCache
 
 logging.basicConfig(level=logging.INFO)
 
 
 class Refresher:
-    def __init__(self, token: str, mongo: MongoUtils) -> None:
+    GHSA_SOURCE = "ghsa"
+    # OSV has CVSS vectors but no scores, and CWE ids but no names. Imports
+    # only write these on new reports, keeping what a refresh stored.
+    OSV_INSERT_ONLY_FIELDS: Tuple[str, ...] = ("cvss_score", "cwes")
+    # offline imports do not look up repos
+    OFFLINE_INSERT_ONLY_FIELDS: Tuple[str, ...] = ("stars", "forks")
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        mongo: MongoUtils,
+        auto_scan: Optional[AutoScanQueue] = None,
+    ) -> None:
         self.mongo = mongo
+        self.auto_scan = auto_scan
         self.logger = logging.getLogger(__name__)
-        self.token = token
-        self.gh_apis = GhApis(token)
+        self.token: Optional[str] = config.get("tokens", {}).get("github_token")
+        self.gh_apis = GhApis(self.token, config)
+        self.repo_cache = RepoInfoCache(config, self.gh_apis, mongo)
+        self.importer = OsvImporter(config)
+
+        refresher_config: Dict[str, Any] = config.get("refresher", {})
+        self.concurrency: int = refresher_config.get("concurrency", 5)
+        self.queue_size: int = refresher_config.get("queue_size", 100)
+        self.write_batch_size: int = refresher_config.get("write_batch_size", 500)
+        self.write_flush_interval: float = refresher_config.get(
+            "write_flush_interval", 2
+        )
 
     def refresh(self, job_id: ObjectId, days: int = 7) -> None:
         self.logger.info(f"Querying GHSAs for last {days} days")
         self.mongo.update_job_status(job_id, JobStatus.RUNNING)
 
-        ghsas: Optional[List[Dict[str, Any]]] = self.gh_apis.query_recent_ghsa(days)
-        if not ghsas:
-            self.logger.info("No GHSAs queried")
-            self.mongo.update_job_status(job_id, JobStatus.DONE)
+        since: str = (datetime.now(timezone.utc) - timedelta(days=days)).strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+        state: RefreshState = self.mongo.get_refresh_state(self.GHSA_SOURCE)
+        if state.resume_url and not self._resume_refresh(job_id, state):
             return None
 
-        self.logger.info(f"Queried {len(ghsas)} GHSAs")
+        # Earlier refreshes already covered the window, only fetch what changed
+        incremental: bool = bool(
+            state.high_water and state.covered_since and state.covered_since <= since
+        )
+        fetch_since: str = state.high_water if incremental else since  # type: ignore
+        feed: Optional[GhsaFeed] = self.gh_apis.query_recent_ghsa(
+            fetch_since, state.etag if incremental else None
+        )
+        if feed is None:
+            self.mongo.update_job_status(
+                job_id, JobStatus.ERROR, "Failed to query GitHub advisories"
+            )
+            return None
 
-        count = 0
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = []
+        self.mongo.update_job_metrics(
+            job_id,
+            {
+                "incremental": incremental,
+                "not_modified": feed.not_modified,
+                "complete": feed.resume_url is None,
+            },
+        )
+        failed: Set[str] = self._ingest_advisories(job_id, feed.advisories)
 
-            for ghsa in ghsas:
-                count += 1
-                seen: Set[str] = set()
+        # A partial feed is missing older advisories, the next refresh
+        # continues it from the page that failed
+        if not failed and feed.resume_url:
+            self._save_resume_point(state, feed, fetch_since)
+        elif not failed:
+            self._advance_refresh_state(state, feed, since)
 
-                vulns: List[Dict[str, Any]] = ghsa.get("vulnerabilities", [])
-                for vuln in vulns:
-                    futures.append(
-                        executor.submit(self._process_vuln_node, ghsa, vuln, seen)
+        self.mongo.update_job_status(
+            job_id,
+            JobStatus.DONE,
+            (
+                f"Advisory feed incomplete, stopped at {feed.resume_url}"
+                if feed.resume_url
+                else None
+            ),
+        )
+
+    def import_advisories(
+        self, job_id: ObjectId, source: str, offline: bool = False
+    ) -> None:
+        """
+        Import advisories from a local advisory-database clone or tarball
+        through the same pipeline as a refresh. Offline imports skip the repo
+        metadata lookups, so no GitHub access is needed.
+        """
+        self.logger.info(f"Importing GHSAs from {source}")
+        self.mongo.update_job_status(job_id, JobStatus.RUNNING)
+
+        try:
+            advisories: List[Dict[str, Any]] = self.importer.load(Path(source))
+        except (OSError, tarfile.TarError) as e:
+            self.logger.error(f"Failed to read advisories from {source}: {e}")
+            self.mongo.update_job_status(job_id, JobStatus.ERROR, str(e))
+            return None
+
+        self.mongo.update_job_metrics(job_id, {"offline": offline})
+        self._ingest_advisories(
+            job_id,
+            advisories,
+            offline,
+            self.OSV_INSERT_ONLY_FIELDS
+            + (self.OFFLINE_INSERT_ONLY_FIELDS if offline else ()),
+        )
+        self.mongo.update_job_status(job_id, JobStatus.DONE)
+
+    def _ingest_advisories(
+        self,
+        job_id: ObjectId,
+        advisories: List[Dict[str, Any]],
+        offline: bool = False,
+        insert_only: Tuple[str, ...] = (),
+    ) -> Set[str]:
+        """
+        Run new or changed advisories through the pipeline and remember their
+        content hashes. Report fields in insert_only are not written to
+        reports that exist already. Returns the ids of advisories that failed.
+        """
+        ghsas: List[Dict[str, Any]] = self._get_changed_advisories(advisories)
+        self.mongo.update_job_metrics(
+            job_id, {"fetched": len(advisories), "changed": len(ghsas)}
+        )
+        self.logger.info(f"Got {len(advisories)} GHSAs, {len(ghsas)} new or changed")
+
+        failed: Set[str] = asyncio.run(
+            self._run_pipeline(job_id, ghsas, offline, insert_only)
+        )
+
+        # Failed advisories keep their old hash and are retried next time
+        self.mongo.set_advisory_hashes(
+            {
+                ghsa["ghsa_id"]: self._hash_advisory(ghsa)
+                for ghsa in ghsas
+                if ghsa["ghsa_id"] not in failed
+            }
+        )
+
+        self.logger.info(
+            f"Upserted {len(ghsas) - len(failed)} GHSA entries into MongoDB"
+        )
+
+        # remote HEADs cannot be checked offline
+        if self.auto_scan and self.auto_scan.enabled and not offline:
+            try:
+                queued: int = self.auto_scan.enqueue(
+                    [ghsa["ghsa_id"] for ghsa in ghsas if ghsa["ghsa_id"] not in failed]
+                )
+                self.mongo.update_job_metrics(job_id, {"auto_scans_queued": queued})
+            except Exception as e:
+                self.logger.error(f"Failed to queue auto scans: {e}")
+
+        return failed
+
+    async def _run_pipeline(
+        self,
+        job_id: ObjectId,
+        advisories: List[Dict[str, Any]],
+        offline: bool = False,
+        insert_only: Tuple[str, ...] = (),
+    ) -> Set[str]:
+        """
+        Turn advisories into vuln reports in stages joined by bounded queues:
+        enrich adds repo metadata in batches and write upserts the reports.
+        The advisories are fetched before the pipeline starts and fed to
+        enrich as it takes them. Blocking calls run in threads. Returns the
+        ids of advisories that failed.
+        """
+        items: List[RefreshItem] = self._get_refresh_items(advisories)
+        enrich_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        write_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        repo_lookups: Dict[str, asyncio.Future] = {}
+        failed: Set[str] = set()
+        # reports buffered in the writer count as processed once flushed
+        progress: Dict[str, int] = {"processed": 0, "buffered": 0}
+
+        self.mongo.update_job_progress(job_id, 0, len(items))
+
+        async def feed() -> None:
+            for item in items:
+                await enrich_queue.put(item)
+
+        async def enrich() -> None:
+            while True:
+                # whatever is queued, up to one GraphQL batch
+                batch: List[RefreshItem] = [await enrich_queue.get()]
+                while len(batch) < GhApis.REPO_BATCH_SIZE and not enrich_queue.empty():
+                    batch.append(enrich_queue.get_nowait())
+
+                try:
+                    repos: List[str] = [item.repo for item in batch if item.repo]
+                    repo_infos: Dict[str, RepoInfo] = (
+                        {repo: RepoInfo(repo="", stars=0, forks=0) for repo in repos}
+                        if offline
+                        else await self._lookup_repos(repos, repo_lookups)
                     )
+                    for item in batch:
+                        try:
+                            report: VulnReport = self._process_advisory(
+                                item.advisory,
+                                item.repo,
+                                repo_infos.get(item.repo or ""),
+                            )
+                            await write_queue.put((item, report))
+                        except Exception as e:
+                            failed.add(item.advisory["ghsa_id"])
+                            progress["processed"] += 1
+                            self.logger.error(
+                                f"Error processing {item.advisory['ghsa_id']}: {e}"
+                            )
+                except Exception as e:
+                    failed.update(item.advisory["ghsa_id"] for item in batch)
+                    progress["processed"] += len(batch)
+                    self.logger.error(f"Error looking up repos: {e}")
+                finally:
+                    for _ in batch:
+                        enrich_queue.task_done()
 
-            for future in as_completed(futures):
+        writer: BulkWriter = self.mongo.get_vuln_report_writer(
+            self.write_batch_size, self.write_flush_interval, insert_only
+        )
+
+        async def record(summary: Optional[BulkWriteSummary]) -> None:
+            if not summary:
+                return
+
+            for report in summary.failed:
+                failed.add(report.ghsa)
+                self.logger.error(f"Error writing {report.ghsa}")
+
+            progress["processed"] += progress["buffered"]
+            progress["buffered"] = 0
+            await asyncio.to_thread(
+                self.mongo.update_job_progress,
+                job_id,
+                progress["processed"],
+                len(items),
+            )
+
+        async def write() -> None:
+            while True:
+                try:
+                    entry = await asyncio.wait_for(
+                        write_queue.get(), timeout=writer.flush_interval
+                    )
+                except asyncio.TimeoutError:
+                    if writer.is_due():
+                        await record(await asyncio.to_thread(writer.flush))
+                    continue
+
+                # sentinel, every enrich worker is done
+                if entry is None:
+                    return
+
+                _, report = entry
                 try:
-                    future.result()
+                    progress["buffered"] += 1
+                    await record(await asyncio.to_thread(writer.add, report))
                 except Exception as e:
-                    self.logger.error(f"Error processing vulnerability: {e}")
+                    failed.add(report.ghsa)
+                    self.logger.error(f"Error writing {report.ghsa}: {e}")
+                finally:
+                    write_queue.task_done()
 
-            self.logger.info(f"Upserted {count} GHSA entries into MongoDB")
-            self.mongo.update_job_status(job_id, JobStatus.DONE)
+        enrichers: List[asyncio.Task] = [
+            asyncio.create_task(enrich()) for _ in range(self.concurrency)
+        ]
+        # a single writer keeps one buffer, so batches stay large
+        writer_task: asyncio.Task = asyncio.create_task(write())
 
-    def _process_vuln_node(
-        self, ghsa: Dict[str, Any], vuln_node: Dict[str, Any], seen: Set[str]
-    ):
-        pkg: str = vuln_node["package"]["name"]
-        ecosystem: str = vuln_node["package"]["ecosystem"].lower()
-        repo_url: str = ghsa.get("source_code_location", "")
-        repo: Optional[str] = None
+        await feed()
+        await enrich_queue.join()
+        for enricher in enrichers:
+            enricher.cancel()
+        await asyncio.gather(*enrichers, return_exceptions=True)
 
-        if repo_url:
-            repo = repo_url.replace("https://github.com/", "")
+        await write_queue.put(None)
+        await writer_task
+        await record(await asyncio.to_thread(writer.flush))
 
-        if pkg in seen:
-            return
+        self.mongo.update_job_progress(job_id, progress["processed"], len(items))
+        return failed
 
-        seen.add(pkg)
+    def _get_refresh_items(self, advisories: List[Dict[str, Any]]) -> List[RefreshItem]:
+        """
+        One item per advisory, de-duplicated across the whole run.
+        """
+        items: List[RefreshItem] = []
+        seen: Set[str] = set()
 
-        report: VulnReport = self._process_package(ghsa, ecosystem, pkg, repo)
-        self.mongo.upsert_vuln_report_to_db(report)
+        for advisory in advisories:
+            if advisory["ghsa_id"] in seen:
+                continue
 
-    def _process_package(
-        self, advisory: Dict[str, Any], ecosystem: str, pkg: str, repo: Optional[str]
-    ) -> VulnReport:
-        cwes: List[Dict[str, Any]] = advisory.get("cwes", [])
+            seen.add(advisory["ghsa_id"])
+            items.append(RefreshItem(advisory, self._get_repo(advisory)))
+
+        return items
+
+    async def _lookup_repos(
+        self, repos: List[str], lookups: Dict[str, asyncio.Future]
+    ) -> Dict[str, RepoInfo]:
+        """
+        Repo info for the repos, looking up each repo once per run even when
+        several enrich workers need it at the same time.
+        """
+        loop = asyncio.get_running_loop()
+        new: List[str] = [repo for repo in dict.fromkeys(repos) if repo not in lookups]
+        for repo in new:
+            lookups[repo] = loop.create_future()
+
+        if new:
+            try:
+                fetched: Dict[str, RepoInfo] = await asyncio.to_thread(
+                    self.repo_cache.get_many, new
+                )
+            except Exception as e:
+                for repo in new:
+                    lookups.pop(repo).set_exception(e)
+                raise
+
+            for repo in new:
+                lookups[repo].set_result(fetched[repo])
+
+        return {repo: await lookups[repo] for repo in repos}
+
+    def _get_repo(self, advisory: Dict[str, Any]) -> Optional[str]:
+        repo_url: str = advisory.get("source_code_location", "")
+        return repo_url.replace("https://github.com/", "") if repo_url else None
+
+    def _get_changed_advisories(
+        self, advisories: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Drop advisories whose content is unchanged since they were last
+        processed.
+        """
+        stored: Dict[str, str] = self.mongo.get_advisory_hashes(
+            [adv["ghsa_id"] for adv in advisories]
+        )
+        return [
+            adv
+            for adv in advisories
+            if stored.get(adv["ghsa_id"]) != self._hash_advisory(adv)
+        ]
+
+    def _hash_advisory(self, advisory: Dict[str, Any]) -> str:
+        content: bytes = json.dumps(advisory, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(content).hexdigest()
+
+    def _resume_refresh(self, job_id: ObjectId, state: RefreshState) -> bool:
+        """
+        Fetch the rest of the feed an earlier refresh could not complete,
+        from the page it stopped at. Returns False if it stopped again, which
+        ends the job. A resume point that cannot be fetched at all is dropped,
+        the refresh then fetches the whole window again.
+        """
+        self.logger.info(f"Resuming the advisory feed at {state.resume_url}")
+        feed: Optional[GhsaFeed] = self.gh_apis.query_recent_ghsa(
+            state.resume_since, resume_url=state.resume_url  # type: ignore
+        )
+        if feed is None:
+            self.logger.warning("Could not resume the advisory feed, starting over")
+            # the ETag is of a first page whose older pages were never fetched
+            state.resume_url = state.resume_since = state.resume_high_water = None
+            state.etag = None
+            self.mongo.set_refresh_state(state)
+            return True
+
+        self.mongo.update_job_metrics(
+            job_id, {"resumed": len(feed.advisories), "resume_complete": False}
+        )
+        failed: Set[str] = self._ingest_advisories(job_id, feed.advisories)
+        if failed or feed.resume_url:
+            # failed advisories are fetched again from the same page next time
+            if not failed:
+                state.resume_url = feed.resume_url
+                self.mongo.set_refresh_state(state)
+
+            self.mongo.update_job_status(
+                job_id,
+                JobStatus.DONE,
+                f"Advisory feed incomplete, stopped at {state.resume_url}",
+            )
+            return False
+
+        # the earlier pages and the resumed ones cover the whole window
+        state.high_water = max(
+            state.resume_high_water or state.resume_since,  # type: ignore
+            state.high_water or state.resume_since,  # type: ignore
+        )
+        state.covered_since = min(
+            state.resume_since, state.covered_since or state.resume_since  # type: ignore
+        )
+        state.resume_url = state.resume_since = state.resume_high_water = None
+        self.mongo.set_refresh_state(state)
+        self.mongo.update_job_metrics(job_id, {"resume_complete": True})
+        return True
 
-        cwe_id: Optional[str] = None
-        cwe_title: Optional[str] = None
+    def _save_resume_point(
+        self, state: RefreshState, feed: GhsaFeed, since: str
+    ) -> None:
+        updated: List[str] = [
+            adv["updated_at"] for adv in feed.advisories if adv.get("updated_at")
+        ]
+        state.resume_url = feed.resume_url
+        state.resume_since = since
+        state.resume_high_water = max(updated + [since])
+        # the first page is complete, an unchanged feed needs no fetch
+        state.etag = feed.etag
+        self.mongo.set_refresh_state(state)
 
-        if cwes:
-            cwe_id = cwes[0]["cwe_id"] if cwes else None
-            cwe_title = cwes[0]["name"] if cwes else None
+    def _advance_refresh_state(
+        self, state: RefreshState, feed: GhsaFeed, since: str
+    ) -> None:
+        updated: List[str] = [
+            adv["updated_at"] for adv in feed.advisories if adv.get("updated_at")
+        ]
+        state.high_water = max(updated + [state.high_water or since])
+        state.covered_since = min(since, state.covered_since or since)
+        state.etag = feed.etag
+        self.mongo.set_refresh_state(state)
 
+    def _process_advisory(
+        self,
+        advisory: Dict[str, Any],
+        repo: Optional[str],
+        repo_info: Optional[RepoInfo] = None,
+    ) -> VulnReport:
         cve: Optional[str] = next(
             (i["value"] for i in advisory.get("identifiers", []) if i["type"] == "CVE"),
             None,
@@ -94,34 +464,58 @@ class Refresher:
         cvss: Optional[Dict[str, Any]] = self._get_cvss_score(
             advisory.get("cvss_severities", {})
         )
+        cvss_score: Optional[float] = None
+        cvss_vector: Optional[str] = None
         if cvss:
-            cvss_score: Optional[float] = cvss.get("score")
-            cvss_vector: Optional[str] = cvss.get("vectorString")
+            cvss_score = cvss.get("score")
+            cvss_vector = cvss.get("vectorString")
 
         stars: Optional[int] = None
         forks: Optional[int] = None
 
-        if repo:
-            repo_info: RepoInfo = self.gh_apis.query_repo_info(ecosystem, repo)
-
+        # repo_info comes from the enrich stage, which looked up every repo
+        if repo and repo_info:
             stars = repo_info.stars if repo_info.stars else None
             forks = repo_info.forks if repo_info.forks else None
 
         return VulnReport(
-            package=pkg,
+            ghsa=advisory["ghsa_id"],
             repo=repo,
-            ecosystem=ecosystem,
             title=advisory["summary"],
-            ghsa=advisory["ghsa_id"],
             cve=cve,
+            cwes=[
+                Cwe(cwe["cwe_id"], cwe["name"])
+                for cwe in advisory.get("cwes", [])
+                if cwe.get("cwe_id") and cwe.get("name")
+            ],
             stars=stars,
             forks=forks,
             severity=severity,
             cvss_score=cvss_score,
             cvss_vector=cvss_vector,
-            cwe=Cwe(cwe_id, cwe_title) if (cwe_id and cwe_title) else None,
+            affected=self._get_affected_packages(advisory),
+            published_at=advisory.get("published_at"),
+            updated_at=advisory.get("updated_at"),
         )
 
+    def _get_affected_packages(self, advisory: Dict[str, Any]) -> List[AffectedPackage]:
+        """
+        Every package and version range the advisory lists, without repeats.
+        A package can be listed once per vulnerable range.
+        """
+        affected: List[AffectedPackage] = []
+        for vuln in advisory.get("vulnerabilities", []):
+            package = AffectedPackage(
+                ecosystem=vuln["package"]["ecosystem"].lower(),
+                package=vuln["package"]["name"],
+                vulnerable_version_range=vuln.get("vulnerable_version_range"),
+                first_patched_version=vuln.get("first_patched_version"),
+            )
+            if package not in affected:
+                affected.append(package)
+
+        return affected
+
     def _get_cvss_score(self, cvss: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         if not cvss:
             return None
@@ -0,0 +1,53 @@
+import logging
+from typing import Any, Dict, List, Optional
+
+from models.data_models import RepoInfo
+from utils.mongo_utils import MongoUtils
+
+from .gh_apis import GhApis
+
+logging.basicConfig(level=logging.INFO)
+
+
+class RepoInfoCache:
+    """
+    Stars and forks of repos, cached in MongoDB so lookups are shared by every
+    refresh and every gunicorn worker. Repos that do not exist are cached too,
+    for a shorter time.
+    """
+
+    CACHE_NAME = "repo_info"
+
+    def __init__(
+        self, config: Dict[str, Any], gh_apis: GhApis, mongo: MongoUtils
+    ) -> None:
+        self.gh_apis = gh_apis
+        self.mongo = mongo
+        self.logger = logging.getLogger(__name__)
+
+        refresher_config: Dict[str, Any] = config.get("refresher", {})
+        self.ttl: int = refresher_config.get("repo_cache_ttl", 86400)
+        self.negative_ttl: int = refresher_config.get("repo_cache_negative_ttl", 3600)
+
+    def get_many(self, repos: List[str]) -> Dict[str, RepoInfo]:
+        """
+        Repo info for every repo, from the cache where it is fresh and from
+        GitHub otherwise. Repos that cannot be found map to an empty RepoInfo.
+        """
+        unique: List[str] = list(dict.fromkeys(repos))
+        infos: Dict[str, Optional[RepoInfo]] = self.mongo.get_cached_repo_infos(unique)
+
+        missing: List[str] = [repo for repo in unique if repo not in infos]
+        if missing:
+            fetched: Dict[str, Optional[RepoInfo]] = self.gh_apis.lookup_repos(missing)
+            self.mongo.cache_repo_infos(fetched, self.ttl, self.negative_ttl)
+            infos.update(fetched)
+
+        hits: int = len(unique) - len(missing)
+        self.mongo.inc_cache_stats(self.CACHE_NAME, hits, len(missing))
+        self.logger.info(f"Repo info cache: {hits} hits, {len(missing)} misses")
+
+        return {
+            repo: infos.get(repo) or RepoInfo(repo="", stars=0, forks=0)
+            for repo in unique
+        }
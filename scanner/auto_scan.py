@@ -0,0 +1,140 @@
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from models.response_models import JobResponse
+from utils.git_utils import get_remote_head
+from utils.mongo_utils import MongoUtils
+
+logging.basicConfig(level=logging.INFO)
+
+
+class AutoScanQueue:
+    """
+    Queues scans of the repos affected by newly ingested advisories. Each
+    repo gets a priority from the worst CVSS score and severity among its new
+    advisories, its stars and forks, and how long ago it was last scanned.
+    A repo scanned within `rescan_after` whose remote HEAD is still the
+    commit that was scanned is skipped.
+    """
+
+    SEVERITY_RANK = {"critical": 4, "high": 3, "medium": 2, "moderate": 2, "low": 1}
+    # weight of each priority component, the components are scaled to 0..1
+    WEIGHTS = {"cvss": 4, "severity": 2, "popularity": 2, "staleness": 2}
+    POPULARITY_SCALE = 5  # log10(stars + forks) at which popularity maxes out
+    STALENESS_DAYS = 30  # days since the last scan at which staleness maxes out
+
+    def __init__(self, config: Dict[str, Any], mongo: MongoUtils) -> None:
+        self.mongo = mongo
+        self.logger = logging.getLogger(__name__)
+
+        autoscan_config: Dict[str, Any] = config.get("autoscan", {})
+        self.enabled: bool = autoscan_config.get("enabled", False)
+        self.max_enqueue: int = autoscan_config.get("max_enqueue", 200)
+        self.rescan_after: int = autoscan_config.get("rescan_after", 7 * 86400)
+        self.ls_remote_concurrency: int = autoscan_config.get(
+            "ls_remote_concurrency", 8
+        )
+
+    def enqueue(self, ghsas: List[str]) -> int:
+        """
+        Queue scans for the repos of the advisories, up to max_enqueue of the
+        highest priority. Returns the number of jobs added.
+        """
+        reports_by_repo: Dict[str, List[Dict[str, Any]]] = {}
+        for report in self.mongo.get_vuln_reports(ghsas):
+            if report.get("repo"):
+                reports_by_repo.setdefault(report["repo"], []).append(report)
+
+        if not reports_by_repo:
+            return 0
+
+        latest_scans: Dict[str, Dict[str, Any]] = self.mongo.get_latest_scans(
+            list(reports_by_repo)
+        )
+        now: float = time.time()
+
+        candidates: List[Tuple[float, str]] = sorted(
+            (
+                (self.get_priority(reports, latest_scans.get(repo), now), repo)
+                for repo, reports in reports_by_repo.items()
+            ),
+            reverse=True,
+        )
+        queued: Set[str] = self.mongo.get_queued_scan_repos(
+            [self.get_repo_url(repo) for _, repo in candidates]
+        )
+        candidates = [
+            (priority, repo)
+            for priority, repo in candidates
+            if self.get_repo_url(repo) not in queued
+        ][: self.max_enqueue]
+
+        # only repos scanned recently can be skipped, ask the remote for those
+        recent: List[str] = [
+            repo
+            for _, repo in candidates
+            if repo in latest_scans
+            and now - latest_scans[repo]["timestamp"] < self.rescan_after
+        ]
+        with ThreadPoolExecutor(max_workers=self.ls_remote_concurrency) as executor:
+            heads: Dict[str, Optional[str]] = dict(
+                zip(
+                    recent,
+                    executor.map(
+                        get_remote_head, [self.get_repo_url(repo) for repo in recent]
+                    ),
+                )
+            )
+
+        jobs: List[JobResponse] = [
+            JobResponse(self.get_repo_url(repo), auto=True, priority=round(priority, 3))
+            for priority, repo in candidates
+            if not (heads.get(repo) and heads[repo] == latest_scans[repo]["commit"])
+        ]
+        added: int = self.mongo.enqueue_auto_scans(jobs)
+
+        self.logger.info(
+            f"Auto-scan: {len(reports_by_repo)} affected repos, {len(queued)} "
+            f"already queued, {len(candidates) - len(jobs)} unchanged since their "
+            f"last scan, {added} queued"
+        )
+        return added
+
+    def get_priority(
+        self,
+        reports: List[Dict[str, Any]],
+        latest_scan: Optional[Dict[str, Any]],
+        now: float,
+    ) -> float:
+        cvss: float = max((report.get("cvss_score") or 0) for report in reports) / 10
+        severity: float = (
+            max(
+                self.SEVERITY_RANK.get(str(report.get("severity")).lower(), 0)
+                for report in reports
+            )
+            / 4
+        )
+        # stars and forks are those of the repo, the same on every report
+        reach: int = max(
+            (report.get("stars") or 0) + (report.get("forks") or 0)
+            for report in reports
+        )
+        popularity: float = min(math.log10(1 + reach) / self.POPULARITY_SCALE, 1)
+        staleness: float = (
+            min((now - latest_scan["timestamp"]) / (self.STALENESS_DAYS * 86400), 1)
+            if latest_scan
+            else 1
+        )
+
+        return (
+            self.WEIGHTS["cvss"] * cvss
+            + self.WEIGHTS["severity"] * severity
+            + self.WEIGHTS["popularity"] * popularity
+            + self.WEIGHTS["staleness"] * staleness
+        )
+
+    def get_repo_url(self, repo: str) -> str:
+        return f"https://github.com/{repo}"
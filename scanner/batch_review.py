@@ -0,0 +1,287 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import (FIRST_COMPLETED, Future, ThreadPoolExecutor,
+                                wait)
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from bson import ObjectId
+
+from models.data_models import FindingForReview, ReviewFilters
+from models.enums import JobStatus, ReviewError
+from models.response_models import ReviewResponse
+from utils.mongo_utils import MongoUtils
+
+from .gemini_ops import ReviewClient
+from .scan import Scanner
+
+logging.basicConfig(level=logging.INFO)
+
+
+class TokenBudget:
+    """
+    Token bucket refilled continuously up to `per_minute`. acquire blocks
+    until the tokens are available, so a burst can spend a full minute's
+    budget and then settles to the rate. A budget of 0 is unlimited.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity: float = per_minute
+        self.rate: float = per_minute / 60
+        self._tokens: float = per_minute
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float) -> float:
+        """
+        Take tokens from the budget, waiting for them if needed. Requests
+        larger than the whole budget wait for a full bucket. Returns the
+        seconds waited.
+        """
+        if not self.capacity:
+            return 0
+
+        tokens = min(tokens, self.capacity)
+        waited: float = 0
+        while True:
+            with self._lock:
+                now: float = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay: float = (tokens - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+
+class ReviewRun:
+    """
+    One batch review job's client: the configured client held to the job's
+    own tokens and requests per minute budget, retried with exponential
+    backoff on errors and empty answers. Counts the job's reviews, retries
+    and spent budget.
+    """
+
+    CHARS_PER_TOKEN = 4
+    # prompt template and the JSON verdict, in tokens
+    PROMPT_OVERHEAD = 300
+
+    def __init__(self, client: ReviewClient, review_config: Dict[str, Any]) -> None:
+        self.client = client
+        self.logger = logging.getLogger(__name__)
+
+        self.max_retries: int = review_config.get("max_retries", 5)
+        self.backoff_base: float = review_config.get("backoff_base", 2)
+        self.backoff_max: float = review_config.get("backoff_max", 60)
+        self.tokens: TokenBudget = TokenBudget(
+            review_config.get("tokens_per_minute", 250_000)
+        )
+        self.requests: TokenBudget = TokenBudget(
+            review_config.get("requests_per_minute", 0)
+        )
+
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "reviewed": 0,
+            "cached": 0,
+            "true_positives": 0,
+            "failed": 0,
+            "retries": 0,
+            "tokens_estimated": 0,
+            "budget_wait_seconds": 0,
+        }
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    @property
+    def prompt_version(self) -> int:
+        return self.client.prompt_version
+
+    def review(self, finding: FindingForReview, file: List[str]) -> ReviewResponse:
+        tokens: int = self.estimate_tokens(finding, file)
+
+        attempt: int = 0
+        while True:
+            waited: float = self.requests.acquire(1) + self.tokens.acquire(tokens)
+            self._add("tokens_estimated", tokens)
+            self._add("budget_wait_seconds", waited)
+
+            reason: str = "no answer"
+            try:
+                response: ReviewResponse = self.client.review(finding, file)
+            except RuntimeError as e:
+                if attempt >= self.max_retries:
+                    raise
+                reason = str(e)
+            else:
+                if (
+                    response.error != ReviewError.NO_ANSWER
+                    or attempt >= self.max_retries
+                ):
+                    return response
+
+            delay: float = self._backoff(attempt)
+            self.logger.warning(
+                f"Review of {finding.rule_id} failed ({reason}), retrying in {delay:.1f}s"
+            )
+            self._add("retries", 1)
+            time.sleep(delay)
+            attempt += 1
+
+    def record(self, response: ReviewResponse) -> None:
+        """
+        Count the outcome of one finding's review.
+        """
+        if response.error or not response.review:
+            self._add("failed", 1)
+        else:
+            self._add("reviewed", 1)
+            self._add("cached", int(response.cached))
+            self._add("true_positives", int(response.review.verdict))
+
+    def get_stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                key: round(value, 3) if isinstance(value, float) else value
+                for key, value in self._stats.items()
+            }
+
+    def estimate_tokens(self, finding: FindingForReview, file: List[str]) -> int:
+        chars: int = (
+            len(finding.rule_id)
+            + len(finding.snippet)
+            + len(finding.description)
+            + sum(len(line) for line in file)
+        )
+        return self.PROMPT_OVERHEAD + chars // self.CHARS_PER_TOKEN
+
+    def _add(self, key: str, value: float) -> None:
+        with self._lock:
+            self._stats[key] += value
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+
+class BatchReviewer:
+    """
+    Reviews the findings of a scan as a job, a bounded number at a time.
+    Jobs run on a fixed pool of `max_jobs` threads, the rest wait as pending.
+    Each job has its own ReviewRun, so budgets and counts are per job.
+    Progress is written to the job as the reviews complete.
+
+    The model client is GeminiOps unless another ReviewClient is given.
+    """
+
+    PROGRESS_INTERVAL = 2  # seconds between progress writes
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        scanner: Scanner,
+        mongo: MongoUtils,
+        client: Optional[ReviewClient] = None,
+    ) -> None:
+        self.scanner = scanner
+        self.mongo = mongo
+        self.client: Optional[ReviewClient] = client or scanner.gemini_ops
+        self.logger = logging.getLogger(__name__)
+
+        self.review_config: Dict[str, Any] = config.get("review", {})
+        self.concurrency: int = self.review_config.get("concurrency", 4)
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.review_config.get("max_jobs", 1),
+            thread_name_prefix="batch-review",
+        )
+
+    def submit(self, job_id: ObjectId, scan_id: str, filters: ReviewFilters) -> Future:
+        """
+        Queue a review job. It stays pending until a job thread is free.
+        """
+        return self.executor.submit(self.run, job_id, scan_id, filters)
+
+    def run(self, job_id: ObjectId, scan_id: str, filters: ReviewFilters) -> None:
+        """
+        Review every finding of the scan that matches the filters and record
+        the outcome on the job.
+        """
+        self.mongo.update_job_status(job_id, JobStatus.RUNNING)
+        start: float = time.monotonic()
+
+        try:
+            fingerprints: List[str] = self.mongo.get_review_fingerprints(
+                scan_id, filters
+            )
+            self.mongo.update_job_metrics(job_id, {"scan_id": scan_id})
+            self.mongo.update_job_progress(job_id, 0, len(fingerprints))
+
+            stats: Dict[str, float] = self.review_all(job_id, scan_id, fingerprints)
+        except Exception as e:
+            self.logger.error(f"Batch review of scan {scan_id} failed: {e}")
+            self.mongo.update_job_status(job_id, JobStatus.ERROR, str(e))
+            return
+
+        self.mongo.update_job_metrics(
+            job_id, {**stats, "seconds": round(time.monotonic() - start, 3)}
+        )
+        self.mongo.update_job_status(job_id, JobStatus.DONE)
+        self.logger.info(f"Batch review of scan {scan_id} complete: {stats}")
+
+    def review_all(
+        self, job_id: ObjectId, scan_id: str, fingerprints: List[str]
+    ) -> Dict[str, float]:
+        """
+        Review the findings with at most `concurrency` in flight. Returns the
+        counts of reviews, verdicts, failures and retries.
+        """
+        run: ReviewRun = ReviewRun(self.client, self.review_config)  # type: ignore
+        processed: int = 0
+        reported_at: float = time.monotonic()
+        remaining: Iterator[str] = iter(fingerprints)
+        pending: Set[Future] = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                # only a window of findings is submitted at a time
+                for fingerprint in remaining:
+                    pending.add(
+                        executor.submit(self.review_one, run, scan_id, fingerprint)
+                    )
+                    if len(pending) >= self.concurrency * 2:
+                        break
+
+                if not pending:
+                    break
+
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    future.result()
+                processed += len(done)
+
+                if time.monotonic() - reported_at >= self.PROGRESS_INTERVAL:
+                    self.mongo.update_job_progress(job_id, processed, len(fingerprints))
+                    reported_at = time.monotonic()
+
+        self.mongo.update_job_progress(job_id, processed, len(fingerprints))
+        return run.get_stats()
+
+    def review_one(self, run: ReviewRun, scan_id: str, fingerprint: str) -> None:
+        try:
+            response: ReviewResponse = self.scanner.review(
+                scan_id, fingerprint, client=run
+            )
+        except Exception as e:
+            self.logger.error(f"Review of {scan_id}:{fingerprint} failed: {e}")
+            response = ReviewResponse(ReviewError.REVIEW_FAIL)
+
+        run.record(response)
@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import List, Protocol
 
 from google import genai
 
@@ -9,7 +9,25 @@ from models.response_models import GeminiReview, ReviewError, ReviewResponse
 logging.basicConfig(level=logging.INFO)
 
 
+class ReviewClient(Protocol):
+    """
+    Reviews one finding. Implemented by GeminiOps, and by stand-ins for it.
+    Reviews are cached per model and prompt version.
+    """
+
+    @property
+    def model(self) -> str: ...
+
+    @property
+    def prompt_version(self) -> int: ...
+
+    def review(self, finding: FindingForReview, file: List[str]) -> ReviewResponse: ...
+
+
 class GeminiOps:
+    # bump when the prompt changes, so cached reviews are not reused
+    prompt_version: int = 1
+
     def __init__(self, api_key: str, model: str) -> None:
         self.api_key = api_key
         self.logger = logging.getLogger(__name__)
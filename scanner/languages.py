@@ -0,0 +1,29 @@
+from typing import Dict, List
+
+# File patterns per language, keyed by the lowercased scc language name, which
+# is also the name of the language's directory under semgrep_rules_dir.
+LANGUAGE_FILE_PATTERNS: Dict[str, List[str]] = {
+    "c": ["*.c", "*.h"],
+    "dockerfile": ["Dockerfile", "*.dockerfile"],
+    "elixir": ["*.ex", "*.exs"],
+    "go": ["*.go"],
+    "html": ["*.html", "*.htm"],
+    "java": ["*.java"],
+    "javascript": ["*.js", "*.jsx", "*.mjs", "*.cjs"],
+    "json": ["*.json"],
+    "kotlin": ["*.kt", "*.kts"],
+    "ocaml": ["*.ml", "*.mli"],
+    "php": ["*.php"],
+    "python": ["*.py", "*.pyi"],
+    "ruby": ["*.rb"],
+    "rust": ["*.rs"],
+    "scala": ["*.scala"],
+    "solidity": ["*.sol"],
+    "swift": ["*.swift"],
+    "terraform": ["*.tf"],
+    "typescript": ["*.ts", "*.tsx"],
+    "yaml": ["*.yml", "*.yaml"],
+}
+
+# Third party code that is never worth checking out for a scan
+VENDOR_DIRS: List[str] = ["vendor", "node_modules", "third_party", "bower_components"]
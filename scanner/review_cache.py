@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional
+
+from models.data_models import FindingForReview
+from utils.mongo_utils import MongoUtils
+
+from .gemini_ops import ReviewClient
+
+logging.basicConfig(level=logging.INFO)
+
+
+class ReviewCache:
+    """
+    AI reviews cached in MongoDB by what the model was asked: the model and
+    prompt version, the rule, the snippet and the content of the file. The
+    same finding in a re-scan, a fork or a vendored copy of the file gets the
+    earlier verdict without another request. Entries expire after `ttl`.
+    """
+
+    CACHE_NAME = "ai_review"
+
+    def __init__(self, config: Dict[str, Any], mongo: MongoUtils) -> None:
+        self.mongo = mongo
+        self.logger = logging.getLogger(__name__)
+
+        review_config: Dict[str, Any] = config.get("review", {})
+        self.enabled: bool = review_config.get("cache", True)
+        self.ttl: int = review_config.get("cache_ttl", 30 * 86400)
+
+    def get_key(
+        self, client: ReviewClient, finding: FindingForReview, file: List[str]
+    ) -> str:
+        digest = hashlib.sha256()
+        for line in file:
+            digest.update(line.encode("utf-8"))
+
+        source: str = json.dumps(
+            [
+                client.model,
+                client.prompt_version,
+                finding.rule_id,
+                finding.description,
+                finding.snippet.strip(),
+                digest.hexdigest(),
+            ]
+        )
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Cached review for the key, counting the hit or miss.
+        """
+        if not self.enabled:
+            return None
+
+        review: Optional[Dict[str, Any]] = self.mongo.get_cached_review(key)
+        self.mongo.inc_cache_stats(self.CACHE_NAME, int(bool(review)), int(not review))
+        return review
+
+    def put(self, key: str, review: Dict[str, Any], client: ReviewClient) -> None:
+        if self.enabled:
+            self.mongo.cache_review(key, review, client.model, self.ttl)
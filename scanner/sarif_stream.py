@@ -0,0 +1,160 @@
+import json
+from pathlib import Path
+from typing import IO, Any, Dict, Iterator, List, Tuple
+
+WHITESPACE = " \t\n\r"
+VALUE_TERMINATORS = WHITESPACE + ",:]}"
+
+
+class SarifReader:
+    """
+    Reads a SARIF file incrementally. Results are yielded one at a time while
+    everything else (top level fields, tool, invocations, ...) is kept as the
+    envelope, so memory use does not grow with the number of results.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.document: Dict[str, Any] = {}
+        self.runs: List[Dict[str, Any]] = []
+        self._decoder = json.JSONDecoder()
+        self._file: IO[str]
+        self._buf: str = ""
+        self._pos: int = 0
+        self._eof: bool = False
+
+    @property
+    def envelope(self) -> Dict[str, Any]:
+        """
+        The SARIF document without results. Only complete once iter_results
+        has been exhausted.
+        """
+        return {**self.document, "runs": self.runs}
+
+    def iter_results(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yields (run index, result) for every result in the file.
+        """
+        with open(self.path, "r", encoding="utf-8") as f:
+            self._file = f
+            self._buf, self._pos, self._eof = "", 0, False
+
+            self._expect("{")
+            for key in self._iter_keys():
+                if key == "runs":
+                    yield from self._read_runs()
+                else:
+                    self.document[key] = self._read_value()
+
+    def _read_runs(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        self._expect("[")
+        for index in self._iter_items():
+            run: Dict[str, Any] = {}
+            self._expect("{")
+            for key in self._iter_keys():
+                if key == "results":
+                    self._expect("[")
+                    for _ in self._iter_items():
+                        yield index, self._read_value()
+                else:
+                    run[key] = self._read_value()
+            self.runs.append(run)
+
+    def _iter_keys(self) -> Iterator[str]:
+        """
+        Yields the keys of the object whose opening brace was just consumed.
+        The caller must consume each key's value before asking for the next.
+        """
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key: str = self._read_value()
+            self._expect(":")
+            yield key
+            if not self._next_item("}"):
+                return
+
+    def _iter_items(self) -> Iterator[int]:
+        """
+        Yields the index of each element of the array whose opening bracket
+        was just consumed. The caller must consume each element.
+        """
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        index: int = 0
+        while True:
+            yield index
+            index += 1
+            if not self._next_item("]"):
+                return
+
+    def _next_item(self, closing: str) -> bool:
+        ch: str = self._peek()
+        self._pos += 1
+        if ch == ",":
+            return True
+        if ch == closing:
+            return False
+        raise ValueError(f"Malformed SARIF in {self.path}: unexpected {ch!r}")
+
+    def _expect(self, expected: str) -> None:
+        ch: str = self._peek()
+        if ch != expected:
+            raise ValueError(
+                f"Malformed SARIF in {self.path}: expected {expected!r}, got {ch!r}"
+            )
+        self._pos += 1
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise ValueError(f"Unexpected end of SARIF in {self.path}")
+
+    def _read_value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+
+            # a number cut off by the end of the buffer may continue in the
+            # next chunk, e.g. "1500" followed by ".5"
+            incomplete: bool = (
+                end == len(self._buf) or self._buf[end] not in VALUE_TERMINATORS
+            )
+            if incomplete and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def _fill(self) -> bool:
+        """
+        Read more of the file into the buffer, dropping what was consumed.
+        Reads at least as much as is buffered so large values are decoded in
+        a logarithmic number of attempts.
+        """
+        if self._eof:
+            return False
+
+        chunk: str = self._file.read(max(self.CHUNK_SIZE, len(self._buf) - self._pos))
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buf = self._buf[self._pos :] + chunk
+        self._pos = 0
+        return True
@@ -1,30 +1,44 @@
 import hashlib
+import itertools
 import json
 import logging
 import os
 import re
 import shutil
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import asdict
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 import git
 from bson import ObjectId
 
 from models.data_models import FindingForReview, LocationFromSarif
-from models.enums import JobStatus
-from models.response_models import (FileError, FileResponse, ReviewError,
-                                    ReviewResponse)
+from models.enums import CloneStrategy, JobStatus
+from models.response_models import (FileError, FileResponse, GeminiReview,
+                                    ReviewError, ReviewResponse)
+from utils.git_utils import get_remote_head
 from utils.mongo_utils import MongoUtils
 
-from .gemini_ops import GeminiOps
+from .gemini_ops import GeminiOps, ReviewClient
+from .languages import LANGUAGE_FILE_PATTERNS, VENDOR_DIRS
+from .review_cache import ReviewCache
+from .sarif_stream import SarifReader
+from .suppression import SuppressionMatcher
 
 logging.basicConfig(level=logging.INFO)
 
 
 class Scanner:
+    # above this many changed files an incremental scan falls back to a full scan
+    INCREMENTAL_MAX_CHANGED_FILES = 1000
+    # bumped when generate_fingerprint changes, so cached scans are not reused
+    FINGERPRINT_VERSION = 2
+
     def __init__(self, config: Dict[str, Any], mongo: MongoUtils) -> None:
         self.config = config
         self.mongo = mongo
@@ -42,6 +56,24 @@ class Scanner:
         self.suppress_rules: List[str] = self.config["settings"].get(
             "suppress_rules", []
         )
+        self.suppress_patterns: List[str] = self.config["settings"].get(
+            "suppress_patterns", []
+        )
+        # per repo suppression settings, replacing the global ones key by key
+        self.repo_overrides: Dict[str, Dict[str, Any]] = self.config["settings"].get(
+            "repo_overrides", {}
+        )
+        self.suppression: SuppressionMatcher = SuppressionMatcher.from_settings(
+            self.config["settings"]
+        )
+        self._repo_suppressions: Dict[str, SuppressionMatcher] = {}
+        # semgrep prefixes rule ids with the rules directory path
+        self.rules_path_prefix: str = (
+            ".".join(self.semgrep_rules_dir.parts[1:])
+            if self.semgrep_rules_dir.is_absolute()
+            else ".".join(self.semgrep_rules_dir.parts)
+        )
+        self._rule_id_prefix: str = self.rules_path_prefix + "."
         if self.config["tokens"]["gemini_api_key"]:
             self.gemini_ops = GeminiOps(
                 self.config["tokens"]["gemini_api_key"],
@@ -49,6 +81,32 @@ class Scanner:
             )
         else:
             self.gemini_ops = None
+        self.review_cache: ReviewCache = ReviewCache(config, mongo)
+        # reuse the previous checkout and only scan files changed since the last scan
+        self.incremental_scan: bool = self.config["settings"].get(
+            "incremental_scan", False
+        )
+        self.clone_strategy: CloneStrategy = CloneStrategy(
+            self.config["settings"].get("clone_strategy", CloneStrategy.FULL.value)
+        )
+        self.sparse_checkout: bool = self.config["settings"].get(
+            "sparse_checkout", False
+        )
+        # number of semgrep processes that can run concurrently for a scan
+        self.semgrep_jobs: int = self.config["settings"].get("semgrep_jobs", 1)
+        # results are written to mongo in batches of this size while streaming
+        self.ingest_batch_size: int = self.config["settings"].get(
+            "ingest_batch_size", 500
+        )
+        # reuse the findings of an earlier scan of the same commit, rules and settings
+        self.scan_cache: bool = self.config["settings"].get("scan_cache", True)
+        # copy suppressions and AI reviews of the previous scan to matching findings
+        self.carry_forward_triage: bool = self.config["settings"].get(
+            "carry_forward_triage", True
+        )
+        self._rules_signature: Optional[int] = None
+        self._rules_hash: Optional[str] = None
+        self._semgrep_version: Optional[str] = None
         if not self.clone_base_dir.exists():
             os.makedirs(self.clone_base_dir, exist_ok=True)
 
@@ -61,20 +119,102 @@ class Scanner:
         repo_name: str = f"{repo_url.split("/")[-2]}/{repo_url.split("/")[-1]}"
 
         try:
-            # Clone the repo
-            repo_path: Path = self.clone_repo(repo_url)
-            # Run semgrep (writing output to file as before)
-            output: str = self.run_semgrep(repo_path)
-            cleaned_output: Dict[str, Any] = self.clean_sarif(json.loads(output))
+            cache_key: Optional[Dict[str, str]] = (
+                self.get_cache_key(repo_name)
+                if self.scan_cache or self.incremental_scan
+                else None
+            )
+            if self.scan_cache and self.run_cached_scan(
+                job_id, repo_url, repo_name, cache_key  # type: ignore
+            ):
+                return
 
-            repo_file_path: str = repo_path.name
+            previous_scan: Optional[Dict[str, Any]] = (
+                self.mongo.get_latest_scan(repo_name) if self.incremental_scan else None
+            )
+            if previous_scan and not self.is_same_setup(previous_scan, cache_key):
+                # new or edited rules have to run on the unchanged files too
+                self.logger.info(
+                    f"Rules or settings changed since the last scan of {repo_name}, "
+                    "running a full scan"
+                )
+                previous_scan = None
+
+            # Clone the repo, or fetch into the existing checkout
+            clone_dir: Path = self.get_clone_dir(repo_url)
+            objects_before: int = self.get_git_objects_size(clone_dir)
+            clone_start: float = time.monotonic()
+
+            repo_path, fetched = self.clone_repo(repo_url)
+            if not fetched:
+                # the old checkout was deleted, everything was downloaded
+                objects_before = 0
+
+            self.mongo.update_job_metrics(
+                job_id,
+                {
+                    "clone_strategy": self.clone_strategy.value,
+                    "sparse_checkout": self.sparse_checkout,
+                    "clone_seconds": round(time.monotonic() - clone_start, 3),
+                    "clone_bytes": max(
+                        self.get_git_objects_size(repo_path) - objects_before, 0
+                    ),
+                    "checkout_bytes": self.get_worktree_size(repo_path),
+                },
+            )
+            commit: Optional[str] = self.get_head_commit(repo_path)
 
-            self.mongo.add_scan_result_to_db(repo_name, cleaned_output)
+            changed_files: Optional[Set[str]] = None
+            if previous_scan:
+                changed_files = self.get_changed_files(
+                    repo_path, previous_scan["commit"]
+                )
+
+            with tempfile.TemporaryDirectory(prefix="paladin-semgrep-") as tmp_dir:
+                output_dir: Path = Path(tmp_dir)
+                carried_results: Iterable[Dict[str, Any]] = []
+                base_envelopes: List[Dict[str, Any]] = []
+
+                if changed_files is None:
+                    # Run semgrep, writing SARIF output to files
+                    sarif_files: List[Path] = self.run_semgrep(repo_path, output_dir)
+                else:
+                    targets: List[Path] = [
+                        repo_path / f
+                        for f in sorted(changed_files)
+                        if (repo_path / f).is_file()
+                    ]
+                    self.logger.info(
+                        f"Incremental scan of {repo_path}: {len(targets)} changed files"
+                    )
+                    sarif_files = (
+                        self.run_semgrep(repo_path, output_dir, targets=targets)
+                        if targets
+                        else []
+                    )
+
+                    carried_results = self.get_carried_results(
+                        previous_scan, repo_path, changed_files  # type: ignore
+                    )
+                    base_envelopes = [
+                        self.get_envelope(previous_scan["scan_result"])  # type: ignore
+                    ]
+
+                scan_id, findings_count = self.ingest_sarif(
+                    repo_name,
+                    commit,
+                    sarif_files,
+                    carried_results,
+                    base_envelopes,
+                    cache_key,
+                    job_id,
+                )
 
-            self.write_sarif_to_file(cleaned_output, repo_file_path)
+            self.write_sarif_to_file(scan_id, repo_path.name)
 
-            # Delete if no findings
-            self.delete_repo_if_no_findings(repo_path, cleaned_output)
+            # Delete if no findings, unless the checkout is reused by the next scan
+            if not self.incremental_scan:
+                self.delete_repo_if_no_findings(repo_path, findings_count)
 
             # Mark job done
             self.mongo.update_job_status(job_id, JobStatus.DONE)
@@ -84,26 +224,314 @@ class Scanner:
             self.mongo.update_job_status(job_id, JobStatus.ERROR, str(e))
             self.logger.error(f"Scan failed for {repo_name} with error {e}")
 
+    def run_cached_scan(
+        self,
+        job_id: ObjectId,
+        repo_url: str,
+        repo_name: str,
+        cache_key: Dict[str, str],
+    ) -> bool:
+        """
+        Complete the job with a copy of an earlier scan of the remote HEAD,
+        without cloning. Returns False if there is no such scan.
+        """
+        head: Optional[str] = get_remote_head(repo_url)
+        cached_id: Optional[ObjectId] = (
+            self.mongo.find_cached_scan(repo_name, head, cache_key) if head else None
+        )
+        self.mongo.inc_cache_stats(
+            "scan_results", int(bool(cached_id)), int(not cached_id)
+        )
+        self.mongo.update_job_metrics(job_id, {"cache_hit": bool(cached_id)})
+        if not cached_id:
+            return False
+
+        scan_id: ObjectId = self.mongo.copy_scan(cached_id, job_id=job_id)
+        self.mongo.update_job_metrics(job_id, {"cached_scan_id": str(cached_id)})
+        self.write_sarif_to_file(scan_id, self.get_clone_dir(repo_url).name)
+
+        self.mongo.update_job_status(job_id, JobStatus.DONE)
+        self.logger.info(f"Scan of {repo_name} at {head} reused scan {cached_id}")
+        return True
+
+    def is_same_setup(
+        self, scan: Dict[str, Any], cache_key: Optional[Dict[str, str]]
+    ) -> bool:
+        """
+        Whether the scan ran with the rules and settings of the cache key.
+        Scans that did not record them never match.
+        """
+        return bool(cache_key) and all(
+            scan.get(field) == value for field, value in cache_key.items()  # type: ignore
+        )
+
+    def get_cache_key(self, repo_name: str) -> Dict[str, str]:
+        """
+        Hashes of everything besides the commit that decides a scan's
+        findings: the rules, and the settings and semgrep version.
+        """
+        settings: Dict[str, Any] = {
+            "suppress_paths": self.suppress_paths,
+            "suppress_rules": self.suppress_rules,
+            "suppress_patterns": self.suppress_patterns,
+            "repo_overrides": self.repo_overrides.get(repo_name),
+            "exclude_langs": sorted(self.exclude_langs or []),
+            "sparse_checkout": self.sparse_checkout,
+            "semgrep": self.get_semgrep_version(),
+            "fingerprint": self.FINGERPRINT_VERSION,
+        }
+        return {
+            "rules_hash": self.get_rules_hash(),
+            "config_hash": hashlib.sha256(
+                json.dumps(settings, sort_keys=True).encode("utf-8")
+            ).hexdigest(),
+        }
+
+    def get_rules_hash(self) -> str:
+        """
+        Hash of the path and content of every file under the rules directory.
+        Files are only read again when one was added, removed or modified.
+        """
+        files: List[Path] = sorted(
+            path
+            for path in self.semgrep_rules_dir.rglob("*")
+            if path.is_file()
+            and ".git" not in path.relative_to(self.semgrep_rules_dir).parts
+        )
+        signature: int = hash(
+            tuple(
+                (str(path), path.stat().st_size, path.stat().st_mtime_ns)
+                for path in files
+            )
+        )
+        if signature == self._rules_signature and self._rules_hash:
+            return self._rules_hash
+
+        digest = hashlib.sha256()
+        for path in files:
+            digest.update(str(path.relative_to(self.semgrep_rules_dir)).encode("utf-8"))
+            digest.update(hashlib.sha256(path.read_bytes()).digest())
+
+        self._rules_signature, self._rules_hash = signature, digest.hexdigest()
+        return self._rules_hash
+
+    def get_semgrep_version(self) -> Optional[str]:
+        if self._semgrep_version is None:
+            try:
+                self._semgrep_version = subprocess.run(
+                    ["semgrep", "--version"], capture_output=True, text=True, timeout=60
+                ).stdout.strip()
+            except (OSError, subprocess.SubprocessError) as e:
+                self.logger.warning(f"Could not get the semgrep version: {e}")
+
+        return self._semgrep_version
+
+    def ingest_sarif(
+        self,
+        repo_name: str,
+        commit: Optional[str],
+        sarif_files: List[Path],
+        carried_results: Iterable[Dict[str, Any]] = (),
+        base_envelopes: Optional[List[Dict[str, Any]]] = None,
+        cache_key: Optional[Dict[str, str]] = None,
+        job_id: Optional[ObjectId] = None,
+    ) -> Tuple[ObjectId, int]:
+        """
+        Stream the results of the semgrep output files into the findings of a
+        new scan in batches, cleaning and fingerprinting them on the way. Only the SARIF
+        envelopes (everything but the results) are held in memory. Suppressions
+        and AI reviews of the previous scan of the repo are then carried forward.
+        Returns the scan id and the number of findings stored.
+        """
+        previous_scan: Optional[Dict[str, Any]] = (
+            self.mongo.get_latest_scan(repo_name) if self.carry_forward_triage else None
+        )
+        scan_id: ObjectId = self.mongo.create_scan(repo_name, commit, job_id)
+        readers: List[SarifReader] = [SarifReader(path) for path in sarif_files]
+        suppression: SuppressionMatcher = self.get_suppression(repo_name)
+        # shared by carried and new results so equal ones get distinct fingerprints
+        occurrences: Dict[str, int] = {}
+
+        try:
+            findings_count: int = 0
+            batch: List[Dict[str, Any]] = []
+
+            # carried results are cleaned again, so rules suppressed since
+            # the previous scan drop out of unchanged files too
+            for result in self.iter_cleaned_results(
+                itertools.chain(
+                    carried_results,
+                    (
+                        result
+                        for reader in readers
+                        for _, result in reader.iter_results()
+                    ),
+                ),
+                suppression,
+                occurrences,
+            ):
+                batch.append(result)
+                if len(batch) >= self.ingest_batch_size:
+                    self.mongo.add_findings(scan_id, findings_count, batch)
+                    findings_count += len(batch)
+                    batch = []
+
+            if batch:
+                self.mongo.add_findings(scan_id, findings_count, batch)
+                findings_count += len(batch)
+
+            if previous_scan:
+                carried: Dict[str, int] = self.carry_forward(scan_id, previous_scan)
+                if job_id:
+                    self.mongo.update_job_metrics(job_id, carried)
+
+            envelopes: List[Dict[str, Any]] = [
+                reader.envelope for reader in readers
+            ] + (base_envelopes or [])
+            envelope: Dict[str, Any] = self.clean_sarif(
+                self.merge_sarif(envelopes or [{"runs": [{}]}]), suppression
+            )
+            self.mongo.finish_scan(scan_id, envelope, findings_count, cache_key)
+        except Exception:
+            self.mongo.delete_scan_by_id(str(scan_id))
+            raise
+
+        return scan_id, findings_count
+
+    def iter_cleaned_results(
+        self,
+        results: Iterable[Dict[str, Any]],
+        suppression: Optional[SuppressionMatcher] = None,
+        occurrences: Optional[Dict[str, int]] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        for result in results:
+            cleaned: Optional[Dict[str, Any]] = self.clean_result(
+                result, suppression, occurrences
+            )
+            if cleaned:
+                yield cleaned
+
+    def get_carried_results(
+        self, previous_scan: Dict[str, Any], repo_path: Path, changed_files: Set[str]
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Previous results for files that did not change, keeping their
+        suppressions and AI reviews. They still go through clean_result.
+        """
+        for result in self.mongo.iter_scan_results(previous_scan):
+            if self.get_result_path(result, repo_path) not in changed_files:
+                yield result
+
+    def carry_forward(
+        self, scan_id: ObjectId, previous_scan: Dict[str, Any]
+    ) -> Dict[str, int]:
+        """
+        Copy the suppressions and AI reviews of the previous scan to the
+        matching findings of a new scan. Findings match on fingerprint. The
+        rest match on rule and normalized snippet, one to one in SARIF order,
+        among the new scan's findings that the previous scan did not have:
+        this follows findings into moved files and out of scans fingerprinted
+        before fingerprints included the file.
+        """
+        triaged: List[Dict[str, Any]] = list(
+            self.mongo.iter_triaged_results(previous_scan)
+        )
+        if not triaged:
+            return {"carried_by_fingerprint": 0, "carried_by_snippet": 0}
+
+        by_fingerprint: Dict[str, Dict[str, Any]] = {
+            result.get("fingerprints", {}).get("paladin", ""): result
+            for result in triaged
+        }
+        matches: Dict[str, Dict[str, Any]] = {
+            fingerprint: by_fingerprint[fingerprint]
+            for fingerprint in self.mongo.get_existing_fingerprints(
+                scan_id, list(by_fingerprint)
+            )
+        }
+        matched_count: int = len(matches)
+
+        unmatched: Dict[str, List[Dict[str, Any]]] = {}
+        for result in triaged:
+            if result.get("fingerprints", {}).get("paladin", "") not in matches:
+                unmatched.setdefault(
+                    self.generate_snippet_fingerprint(result), []
+                ).append(result)
+
+        if unmatched:
+            candidates: List[Tuple[str, str]] = self.mongo.find_findings_by_snippet(
+                scan_id, list(unmatched)
+            )
+            known: Set[str] = self.mongo.get_existing_fingerprints(
+                previous_scan["_id"], [fingerprint for fingerprint, _ in candidates]
+            )
+            for fingerprint, snippet in candidates:
+                if fingerprint in known or fingerprint in matches:
+                    continue
+                if unmatched.get(snippet):
+                    matches[fingerprint] = unmatched[snippet].pop(0)
+
+        self.mongo.set_findings_triage(
+            scan_id,
+            {
+                fingerprint: {
+                    "suppressed": bool(result.get("suppressed")),
+                    "aiReview": result.get("aiReview"),
+                }
+                for fingerprint, result in matches.items()
+            },
+        )
+
+        carried: Dict[str, int] = {
+            "carried_by_fingerprint": matched_count,
+            "carried_by_snippet": len(matches) - matched_count,
+        }
+        self.logger.info(
+            f"Carried triage of {len(matches)} findings forward from scan "
+            f"{previous_scan['_id']} to {scan_id}: {carried}"
+        )
+        return carried
+
+    def get_envelope(self, sarif: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Shallow copy of a SARIF document without results.
+        """
+        return {
+            **sarif,
+            "runs": [
+                {key: value for key, value in run.items() if key != "results"}
+                for run in sarif.get("runs", [])
+            ],
+        }
+
     def mark_sarif_suppressed_by_fingerprint(
         self, scan_id: str, fingerprint_id: str, suppress: bool = True
     ) -> Optional[Dict[str, Any]]:
         """
         Mark SARIF results as suppressed based on a fingerprint.
+        Returns the updated finding.
         """
-        sarif = self.mongo.get_sarif_by_id(scan_id)
-        if not sarif:
-            return None
-
-        finding = self.get_finding_by_fingerprint(sarif, fingerprint_id)
+        finding = self.mongo.set_finding_suppressed(scan_id, fingerprint_id, suppress)
         if not finding:
             self.logger.info(f"No finding for {scan_id}:{fingerprint_id}")
-            return sarif
 
-        finding["suppressed"] = suppress
+        return finding
 
-        self.mongo.update_scan_by_id(scan_id, sarif)
+    def mark_findings_suppressed(
+        self, scan_id: str, fingerprint_ids: List[str], suppress: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        Mark many SARIF results as suppressed in one update.
+        Returns the updated findings.
+        """
+        findings = self.mongo.set_findings_suppressed(
+            scan_id, fingerprint_ids, suppress
+        )
+        self.logger.info(
+            f"Marked {len(findings)} findings of {scan_id} as suppressed={suppress}"
+        )
 
-        return sarif
+        return findings
 
     def get_file(self, filepath: str) -> FileResponse:
         base_path = Path(self.config["paths"]["clone_base_dir"]).resolve()  # type: ignore
@@ -132,19 +560,28 @@ class Scanner:
             self.logger.error(f"Failed to read {filepath}: {e}")
             return FileResponse(FileError.READ_FAIL)
 
-    def review(self, scan_id: str, fingerprint_id: str) -> ReviewResponse:
-        if not self.gemini_ops:
+    def review(
+        self,
+        scan_id: str,
+        fingerprint_id: str,
+        client: Optional[ReviewClient] = None,
+    ) -> ReviewResponse:
+        """
+        Review one finding with the client, Gemini by default, and store the
+        review on the finding. Reviews of the same code by the same model
+        come from the review cache.
+        """
+        client = client or self.gemini_ops
+        if not client:
             return ReviewResponse(ReviewError.NO_API_KEY)
 
-        sarif = self.mongo.get_sarif_by_id(scan_id)
-        if not sarif:
-            self.logger.error(f"sarif not found for scan id {scan_id}")
-            return ReviewResponse(ReviewError.SCAN_NOT_FOUND)
-
         finding: Optional[Dict[str, Any]] = self.get_finding_by_fingerprint(
-            sarif, fingerprint_id
+            scan_id, fingerprint_id
         )
         if not finding:
+            if not self.mongo.scan_exists(scan_id):
+                self.logger.error(f"sarif not found for scan id {scan_id}")
+                return ReviewResponse(ReviewError.SCAN_NOT_FOUND)
             return ReviewResponse(ReviewError.NO_FINDING)
 
         location: LocationFromSarif = self.get_location_from_finding(finding)
@@ -159,18 +596,26 @@ class Scanner:
         )
 
         if file and file.file:
+            cache_key: str = self.review_cache.get_key(
+                client, finding_for_review, file.file
+            )
+            cached: Optional[Dict[str, Any]] = self.review_cache.get(cache_key)
+            if cached:
+                self.mongo.set_finding_review(scan_id, fingerprint_id, cached)
+                return ReviewResponse(None, GeminiReview(**cached), cached=True)
+
             try:
-                gemini_response: ReviewResponse = self.gemini_ops.review(
+                gemini_response: ReviewResponse = client.review(
                     finding_for_review, file.file
                 )
 
                 if not gemini_response.error:
-                    finding["aiReview"] = {
+                    review: Dict[str, Any] = {
                         "verdict": gemini_response.review.verdict,  # type: ignore
                         "reason": gemini_response.review.reason,  # type: ignore
                     }
-
-                    self.mongo.update_scan_by_id(scan_id, sarif)
+                    self.mongo.set_finding_review(scan_id, fingerprint_id, review)
+                    self.review_cache.put(cache_key, review, client)
 
                 return gemini_response
             except RuntimeError as e:
@@ -180,20 +625,168 @@ class Scanner:
             self.logger.error(f"file read error {file.error.value}")  # type: ignore
             return ReviewResponse(ReviewError.INCOMPLETE_FINDING)
 
-    def clone_repo(self, repo_url: str, clone_base_dir: Optional[Path] = None) -> Path:
+    def get_clone_dir(
+        self, repo_url: str, clone_base_dir: Optional[Path] = None
+    ) -> Path:
         # Use last two parts of repo for folder name (e.g., github.com/rs/cors -> rs_cors)
         parts = repo_url.rstrip("/").split("/")[-2:]
         safe_name = "/".join(re.sub(r"[^a-zA-Z0-9_\-]", "_", p) for p in parts)
         if not clone_base_dir:
             clone_base_dir = self.clone_base_dir
 
-        clone_dir = clone_base_dir / safe_name
+        return clone_base_dir / safe_name
+
+    def clone_repo(
+        self, repo_url: str, clone_base_dir: Optional[Path] = None
+    ) -> Tuple[Path, bool]:
+        """
+        Clone the repo, or with incremental scans fetch into its existing
+        checkout. Returns the checkout and whether it was fetched into.
+        """
+        clone_dir = self.get_clone_dir(repo_url, clone_base_dir)
+
+        if self.incremental_scan and self.update_checkout(clone_dir):
+            return clone_dir, True
 
         if clone_dir.exists():
             shutil.rmtree(clone_dir)
 
-        git.Repo.clone_from(repo_url, str(clone_dir))
-        return clone_dir
+        # semgrep and scc never look at history, so it does not have to be fetched
+        clone_options: Dict[str, Any] = {}
+        if self.clone_strategy == CloneStrategy.SHALLOW:
+            clone_options["depth"] = 1
+        elif self.clone_strategy == CloneStrategy.PARTIAL:
+            clone_options["filter"] = "blob:none"
+
+        if self.sparse_checkout:
+            clone_options["no_checkout"] = True
+
+        repo = git.Repo.clone_from(repo_url, str(clone_dir), **clone_options)
+
+        if self.sparse_checkout:
+            patterns: List[str] = self.get_sparse_patterns()
+            self.logger.info(f"Sparse checkout of {clone_dir} with {patterns}")
+            repo.git.sparse_checkout("set", "--no-cone", *patterns)
+            repo.git.checkout()
+
+        return clone_dir, False
+
+    def get_sparse_patterns(self) -> List[str]:
+        """
+        Sparse checkout patterns covering files of languages that are not
+        excluded and have a rules directory, minus vendored directories.
+        """
+        excluded: Set[str] = {lang.lower() for lang in self.exclude_langs or set()}
+
+        patterns: List[str] = []
+        for lang, lang_patterns in LANGUAGE_FILE_PATTERNS.items():
+            if lang in excluded or not (self.semgrep_rules_dir / lang).is_dir():
+                continue
+            patterns.extend(lang_patterns)
+
+        patterns.extend(f"!**/{d}/**" for d in VENDOR_DIRS)
+        return patterns
+
+    def get_git_objects_size(self, repo_path: Path) -> int:
+        """
+        Size in bytes of the repo's object store, used to estimate how much
+        a clone or fetch transferred.
+        """
+        if not (repo_path / ".git").is_dir():
+            return 0
+
+        try:
+            output: str = git.Repo(str(repo_path)).git.count_objects("-v")
+        except git.GitError:
+            return 0
+
+        counts: Dict[str, str] = dict(
+            line.split(": ", 1) for line in output.splitlines() if ": " in line
+        )
+        kib: int = int(counts.get("size", 0)) + int(counts.get("size-pack", 0))
+        return kib * 1024
+
+    def get_worktree_size(self, repo_path: Path) -> int:
+        total: int = 0
+        for root, dirs, files in os.walk(repo_path):
+            dirs[:] = [d for d in dirs if d != ".git"]
+            for f in files:
+                try:
+                    total += os.lstat(os.path.join(root, f)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def update_checkout(self, clone_dir: Path) -> bool:
+        """
+        Fetch the remote HEAD into an existing checkout and reset to it.
+        Returns False if there is no usable checkout.
+        """
+        if not (clone_dir / ".git").is_dir():
+            return False
+
+        try:
+            repo = git.Repo(str(clone_dir))
+            if self.clone_strategy == CloneStrategy.SHALLOW:
+                repo.git.fetch("--depth=1", "origin", "HEAD")
+            else:
+                repo.git.fetch("origin", "HEAD")
+            repo.git.reset("--hard", "FETCH_HEAD")
+            repo.git.clean("-fdx")
+        except git.GitError as e:
+            self.logger.info(f"Could not update {clone_dir}, cloning again: {e}")
+            return False
+
+        self.logger.info(f"Fetched latest changes into {clone_dir}")
+        return True
+
+    def get_head_commit(self, repo_path: Path) -> Optional[str]:
+        try:
+            return git.Repo(str(repo_path)).head.commit.hexsha
+        except (git.GitError, ValueError):
+            return None
+
+    def get_changed_files(
+        self, repo_path: Path, since_commit: str
+    ) -> Optional[Set[str]]:
+        """
+        Paths (relative to the repo root) changed between since_commit and HEAD.
+        Returns None when the diff cannot be computed or is too large to be
+        worth an incremental scan.
+        """
+        try:
+            diff: str = git.Repo(str(repo_path)).git.diff(
+                "--name-only", "--no-renames", since_commit, "HEAD"
+            )
+        except git.GitError as e:
+            self.logger.info(f"Cannot diff against {since_commit}, full scan: {e}")
+            return None
+
+        changed: Set[str] = {line for line in diff.splitlines() if line}
+        if len(changed) > self.INCREMENTAL_MAX_CHANGED_FILES:
+            self.logger.info(f"{len(changed)} files changed, running a full scan")
+            return None
+
+        return changed
+
+    def get_result_path(self, result: Dict[str, Any], repo_path: Path) -> str:
+        """
+        Path of the result's first location relative to the repo root.
+        """
+        locations: List[Dict[str, Any]] = result.get("locations", [])
+        if not locations:
+            return ""
+
+        uri: str = (
+            locations[0]
+            .get("physicalLocation", {})
+            .get("artifactLocation", {})
+            .get("uri", "")
+        )
+        try:
+            return str(Path(uri).relative_to(repo_path))
+        except ValueError:
+            return uri
 
     def detect_languages(self, target_dir: Path) -> List[str]:
         """
@@ -213,11 +806,16 @@ class Scanner:
     def run_semgrep(
         self,
         target_dir: Path,
+        output_dir: Path,
         exclude_globs: Optional[List[str]] = None,
-    ) -> str:
+        targets: Optional[List[Path]] = None,
+    ) -> List[Path]:
         """
         Run semgrep on the target directory using all detected languages that have rules.
-        Runs a single semgrep command with multiple -f flags.
+        Runs a single semgrep command with multiple -f flags, or one command
+        per rules directory if semgrep_jobs allows running several at once.
+        If targets is given, only those files are scanned.
+        Returns the SARIF files written to output_dir.
         """
         languages = self.detect_languages(target_dir)
         languages = [lang.lower() for lang in languages]
@@ -232,54 +830,140 @@ class Scanner:
 
         if not valid_rule_dirs:
             self.logger.info("No valid rule directories found.")
-            return ""
+            return []
+
+        if self.semgrep_jobs > 1 and len(valid_rule_dirs) > 1:
+            return self.run_semgrep_sharded(
+                valid_rule_dirs, target_dir, output_dir, exclude_globs, targets
+            )
+
+        output: Path = output_dir / "semgrep.sarif"
+        cmd: List[str] = self.build_semgrep_cmd(
+            valid_rule_dirs, target_dir, output, exclude_globs, targets
+        )
+        self.exec_semgrep(cmd)
+        return [output]
+
+    def run_semgrep_sharded(
+        self,
+        rule_dirs: List[Path],
+        target_dir: Path,
+        output_dir: Path,
+        exclude_globs: Optional[List[str]] = None,
+        targets: Optional[List[Path]] = None,
+    ) -> List[Path]:
+        """
+        Run one semgrep process per rules directory, at most semgrep_jobs at a
+        time. Each process writes its own SARIF file.
+        """
+        parallel: int = min(self.semgrep_jobs, len(rule_dirs))
+        # split the cores between the concurrent semgrep processes
+        cores_per_shard: int = max(1, (os.cpu_count() or 1) // parallel)
+
+        outputs: List[Path] = [
+            output_dir / f"{rule_dir.name}.sarif" for rule_dir in rule_dirs
+        ]
+        cmds: List[List[str]] = [
+            self.build_semgrep_cmd(
+                [rule_dir], target_dir, output, exclude_globs, targets, cores_per_shard
+            )
+            for rule_dir, output in zip(rule_dirs, outputs)
+        ]
+
+        with ThreadPoolExecutor(max_workers=parallel) as executor:
+            list(executor.map(self.exec_semgrep, cmds))
 
-        # Build semgrep command
+        return outputs
+
+    def build_semgrep_cmd(
+        self,
+        rule_dirs: List[Path],
+        target_dir: Path,
+        output: Path,
+        exclude_globs: Optional[List[str]] = None,
+        targets: Optional[List[Path]] = None,
+        jobs: Optional[int] = None,
+    ) -> List[str]:
         cmd: List[str] = ["semgrep"]
-        for rule_dir in valid_rule_dirs:
+        for rule_dir in rule_dirs:
             cmd.extend(["-f", str(rule_dir)])
 
         if exclude_globs:
             for g in exclude_globs:
                 cmd.extend(["--exclude", g])
 
-        cmd.extend(["--sarif"])
-        cmd.append(str(target_dir))
+        if jobs:
+            cmd.extend(["--jobs", str(jobs)])
+
+        cmd.extend(["--sarif", "--output", str(output)])
+        if targets:
+            cmd.extend(str(t) for t in targets)
+        else:
+            cmd.append(str(target_dir))
+
+        return cmd
 
+    def exec_semgrep(self, cmd: List[str]) -> None:
         self.logger.info(f"Running semgrep with command: {' '.join(cmd)}")
 
-        result = subprocess.run(cmd, capture_output=True, text=True)
+        # the SARIF goes to the --output file, only stderr is kept for errors
+        result = subprocess.run(
+            cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
         if result.returncode not in (0, 1):
-            self.logger.info(f"Error running semgrep: {result.stderr}")
-            return ""
+            raise RuntimeError(f"semgrep failed: {result.stderr[-2000:]}")
+
+    def merge_sarif(self, sarif_docs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Merge the runs of several SARIF documents into the first run of the
+        first document. Results are concatenated and rules merged by id,
+        shortened since the envelope of an earlier scan has short ids already.
+        """
+        merged: Dict[str, Any] = sarif_docs[0]
+        merged_run: Dict[str, Any] = merged["runs"][0]
+        driver: Dict[str, Any] = merged_run.setdefault("tool", {}).setdefault(
+            "driver", {}
+        )
 
-        return result.stdout
+        results: List[Dict[str, Any]] = []
+        rules: Dict[str, Dict[str, Any]] = {}
+        invocations: List[Dict[str, Any]] = []
 
-    def delete_repo_if_no_findings(
-        self, repo_dir: Path, semgrep_output: Dict[str, Any]
-    ) -> None:
+        for doc in sarif_docs:
+            for run in doc.get("runs", []):
+                results.extend(run.get("results", []))
+                invocations.extend(run.get("invocations", []))
+                for rule in run.get("tool", {}).get("driver", {}).get("rules", []):
+                    rules.setdefault(self.shorten_rule_id(rule.get("id", "")), rule)
+
+        merged["runs"] = [merged_run]
+        merged_run["results"] = results
+        merged_run["invocations"] = invocations
+        driver["rules"] = list(rules.values())
+
+        return merged
+
+    def delete_repo_if_no_findings(self, repo_dir: Path, findings_count: int) -> None:
         """
         Delete the repo directory if Semgrep found no issues.
         """
-        results: Dict[str, Any] = semgrep_output["runs"][0]["results"]
-
-        if not results:
+        if not findings_count:
             shutil.rmtree(repo_dir)
             self.logger.info(f"Deleted {repo_dir} (no findings)")
         else:
             self.logger.info(f"Findings detected in {repo_dir}, keeping repo.")
 
-    def clean_sarif(self, sarif_data_parsed: Dict[str, Any]) -> Dict[str, Any]:
+    def clean_sarif(
+        self,
+        sarif_data_parsed: Dict[str, Any],
+        suppression: Optional[SuppressionMatcher] = None,
+    ) -> Dict[str, Any]:
         """
         Cleans a SARIF JSON object by removing results and rules that match
-        suppressed paths or explicit rule IDs from the config.
+        suppressed paths, rule IDs or rule patterns from the config.
         """
-
-        rules_path_prefix = (
-            ".".join(self.semgrep_rules_dir.parts[1:])
-            if self.semgrep_rules_dir.is_absolute()
-            else ".".join(self.semgrep_rules_dir.parts)
-        )
+        suppression = suppression or self.suppression
+        occurrences: Dict[str, int] = {}
 
         for run in sarif_data_parsed.get("runs", []):
             # Clean results
@@ -287,26 +971,11 @@ class Scanner:
             cleaned_results: List[Dict[str, Any]] = []
 
             for result in results:
-                rule_id: str = result.get("ruleId", "")
-
-                # Remove rules_path prefix if present
-                rule_id_short = (
-                    rule_id[len(rules_path_prefix) + 1 :]
-                    if rule_id.startswith(rules_path_prefix + ".")
-                    else rule_id
+                cleaned: Optional[Dict[str, Any]] = self.clean_result(
+                    result, suppression, occurrences
                 )
-
-                # Suppress if any suppress_path substring is in rule_id_short OR rule_id_short is in suppress_rules
-                if (
-                    not any(path in rule_id_short for path in self.suppress_paths)
-                    and rule_id_short not in self.suppress_rules
-                ):
-                    result["ruleId"] = rule_id_short
-                    # add custom fingerprint
-                    result["fingerprints"] = {
-                        "paladin": self.generate_fingerprint(result)
-                    }
-                    cleaned_results.append(result)
+                if cleaned:
+                    cleaned_results.append(cleaned)
 
             run["results"] = cleaned_results
 
@@ -317,17 +986,9 @@ class Scanner:
             cleaned_rules: List[Dict[str, Any]] = []
 
             for rule in rules:
-                rule_id: str = rule.get("id", "")
-                rule_id_short = (
-                    rule_id[len(rules_path_prefix) + 1 :]
-                    if rule_id.startswith(rules_path_prefix + ".")
-                    else rule_id
-                )
+                rule_id_short = self.shorten_rule_id(rule.get("id", ""))
 
-                if (
-                    not any(path in rule_id_short for path in self.suppress_paths)
-                    and rule_id_short not in self.suppress_rules
-                ):
+                if not suppression.is_suppressed(rule_id_short):
                     rule["id"] = rule_id_short
                     cleaned_rules.append(rule)
 
@@ -337,35 +998,135 @@ class Scanner:
 
         return sarif_data_parsed
 
-    def generate_fingerprint(self, result: Dict[str, Any]) -> str:
-        rule_id = result.get("ruleId", "")
-        locations = result.get("locations", [])
-        snippet_texts = []
+    def clean_result(
+        self,
+        result: Dict[str, Any],
+        suppression: Optional[SuppressionMatcher] = None,
+        occurrences: Optional[Dict[str, int]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Shortens the result's rule id and adds the paladin fingerprints.
+        Returns None if the rule is suppressed.
+        """
+        rule_id_short = self.shorten_rule_id(result.get("ruleId", ""))
+
+        if (suppression or self.suppression).is_suppressed(rule_id_short):
+            return None
+
+        result["ruleId"] = rule_id_short
+        return self.add_fingerprints(result, occurrences)
+
+    def shorten_rule_id(self, rule_id: str) -> str:
+        # Remove rules_path prefix if present
+        return (
+            rule_id[len(self._rule_id_prefix) :]
+            if rule_id.startswith(self._rule_id_prefix)
+            else rule_id
+        )
+
+    def get_suppression(self, repo_name: Optional[str] = None) -> SuppressionMatcher:
+        """
+        Suppression matcher for the repo, with its overrides applied.
+        """
+        if not repo_name or repo_name not in self.repo_overrides:
+            return self.suppression
+
+        if repo_name not in self._repo_suppressions:
+            self._repo_suppressions[repo_name] = SuppressionMatcher.from_settings(
+                self.config["settings"], repo_name
+            )
+        return self._repo_suppressions[repo_name]
+
+    def add_fingerprints(
+        self, result: Dict[str, Any], occurrences: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        result["fingerprints"] = {
+            "paladin": self.generate_fingerprint(result, occurrences),
+            "paladinSnippet": self.generate_snippet_fingerprint(result),
+        }
+        return result
+
+    def generate_fingerprint(
+        self, result: Dict[str, Any], occurrences: Optional[Dict[str, int]] = None
+    ) -> str:
+        """
+        Hash of the rule id, the file relative to the repo and the normalized
+        snippets. Results of a scan that share all three are told apart by
+        how many came before them, counted in occurrences.
+        """
+        rule_id: str = result.get("ruleId", "")
+        source: str = (
+            f"{rule_id}|{self.get_fingerprint_path(result)}|"
+            f"{self.normalize_snippets(result)}"
+        )
+        fingerprint: str = hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+        if occurrences is not None:
+            seen: int = occurrences.get(fingerprint, 0)
+            occurrences[fingerprint] = seen + 1
+            if seen:
+                return hashlib.sha256(
+                    f"{fingerprint}|{seen}".encode("utf-8")
+                ).hexdigest()[:32]
+
+        return fingerprint[:32]
+
+    def generate_snippet_fingerprint(self, result: Dict[str, Any]) -> str:
+        """
+        Hash of the rule id and normalized snippets only, which survives the
+        file being moved or renamed.
+        """
+        rule_id: str = result.get("ruleId", "")
+        source: str = f"{rule_id}|{self.normalize_snippets(result)}"
+        return hashlib.sha256(source.encode("utf-8")).hexdigest()[:32]
+
+    def normalize_snippets(self, result: Dict[str, Any]) -> str:
+        """
+        Snippets of all locations with runs of whitespace collapsed, so
+        reindenting or rewrapping code keeps the fingerprint.
+        """
+        snippet_texts: List[str] = []
 
-        for loc in locations:
-            snippet = (
+        for loc in result.get("locations", []):
+            snippet: str = (
                 loc.get("physicalLocation", {})
                 .get("region", {})
                 .get("snippet", {})
                 .get("text", "")
             )
             if snippet:
-                snippet_texts.append(snippet.strip())
-
-        # Concatenate ruleId + snippets for hashing
-        fingerprint_source = rule_id + "|" + "|".join(snippet_texts)
-        fingerprint_hash = hashlib.sha256(
-            fingerprint_source.encode("utf-8")
-        ).hexdigest()[
-            :16
-        ]  # short hash
-        return fingerprint_hash
-
-    def write_sarif_to_file(self, sarif: Dict[str, Any], repo: str) -> None:
+                snippet_texts.append(" ".join(snippet.split()))
+
+        return "|".join(snippet_texts)
+
+    def get_fingerprint_path(self, result: Dict[str, Any]) -> str:
+        """
+        Path of the result's first location relative to the repo checkout,
+        leaving out where clones are kept.
+        """
+        locations: List[Dict[str, Any]] = result.get("locations", [])
+        if not locations:
+            return ""
+
+        uri: str = (
+            locations[0]
+            .get("physicalLocation", {})
+            .get("artifactLocation", {})
+            .get("uri", "")
+        )
+        try:
+            # clones are checked out to <clone_base_dir>/<owner>/<name>
+            return "/".join(Path(uri).relative_to(self.clone_base_dir).parts[2:])
+        except ValueError:
+            return uri
+
+    def write_sarif_to_file(self, scan_id: ObjectId, repo: str) -> None:
         write_json: bool = self.config.get("settings", {}).get("write_sarif_to_file", None)  # type: ignore
         if not write_json:
             return
 
+        sarif: Dict[str, Any] = self.mongo.get_sarif_by_id(str(scan_id))
+
         sarif_write_dir: str = self.config.get("paths", {}).get("sarif_write_dir", "")  # type: ignore
         if not sarif_write_dir:
             sarif_write_path: Path = Path(".")
@@ -386,17 +1147,14 @@ class Scanner:
         return not settings.get("suppress_paths") or not settings.get("suppress_rules")
 
     def get_finding_by_fingerprint(
-        self, sarif: Dict[str, Any], fingerprint_id: str
+        self, scan_id: str, fingerprint_id: str
     ) -> Optional[Dict[str, Any]]:
-        # there should be only 1 finding per fingerprint
-        # if that is not the case, fix the fingerprint function
-        for run in sarif.get("runs", []):
-            for result in run.get("results", {}):
-                fingerprints = result.get("fingerprints", {})
-                if fingerprints.get("paladin") == fingerprint_id:
-                    return result
-
-        return None
+        """
+        SARIF result of one finding, looked up in the findings index.
+        """
+        # fingerprints are unique within a scan, scans stored before they
+        # included the file can still repeat one
+        return self.mongo.get_finding(scan_id, fingerprint_id)
 
     def get_location_from_finding(self, finding: Dict[str, Any]) -> LocationFromSarif:
         locations: List[Dict[str, Any]] = finding.get("locations", [])
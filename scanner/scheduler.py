@@ -0,0 +1,118 @@
+import logging
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Set
+
+from bson import ObjectId
+
+from models.response_models import JobResponse
+from utils.mongo_utils import MongoUtils
+
+from .scan import Scanner
+
+logging.basicConfig(level=logging.INFO)
+
+
+class ScanScheduler:
+    """
+    Runs queued scan jobs from the scan_jobs collection on a fixed-size pool
+    of worker threads. Every gunicorn worker runs its own pool, so the total
+    number of concurrent scans is workers * concurrency.
+    """
+
+    def __init__(
+        self, config: Dict[str, Any], scanner: Scanner, mongo: MongoUtils
+    ) -> None:
+        self.scanner = scanner
+        self.mongo = mongo
+        self.logger = logging.getLogger(__name__)
+
+        scheduler_config: Dict[str, Any] = config.get("scheduler", {})
+        self.concurrency: int = scheduler_config.get("concurrency", 2)
+        self.poll_interval: float = scheduler_config.get("poll_interval", 5)
+        self.heartbeat_interval: float = scheduler_config.get("heartbeat_interval", 30)
+        self.stale_after: int = scheduler_config.get("stale_after", 300)
+        self.max_attempts: int = scheduler_config.get("max_attempts", 3)
+        # auto scans running at once across all workers, the rest of the pool
+        # stays free for scans queued by users
+        self.max_auto_running: int = config.get("autoscan", {}).get("max_running", 1)
+
+        self.worker_id: str = f"{socket.gethostname()}:{os.getpid()}"
+        self._active_jobs: Set[ObjectId] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._started = False
+
+    def start(self) -> None:
+        if self._started:
+            return
+        self._started = True
+
+        recovered: int = self.mongo.requeue_stale_jobs(
+            self.stale_after, self.max_attempts
+        )
+        if recovered:
+            self.logger.info(f"Requeued {recovered} scan jobs left by dead workers")
+
+        for i in range(self.concurrency):
+            threading.Thread(
+                target=self._worker_loop, name=f"scan-worker-{i}", daemon=True
+            ).start()
+
+        threading.Thread(
+            target=self._heartbeat_loop, name="scan-heartbeat", daemon=True
+        ).start()
+
+        self.logger.info(
+            f"Scan scheduler {self.worker_id} started with {self.concurrency} workers"
+        )
+
+    def notify(self) -> None:
+        """
+        Wake idle workers so a freshly queued job is picked up without
+        waiting for the next poll.
+        """
+        self._wakeup.set()
+
+    def _worker_loop(self) -> None:
+        while True:
+            try:
+                job = self.mongo.claim_next_scan_job(
+                    self.worker_id, self.max_auto_running
+                )
+            except Exception as e:
+                self.logger.error(f"Failed to claim scan job: {e}")
+                job = None
+
+            if not job:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            self._run_job(job)
+
+    def _run_job(self, job: JobResponse) -> None:
+        with self._lock:
+            self._active_jobs.add(job._id)  # type: ignore
+
+        try:
+            self.scanner.run_scan_job(job._id, job.repo)  # type: ignore
+        except Exception as e:
+            self.logger.error(f"Scan worker crashed on job {job._id}: {e}")
+        finally:
+            with self._lock:
+                self._active_jobs.discard(job._id)  # type: ignore
+
+    def _heartbeat_loop(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_interval)
+            with self._lock:
+                active = list(self._active_jobs)
+
+            try:
+                self.mongo.heartbeat_jobs(active)
+                self.mongo.requeue_stale_jobs(self.stale_after, self.max_attempts)
+            except Exception as e:
+                self.logger.error(f"Scan heartbeat failed: {e}")
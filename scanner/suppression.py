@@ -0,0 +1,98 @@
+import fnmatch
+import logging
+import re
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Pattern
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SuppressionMatcher:
+    """
+    Decides whether a shortened rule id is suppressed, with the suppression
+    settings compiled once:
+
+    * suppress_paths: substrings of the rule id, one combined regex
+    * suppress_rules: exact rule ids, a set
+    * suppress_patterns: globs ("go.lang.*.unsafe-*") or regexes prefixed
+      with "re:", matched against the whole rule id, one combined regex.
+      Patterns that do not compile are logged and skipped.
+
+    A scan has many results but few distinct rules, so answers are memoized
+    per rule id.
+    """
+
+    MAX_CACHED = 100_000
+
+    def __init__(
+        self,
+        paths: Iterable[str] = (),
+        rules: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+    ) -> None:
+        self.rules: FrozenSet[str] = frozenset(rules)
+        self.logger = logging.getLogger(__name__)
+
+        escaped = [re.escape(path) for path in sorted(set(paths))]
+        self.paths_re: Optional[Pattern[str]] = (
+            re.compile("|".join(escaped)) if escaped else None
+        )
+
+        compiled: List[Pattern[str]] = self._compile_patterns(patterns)
+        self.patterns_re: List[Pattern[str]] = []
+        if compiled:
+            try:
+                self.patterns_re = [
+                    re.compile("|".join(f"(?:{p.pattern})" for p in compiled))
+                ]
+            except re.error:
+                # e.g. two patterns with the same group name, match one by one
+                self.patterns_re = compiled
+
+        self._cache: Dict[str, bool] = {}
+
+    @classmethod
+    def from_settings(
+        cls, settings: Dict[str, Any], repo: Optional[str] = None
+    ) -> "SuppressionMatcher":
+        """
+        Matcher for the [settings] table. Keys set under
+        settings.repo_overrides.<owner/name> replace the global ones for
+        that repo.
+        """
+        overrides: Dict[str, Any] = (
+            settings.get("repo_overrides", {}).get(repo, {}) if repo else {}
+        )
+        merged: Dict[str, Any] = {**settings, **overrides}
+
+        return cls(
+            merged.get("suppress_paths", []),
+            merged.get("suppress_rules", []),
+            merged.get("suppress_patterns", []),
+        )
+
+    def _compile_patterns(self, patterns: Iterable[str]) -> List[Pattern[str]]:
+        compiled: List[Pattern[str]] = []
+        for pattern in patterns:
+            regex: str = (
+                pattern[3:] if pattern.startswith("re:") else fnmatch.translate(pattern)
+            )
+            try:
+                compiled.append(re.compile(regex))
+            except re.error as e:
+                self.logger.error(f"Skipping invalid suppress pattern {pattern!r}: {e}")
+        return compiled
+
+    def is_suppressed(self, rule_id: str) -> bool:
+        suppressed: Optional[bool] = self._cache.get(rule_id)
+        if suppressed is None:
+            suppressed = (
+                rule_id in self.rules
+                or bool(self.paths_re and self.paths_re.search(rule_id))
+                or any(regex.fullmatch(rule_id) for regex in self.patterns_re)
+            )
+            # rule ids come from the rules directory, this only guards
+            # against unbounded growth
+            if len(self._cache) < self.MAX_CACHED:
+                self._cache[rule_id] = suppressed
+
+        return suppressed
@@ -0,0 +1,30 @@
+import pytest
+
+from utils import mongo_utils
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def drop_sort(method):
+    """
+    mongomock's bulk builder predates the `sort` pymongo 4.11 passes for
+    UpdateOne and ReplaceOne.
+    """
+
+    def wrapper(self, *args, sort=None, **kwargs):
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+@pytest.fixture
+def mongo(monkeypatch) -> mongo_utils.MongoUtils:
+    """
+    MongoUtils on an in-memory mongomock client.
+    """
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ["add_update", "add_replace"]:
+        monkeypatch.setattr(builder, name, drop_sort(getattr(builder, name)))
+
+    monkeypatch.setattr(mongo_utils, "MongoClient", mongomock.MongoClient)
+    return mongo_utils.MongoUtils({})
@@ -0,0 +1,174 @@
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import pytest
+from bson import ObjectId
+
+from models.data_models import FindingForReview, ReviewFilters
+from models.enums import JobStatus, JobType
+from models.response_models import GeminiReview, JobResponse, ReviewResponse
+from scanner.batch_review import BatchReviewer
+from scanner.gemini_ops import ReviewClient
+from scanner.scan import Scanner
+
+
+class StandInClient:
+    """
+    Local ReviewClient in place of Gemini. Every `fail_every`th request
+    raises like a failed Gemini call.
+    """
+
+    model = "stand-in"
+    prompt_version = 1
+
+    def __init__(self, fail_every: int = 0, delay: float = 0.01) -> None:
+        self.fail_every = fail_every
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def review(self, finding: FindingForReview, file: List[str]) -> ReviewResponse:
+        with self._lock:
+            self.calls += 1
+            call: int = self.calls
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.delay)
+        with self._lock:
+            self.in_flight -= 1
+
+        if self.fail_every and call % self.fail_every == 0:
+            raise RuntimeError("Gemini request failed with error 429")
+        return ReviewResponse(
+            None, GeminiReview(verdict="eval" in finding.snippet, reason="stand-in")
+        )
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Dict[str, Any]:
+    return {
+        "paths": {
+            "semgrep_rules_dir": str(tmp_path / "rules"),
+            "clone_base_dir": str(tmp_path / "clones"),
+        },
+        "settings": {},
+        "tokens": {"gemini_api_key": ""},
+        "review": {"concurrency": 3, "backoff_base": 0.001, "max_jobs": 2},
+    }
+
+
+def make_scan(mongo, config: Dict[str, Any], repo: str, count: int) -> ObjectId:
+    repo_dir: Path = Path(config["paths"]["clone_base_dir"]) / repo
+    repo_dir.mkdir(parents=True)
+
+    results: List[Dict[str, Any]] = []
+    for i in range(count):
+        path: Path = repo_dir / f"file_{i}.py"
+        path.write_text(f"value = eval(input())  # {i}\n")
+        results.append(
+            {
+                "ruleId": "python.lang.security.eval",
+                "message": {"text": "eval of user input"},
+                "fingerprints": {"paladin": f"{repo}-{i}"},
+                "locations": [
+                    {
+                        "physicalLocation": {
+                            "artifactLocation": {"uri": str(path)},
+                            "region": {"snippet": {"text": "eval(input())"}},
+                        }
+                    }
+                ],
+            }
+        )
+
+    scan_id: ObjectId = mongo.create_scan(repo, "abc123")
+    mongo.add_findings(scan_id, 0, results)
+    return scan_id
+
+
+def add_job(mongo) -> ObjectId:
+    return mongo.add_job_to_db(JobResponse(job_type=JobType.REVIEW))
+
+
+def test_stand_in_is_a_review_client() -> None:
+    client: ReviewClient = StandInClient()
+    assert client.model == "stand-in"
+
+
+def test_reviews_unreviewed_unsuppressed_findings(mongo, config) -> None:
+    scan_id: ObjectId = make_scan(mongo, config, "owner/repo", 10)
+    mongo.set_finding_suppressed(str(scan_id), "owner/repo-0", True)
+    mongo.set_finding_review(
+        str(scan_id), "owner/repo-1", {"verdict": False, "reason": "by hand"}
+    )
+    client = StandInClient()
+    reviewer = BatchReviewer(config, Scanner(config, mongo), mongo, client)
+    job_id: ObjectId = add_job(mongo)
+
+    reviewer.run(job_id, str(scan_id), ReviewFilters())
+
+    job: JobResponse = mongo.get_job_by_id(str(job_id))
+    assert job.status == JobStatus.DONE
+    assert (job.processed, job.total) == (8, 8)
+    assert job.metrics["reviewed"] == 8
+    assert job.metrics["failed"] == 0
+    assert client.calls == 8
+    assert client.max_in_flight <= 3
+    assert mongo.get_finding(str(scan_id), "owner/repo-1")["aiReview"]["reason"] == (
+        "by hand"
+    )
+    assert "aiReview" not in mongo.get_finding(str(scan_id), "owner/repo-0")
+
+
+def test_failed_requests_are_retried(mongo, config) -> None:
+    scan_id: ObjectId = make_scan(mongo, config, "owner/repo", 6)
+    client = StandInClient(fail_every=2)
+    reviewer = BatchReviewer(config, Scanner(config, mongo), mongo, client)
+    job_id: ObjectId = add_job(mongo)
+
+    reviewer.run(job_id, str(scan_id), ReviewFilters())
+
+    metrics: Dict[str, Any] = mongo.get_job_by_id(str(job_id)).metrics
+    assert metrics["reviewed"] == 6
+    assert metrics["retries"] == client.calls - 6 > 0
+
+
+def test_repeated_reviews_come_from_the_cache(mongo, config) -> None:
+    scan_id: ObjectId = make_scan(mongo, config, "owner/repo", 4)
+    client = StandInClient()
+    reviewer = BatchReviewer(config, Scanner(config, mongo), mongo, client)
+    reviewer.run(add_job(mongo), str(scan_id), ReviewFilters())
+
+    job_id: ObjectId = add_job(mongo)
+    reviewer.run(job_id, str(scan_id), ReviewFilters(include_reviewed=True))
+
+    metrics: Dict[str, Any] = mongo.get_job_by_id(str(job_id)).metrics
+    assert (metrics["reviewed"], metrics["cached"]) == (4, 4)
+    assert metrics["tokens_estimated"] == 0
+    assert client.calls == 4
+
+
+def test_concurrent_jobs_keep_their_own_counts(mongo, config) -> None:
+    first_scan: ObjectId = make_scan(mongo, config, "owner/first", 3)
+    second_scan: ObjectId = make_scan(mongo, config, "owner/second", 7)
+    reviewer = BatchReviewer(
+        config, Scanner(config, mongo), mongo, StandInClient(delay=0.02)
+    )
+    first_job, second_job = add_job(mongo), add_job(mongo)
+
+    futures = [
+        reviewer.submit(first_job, str(first_scan), ReviewFilters()),
+        reviewer.submit(second_job, str(second_scan), ReviewFilters()),
+    ]
+    for future in futures:
+        future.result(timeout=30)
+
+    first: Dict[str, Any] = mongo.get_job_by_id(str(first_job)).metrics
+    second: Dict[str, Any] = mongo.get_job_by_id(str(second_job)).metrics
+    assert (first["reviewed"], second["reviewed"]) == (3, 7)
+    assert first["tokens_estimated"] * 7 == second["tokens_estimated"] * 3
@@ -0,0 +1,66 @@
+from typing import Any, Dict, List
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.results import BulkWriteResult
+
+from utils.bulk_writer import BulkWriter
+
+
+class FlakyCollection:
+    """
+    Collection whose bulk_write raises the given errors before succeeding.
+    """
+
+    name = "flaky"
+
+    def __init__(self, errors: List[Exception]) -> None:
+        self.errors = errors
+        self.calls = 0
+
+    def bulk_write(self, operations: List[UpdateOne], ordered: bool) -> Any:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return BulkWriteResult(
+            {"nMatched": len(operations), "nModified": 0, "nUpserted": 0}, True
+        )
+
+
+def make_writer(collection: FlakyCollection) -> BulkWriter:
+    writer = BulkWriter(
+        collection,  # type: ignore
+        lambda item: UpdateOne({"_id": item}, {"$set": {"seen": True}}),
+        batch_size=10,
+    )
+    writer.max_retries = 2
+    return writer
+
+
+def test_write_concern_errors_retry_the_batch(monkeypatch) -> None:
+    monkeypatch.setattr("utils.bulk_writer.time.sleep", lambda _: None)
+    details: Dict[str, Any] = {
+        "writeErrors": [],
+        "writeConcernErrors": [{"code": 64, "errmsg": "waiting for replication"}],
+        "nMatched": 3,
+    }
+    collection = FlakyCollection([BulkWriteError(details)])
+    writer = make_writer(collection)
+    for item in range(3):
+        writer.add(item)
+
+    summary = writer.flush()
+
+    assert collection.calls == 2
+    assert (summary.matched, summary.failed) == (3, [])
+
+
+def test_unexpected_errors_fail_the_whole_batch() -> None:
+    collection = FlakyCollection([ValueError("bad document")])
+    writer = make_writer(collection)
+    for item in range(3):
+        writer.add(item)
+
+    summary = writer.flush()
+
+    assert summary.failed == [0, 1, 2]
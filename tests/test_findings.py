@@ -0,0 +1,86 @@
+from typing import Any, Dict, List
+
+from bson import ObjectId
+
+
+def result(fingerprint: str, **fields: Any) -> Dict[str, Any]:
+    return {"ruleId": "py.a", "fingerprints": {"paladin": fingerprint}, **fields}
+
+
+def embedded_results(mongo, scan_id: str) -> List[Dict[str, Any]]:
+    scan: Dict[str, Any] = mongo.scan_result_collection.find_one(
+        {"_id": ObjectId(scan_id)}
+    )
+    return [r for run in scan["scan_result"]["runs"] for r in run["results"]]
+
+
+def apply_bulk_write(mongo):
+    """
+    bulk_write for results embedded in the scan, which needs the array
+    filters mongomock does not implement.
+    """
+    collection = mongo.scan_result_collection
+
+    def bulk_write(requests: List[Any], ordered: bool = True) -> None:
+        for request in requests:
+            scan = collection.find_one(request._filter)
+            if not scan:
+                continue
+
+            ((path, value),) = request._doc["$set"].items()
+            field: str = path.rsplit(".", 1)[1]
+            fingerprint = request._array_filters[0]["result.fingerprints.paladin"]
+            for run in scan["scan_result"]["runs"]:
+                for r in run["results"]:
+                    if r["fingerprints"]["paladin"] == fingerprint:
+                        r[field] = value
+            collection.replace_one({"_id": scan["_id"]}, scan)
+            collection.update_one({"_id": scan["_id"]}, {"$inc": request._doc["$inc"]})
+
+    return bulk_write
+
+
+def test_embedded_results_keep_the_suppressed_count(mongo, monkeypatch) -> None:
+    scan_id: str = str(
+        mongo.scan_result_collection.insert_one(
+            {
+                "repo": "o/r",
+                "scan_result": {
+                    "runs": [
+                        {"results": [result("a", suppressed=True), result("b")]},
+                        {"results": [result("c", suppressed=False)]},
+                    ]
+                },
+                "stats": {"suppressed": 1},
+            }
+        ).inserted_id
+    )
+    monkeypatch.setattr(
+        mongo.scan_result_collection, "bulk_write", apply_bulk_write(mongo)
+    )
+    # mongomock has no $replaceWith
+    monkeypatch.setattr(
+        mongo,
+        "_get_embedded_results",
+        lambda scan_id, fingerprints: [
+            r
+            for r in embedded_results(mongo, scan_id)
+            if r["fingerprints"]["paladin"] in fingerprints
+        ],
+    )
+
+    def suppressed() -> int:
+        return mongo.scan_result_collection.find_one({"_id": ObjectId(scan_id)})[
+            "stats"
+        ]["suppressed"]
+
+    updated = mongo.set_findings_suppressed(scan_id, ["a", "b", "c", "b"], True)
+    assert [r["suppressed"] for r in updated] == [True, True, True]
+    assert suppressed() == 3
+
+    assert mongo.set_finding_suppressed(scan_id, "b", False)["suppressed"] is False
+    assert suppressed() == 2
+    # already unsuppressed
+    mongo.set_finding_suppressed(scan_id, "b", False)
+    assert suppressed() == 2
+    assert mongo.set_findings_suppressed(scan_id, [], False) == []
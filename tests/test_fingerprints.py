@@ -0,0 +1,146 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pytest
+from bson import ObjectId
+
+from scanner.scan import Scanner
+
+RULE = "python.lang.security.eval"
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> Dict[str, Any]:
+    return {
+        "paths": {
+            "semgrep_rules_dir": str(tmp_path / "rules"),
+            "clone_base_dir": str(tmp_path / "clones"),
+        },
+        "settings": {},
+        "tokens": {"gemini_api_key": ""},
+    }
+
+
+def make_result(
+    config: Dict[str, Any], file: str, line: int, snippet: str
+) -> Dict[str, Any]:
+    uri: str = f"{config['paths']['clone_base_dir']}/owner/repo/{file}"
+    return {
+        "ruleId": RULE,
+        "message": {"text": "eval of user input"},
+        "locations": [
+            {
+                "physicalLocation": {
+                    "artifactLocation": {"uri": uri},
+                    "region": {"startLine": line, "snippet": {"text": snippet}},
+                }
+            }
+        ],
+    }
+
+
+def fingerprint(
+    scanner: Scanner,
+    result: Dict[str, Any],
+    occurrences: Optional[Dict[str, int]] = None,
+) -> str:
+    return scanner.clean_result(result, occurrences=occurrences)["fingerprints"][
+        "paladin"
+    ]
+
+
+def ingest(
+    scanner: Scanner, tmp_path: Path, name: str, results: List[Dict[str, Any]]
+) -> ObjectId:
+    path: Path = tmp_path / f"{name}.sarif"
+    path.write_text(json.dumps({"runs": [{"results": results}]}))
+    scan_id, _ = scanner.ingest_sarif("owner/repo", name, [path])
+    return scan_id
+
+
+def test_line_shifts_and_reindenting_keep_the_fingerprint(mongo, config) -> None:
+    scanner = Scanner(config, mongo)
+
+    before: str = fingerprint(
+        scanner, make_result(config, "app.py", 10, "x = eval(data)")
+    )
+    shifted: str = fingerprint(
+        scanner, make_result(config, "app.py", 42, "    x  =  eval(data)\n")
+    )
+    edited: str = fingerprint(
+        scanner, make_result(config, "app.py", 10, "x = eval(other)")
+    )
+    moved: str = fingerprint(
+        scanner, make_result(config, "lib.py", 10, "x = eval(data)")
+    )
+
+    assert shifted == before
+    assert len({before, edited, moved}) == 3
+
+
+def test_repeated_snippets_get_distinct_occurrence_fingerprints(mongo, config) -> None:
+    scanner = Scanner(config, mongo)
+
+    def scan() -> List[str]:
+        occurrences: Dict[str, int] = {}
+        return [
+            fingerprint(
+                scanner, make_result(config, "app.py", line, "eval(x)"), occurrences
+            )
+            for line in [3, 9, 27]
+        ]
+
+    first: List[str] = scan()
+    assert len(set(first)) == 3
+    # the same order in the next scan gives the same fingerprints
+    assert scan() == first
+    # without the occurrence count they collide
+    assert fingerprint(scanner, make_result(config, "app.py", 3, "eval(x)")) == first[0]
+
+
+def test_triage_is_carried_forward_to_the_next_scan(mongo, config, tmp_path) -> None:
+    scanner = Scanner(config, mongo)
+    previous_id: ObjectId = ingest(
+        scanner,
+        tmp_path,
+        "first",
+        [
+            make_result(config, "app.py", 10, "eval(a)"),
+            make_result(config, "old.py", 5, "eval(b)"),
+            make_result(config, "app.py", 20, "eval(c)"),
+        ],
+    )
+    findings: List[Dict[str, Any]] = list(
+        mongo.findings_collection.find({"scan_id": previous_id}).sort("seq")
+    )
+    kept, moved, fixed = [finding["fingerprint"] for finding in findings]
+    mongo.set_finding_suppressed(str(previous_id), kept, True)
+    mongo.set_finding_review(
+        str(previous_id), moved, {"verdict": True, "reason": "reachable"}
+    )
+    mongo.set_finding_suppressed(str(previous_id), fixed, True)
+
+    scan_id: ObjectId = ingest(
+        scanner,
+        tmp_path,
+        "second",
+        [
+            # shifted by an added import
+            make_result(config, "app.py", 11, "eval(a)"),
+            # old.py was renamed
+            make_result(config, "new.py", 5, "eval(b)"),
+            make_result(config, "app.py", 30, "eval(d)"),
+        ],
+    )
+
+    carried: List[Dict[str, Any]] = list(
+        mongo.findings_collection.find({"scan_id": scan_id}).sort("seq")
+    )
+    assert carried[0]["fingerprint"] == kept
+    assert carried[0]["suppressed"] is True
+    assert carried[1]["fingerprint"] != moved
+    assert carried[1]["result"]["aiReview"]["reason"] == "reachable"
+    assert carried[1]["suppressed"] is False
+    assert carried[2]["suppressed"] is False
+    assert "aiReview" not in carried[2]["result"]
@@ -0,0 +1,33 @@
+from typing import Any, Dict, Optional
+
+from models.data_models import RepoInfo
+from refresher.gh_apis import GhApis
+
+
+def test_only_repos_github_reports_missing_are_negatively_cached(monkeypatch) -> None:
+    gh_apis = GhApis("token")
+    response: Dict[str, Any] = {
+        "data": {
+            "r0": {"stargazerCount": 5, "forkCount": 1},
+            "r1": None,
+            "r2": None,
+            "r3": None,
+            "rateLimit": None,
+        },
+        "errors": [
+            {"type": "NOT_FOUND", "path": ["r1"], "message": "Could not resolve"},
+            {"type": "FORBIDDEN", "path": ["r2"], "message": "Resource protected"},
+            {"path": ["r3"], "message": "Something went wrong"},
+        ],
+    }
+    monkeypatch.setattr(gh_apis, "_query_github_graphql", lambda query, v: response)
+
+    infos: Dict[str, Optional[RepoInfo]] = gh_apis._query_repo_batch(
+        ["o/found", "o/missing", "o/private", "o/flaky", "not-a-repo"]
+    )
+
+    assert infos == {
+        "o/found": RepoInfo(repo="o/found", stars=5, forks=1),
+        "o/missing": None,
+        "not-a-repo": None,
+    }
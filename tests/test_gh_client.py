@@ -0,0 +1,147 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Dict, List, Optional
+
+import pytest
+import requests
+
+from refresher import gh_client
+from refresher.gh_client import GhClient
+
+NOW = 1_700_000_000.0
+
+
+class FakeClock:
+    """
+    time.time and time.sleep of the client, sleeping advances the clock.
+    """
+
+    def __init__(self) -> None:
+        self.now = NOW
+        self.sleeps: List[float] = []
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def make_response(
+    status: int, headers: Optional[Dict[str, str]] = None, text: str = ""
+) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response._content = text.encode("utf-8")
+    return response
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(gh_client.time, "time", clock.time)
+    monkeypatch.setattr(gh_client.time, "sleep", clock.sleep)
+    return clock
+
+
+def make_client(monkeypatch, responses: List[requests.Response]) -> GhClient:
+    client = GhClient("token", {"refresher": {"github_backoff_base": 1}})
+    monkeypatch.setattr(
+        client.session, "request", lambda method, url, **kwargs: responses.pop(0)
+    )
+    return client
+
+
+def get(client: GhClient) -> requests.Response:
+    return client.get("https://api.github.com/advisories")
+
+
+def test_server_errors_are_retried_with_backoff(monkeypatch, clock) -> None:
+    client = make_client(
+        monkeypatch, [make_response(502), make_response(503), make_response(200)]
+    )
+
+    assert get(client).status_code == 200
+    assert len(clock.sleeps) == 2
+    assert 0 <= clock.sleeps[0] <= 1 and 0 <= clock.sleeps[1] <= 2
+
+
+def test_retries_stop_after_max_retries(monkeypatch, clock) -> None:
+    client = make_client(monkeypatch, [make_response(500) for _ in range(7)])
+    client.max_retries = 2
+
+    assert get(client).status_code == 500
+    assert len(clock.sleeps) == 2
+
+
+@pytest.mark.parametrize(
+    "retry_after, wait",
+    [
+        ("7", 7),
+        (format_datetime(datetime.fromtimestamp(NOW + 42, timezone.utc), True), 42),
+        # already passed
+        (format_datetime(datetime.fromtimestamp(NOW - 42, timezone.utc), True), 0),
+    ],
+)
+def test_retry_after_in_seconds_or_as_a_date(
+    monkeypatch, clock, retry_after: str, wait: float
+) -> None:
+    client = make_client(
+        monkeypatch,
+        [make_response(429, {"Retry-After": retry_after}), make_response(200)],
+    )
+
+    assert get(client).status_code == 200
+    assert clock.sleeps == [pytest.approx(wait)]
+
+
+@pytest.mark.parametrize("retry_after", ["soon", "inf", "Wed, 99 Foo"])
+def test_malformed_retry_after_falls_back_to_backoff(
+    monkeypatch, clock, retry_after: str
+) -> None:
+    client = make_client(
+        monkeypatch,
+        [make_response(429, {"Retry-After": retry_after}), make_response(200)],
+    )
+
+    assert get(client).status_code == 200
+    assert len(clock.sleeps) == 1 and 0 <= clock.sleeps[0] <= 1
+
+
+def test_exhausted_quota_waits_for_the_reset(monkeypatch, clock) -> None:
+    reset: str = str(int(NOW) + 30)
+    client = make_client(
+        monkeypatch,
+        [
+            make_response(
+                403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}
+            ),
+            make_response(200, {"X-RateLimit-Remaining": "4999"}),
+        ],
+    )
+
+    assert get(client).status_code == 200
+    assert clock.sleeps == [31]
+    assert client.get_metrics()["GET /advisories"]["rate_limit_remaining"] == 4999
+
+
+def test_secondary_rate_limit_waits_a_minute(monkeypatch, clock) -> None:
+    client = make_client(
+        monkeypatch,
+        [
+            make_response(403, text="You have exceeded a secondary rate limit"),
+            make_response(200),
+        ],
+    )
+
+    assert get(client).status_code == 200
+    assert clock.sleeps == [GhClient.SECONDARY_LIMIT_WAIT]
+
+
+def test_plain_forbidden_is_not_retried(monkeypatch, clock) -> None:
+    client = make_client(monkeypatch, [make_response(403, text="Forbidden")])
+
+    assert get(client).status_code == 403
+    assert clock.sleeps == []
@@ -0,0 +1,144 @@
+import json
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List
+
+from models.data_models import AffectedPackage, Cwe, VulnReport
+from models.enums import JobType
+from models.response_models import JobResponse
+from refresher.osv_import import OsvImporter, osv_to_rest_advisory
+from refresher.refresh import Refresher
+
+CVSS_V3 = "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H"
+CVSS_V4 = "CVSS:4.0/AV:N/AC:L/AT:N/PR:N/UI:N/VC:H/VI:H/VA:H/SC:N/SI:N/SA:N"
+
+
+def make_osv(ghsa: str, **fields: Any) -> Dict[str, Any]:
+    return {
+        "id": ghsa,
+        "summary": f"Advisory {ghsa}",
+        "aliases": ["CVE-2024-1234", "PYSEC-2024-1"],
+        "modified": "2024-02-01T00:00:00Z",
+        "published": "2024-01-01T00:00:00Z",
+        "severity": [{"type": "CVSS_V3", "score": CVSS_V3}],
+        "affected": [
+            {
+                "package": {"ecosystem": "PyPI", "name": "flask"},
+                "ranges": [
+                    {
+                        "type": "ECOSYSTEM",
+                        "events": [{"introduced": "0"}, {"fixed": "2.3.2"}],
+                    }
+                ],
+            }
+        ],
+        "references": [
+            {"type": "ADVISORY", "url": "https://nvd.nist.gov/vuln/detail/x"},
+            {"type": "PACKAGE", "url": "https://github.com/pallets/flask/"},
+        ],
+        "database_specific": {"severity": "MODERATE", "cwe_ids": ["CWE-79"]},
+        **fields,
+    }
+
+
+def write_database(root: Path, reviewed: List[Dict[str, Any]]) -> None:
+    for osv in reviewed:
+        path: Path = root / "advisories/github-reviewed/2024/01" / osv["id"]
+        path.mkdir(parents=True)
+        (path / f"{osv['id']}.json").write_text(json.dumps(osv))
+
+    unreviewed: Path = root / "advisories/unreviewed/2024/01/GHSA-uuuu-uuuu-uuuu"
+    unreviewed.mkdir(parents=True)
+    (unreviewed / "GHSA-uuuu-uuuu-uuuu.json").write_text(
+        json.dumps(make_osv("GHSA-uuuu-uuuu-uuuu"))
+    )
+
+
+def test_advisories_convert_to_reports() -> None:
+    advisory: Dict[str, Any] = osv_to_rest_advisory(
+        make_osv(
+            "GHSA-aaaa-aaaa-aaaa",
+            severity=[
+                {"type": "CVSS_V3", "score": CVSS_V3},
+                {"type": "CVSS_V4", "score": CVSS_V4},
+            ],
+        )
+    )
+    refresher = Refresher({}, None)
+
+    report: VulnReport = refresher._process_advisory(
+        advisory, refresher._get_repo(advisory)
+    )
+
+    assert report.repo == "pallets/flask"
+    assert report.cve == "CVE-2024-1234"
+    assert report.severity == "medium"
+    # OSV has vectors but no scores, the newest CVSS version is kept
+    assert report.cvss_score is None
+    assert report.cvss_vector == CVSS_V4
+    assert report.cwes == [Cwe("CWE-79", "CWE-79")]
+    assert report.affected == [AffectedPackage("pip", "flask", "< 2.3.2", "2.3.2")]
+
+    v3_only: Dict[str, Any] = osv_to_rest_advisory(make_osv("GHSA-bbbb-bbbb-bbbb"))
+    assert refresher._process_advisory(v3_only, None).cvss_vector == CVSS_V3
+    unscored: Dict[str, Any] = osv_to_rest_advisory(
+        make_osv("GHSA-cccc-cccc-cccc", severity=[])
+    )
+    assert refresher._process_advisory(unscored, None).cvss_vector is None
+
+
+def test_only_reviewed_advisories_are_loaded(tmp_path: Path) -> None:
+    write_database(
+        tmp_path,
+        [
+            make_osv("GHSA-aaaa-aaaa-aaaa"),
+            make_osv("GHSA-wwww-wwww-wwww", withdrawn="2024-03-01T00:00:00Z"),
+        ],
+    )
+    (tmp_path / "advisories/github-reviewed/GHSA-bad.json").write_text("{")
+
+    advisories: List[Dict[str, Any]] = OsvImporter(
+        {"refresher": {"import_processes": 1}}
+    ).load(tmp_path)
+
+    assert [advisory["ghsa_id"] for advisory in advisories] == ["GHSA-aaaa-aaaa-aaaa"]
+
+
+def test_imports_keep_fields_only_a_refresh_has(mongo, tmp_path: Path) -> None:
+    # stored by a refresh from the REST API
+    mongo.vuln_reports_collection.insert_one(
+        asdict(
+            VulnReport(
+                ghsa="GHSA-aaaa-aaaa-aaaa",
+                repo="pallets/flask",
+                title="Old title",
+                cve="CVE-2024-1234",
+                cwes=[Cwe("CWE-79", "Cross-site Scripting")],
+                stars=1000,
+                forks=100,
+                severity="high",
+                cvss_score=8.1,
+                cvss_vector=CVSS_V3,
+                affected=[AffectedPackage("pip", "flask")],
+            )
+        )
+    )
+    write_database(
+        tmp_path, [make_osv("GHSA-aaaa-aaaa-aaaa"), make_osv("GHSA-bbbb-bbbb-bbbb")]
+    )
+    refresher = Refresher({"refresher": {"import_processes": 1}}, mongo)
+
+    job_id = mongo.add_job_to_db(JobResponse(job_type=JobType.IMPORT))
+    refresher.import_advisories(job_id, str(tmp_path), offline=True)
+
+    existing: Dict[str, Any] = mongo.get_vuln_reports(["GHSA-aaaa-aaaa-aaaa"])[0]
+    assert existing["title"] == "Advisory GHSA-aaaa-aaaa-aaaa"
+    assert existing["severity"] == "medium"
+    assert existing["cvss_score"] == 8.1
+    assert existing["cwes"] == [{"id": "CWE-79", "title": "Cross-site Scripting"}]
+    assert (existing["stars"], existing["forks"]) == (1000, 100)
+
+    new: Dict[str, Any] = mongo.get_vuln_reports(["GHSA-bbbb-bbbb-bbbb"])[0]
+    assert new["cvss_score"] is None
+    assert new["cwes"] == [{"id": "CWE-79", "title": "CWE-79"}]
+    assert new["stars"] is None
@@ -0,0 +1,106 @@
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from models.data_models import GhsaFeed, RefreshState
+from models.enums import JobType
+from models.response_models import JobResponse
+from refresher.refresh import Refresher
+
+NEXT_PAGE = "https://api.github.com/advisories?per_page=100&after=cursor"
+
+
+def advisory(ghsa_id: str, updated_at: str) -> Dict[str, Any]:
+    return {"ghsa_id": ghsa_id, "updated_at": updated_at}
+
+
+class StandInFeed:
+    """
+    query_recent_ghsa answering with the given feeds in turn.
+    """
+
+    def __init__(self, feeds: List[Optional[GhsaFeed]]) -> None:
+        self.feeds = feeds
+        self.calls: List[Dict[str, Any]] = []
+
+    def __call__(
+        self, since: str, etag: Optional[str] = None, resume_url: Optional[str] = None
+    ) -> Optional[GhsaFeed]:
+        self.calls.append({"since": since, "etag": etag, "resume_url": resume_url})
+        return self.feeds.pop(0)
+
+
+def make_refresher(mongo, monkeypatch, feeds: List[Optional[GhsaFeed]]):
+    refresher = Refresher({}, mongo)
+    query = StandInFeed(feeds)
+    ingested: List[str] = []
+    monkeypatch.setattr(refresher.gh_apis, "query_recent_ghsa", query)
+    monkeypatch.setattr(
+        refresher,
+        "_ingest_advisories",
+        lambda job_id, advisories: ingested.extend(a["ghsa_id"] for a in advisories)
+        or set(),
+    )
+    return refresher, query, ingested
+
+
+def add_job(mongo) -> ObjectId:
+    return mongo.add_job_to_db(JobResponse(job_type=JobType.REFRESH))
+
+
+def test_incomplete_feed_is_resumed_by_the_next_refresh(mongo, monkeypatch) -> None:
+    refresher, query, ingested = make_refresher(
+        mongo,
+        monkeypatch,
+        [
+            GhsaFeed(
+                [advisory("GHSA-new", "2026-10-17T00:00:00Z")],
+                etag="first",
+                resume_url=NEXT_PAGE,
+            ),
+            GhsaFeed([advisory("GHSA-old", "2026-10-12T00:00:00Z")]),
+            GhsaFeed([], etag="first", not_modified=True),
+        ],
+    )
+
+    refresher.refresh(add_job(mongo))
+    state: RefreshState = mongo.get_refresh_state(Refresher.GHSA_SOURCE)
+    assert state.resume_url == NEXT_PAGE
+    assert state.high_water is None
+
+    refresher.refresh(add_job(mongo))
+    state = mongo.get_refresh_state(Refresher.GHSA_SOURCE)
+
+    assert query.calls[1]["resume_url"] == NEXT_PAGE
+    assert query.calls[1]["since"] == query.calls[0]["since"]
+    assert ingested == ["GHSA-new", "GHSA-old"]
+    assert state.resume_url is None
+    assert state.high_water == "2026-10-17T00:00:00Z"
+    assert state.covered_since == query.calls[0]["since"]
+    # what changed since then is fetched incrementally
+    assert query.calls[2] == {
+        "since": "2026-10-17T00:00:00Z",
+        "etag": "first",
+        "resume_url": None,
+    }
+
+
+def test_unusable_resume_point_starts_over(mongo, monkeypatch) -> None:
+    mongo.set_refresh_state(
+        RefreshState(
+            Refresher.GHSA_SOURCE,
+            etag="first",
+            resume_url=NEXT_PAGE,
+            resume_since="2026-10-11T00:00:00Z",
+            resume_high_water="2026-10-17T00:00:00Z",
+        )
+    )
+    refresher, query, _ = make_refresher(
+        mongo, monkeypatch, [None, GhsaFeed([], etag="second")]
+    )
+
+    refresher.refresh(add_job(mongo))
+
+    assert query.calls[1]["etag"] is None
+    assert query.calls[1]["resume_url"] is None
+    assert mongo.get_refresh_state(Refresher.GHSA_SOURCE).resume_url is None
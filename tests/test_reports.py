@@ -0,0 +1,161 @@
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from models.data_models import AffectedPackage, Cwe, ReportFilters, VulnReport
+
+
+def make_report(
+    ghsa: str,
+    repo: Optional[str],
+    package: str,
+    ecosystem: str = "pip",
+    severity: str = "high",
+    cvss_score: Optional[float] = 7.5,
+    stars: Optional[int] = 10,
+    cve: Optional[str] = None,
+    cwes: Optional[List[Cwe]] = None,
+) -> VulnReport:
+    return VulnReport(
+        ghsa=ghsa,
+        repo=repo,
+        title=f"Advisory {ghsa}",
+        cve=cve,
+        cwes=cwes or [],
+        stars=stars,
+        forks=0,
+        severity=severity,
+        cvss_score=cvss_score,
+        cvss_vector=None,
+        affected=[AffectedPackage(ecosystem, package)],
+    )
+
+
+def store(mongo, reports: List[VulnReport]) -> None:
+    mongo.vuln_reports_collection.insert_many([asdict(r) for r in reports])
+    mongo.rebuild_report_groups()
+
+
+def ghsas(page: Dict[str, Any]) -> List[str]:
+    return [f["ghsa"] for group in page["groups"] for f in group["findings"]]
+
+
+def groups(page: Dict[str, Any]) -> List[Tuple[Optional[str], str]]:
+    return [(group["repo"], group["pkg"]) for group in page["groups"]]
+
+
+def test_paging_by_cursor_returns_every_group_once(mongo) -> None:
+    pairs: List[Tuple[Optional[str], str]] = [
+        (repo, package)
+        for repo in ["o/b", "o/a", None, "p/a"]
+        for package in ["requests", "flask", "django"]
+    ]
+    store(
+        mongo,
+        [
+            make_report(f"GHSA-{i:04d}-0000-0000", repo, package)
+            for i, (repo, package) in enumerate(pairs)
+        ],
+    )
+
+    page: Dict[str, Any] = mongo.get_reports_by_pkg(limit=5)
+    assert page["total_groups"] == 12
+    assert page["total_findings"] == 12
+    seen: List[Tuple[Optional[str], str]] = groups(page)
+    while page["next_cursor"]:
+        page = mongo.get_reports_by_pkg(cursor=page["next_cursor"], limit=5)
+        # totals are only counted for the first page
+        assert page["total_groups"] is None
+        seen += groups(page)
+
+    # in (repo, package) order, reports without a repo first
+    assert seen == [
+        (repo, package)
+        for repo in [None, "o/a", "o/b", "p/a"]
+        for package in ["django", "flask", "requests"]
+    ]
+
+
+def test_filters_select_groups_and_their_findings(mongo) -> None:
+    store(
+        mongo,
+        [
+            make_report("GHSA-aaaa-0000-0000", "o/a", "flask", severity="critical"),
+            make_report(
+                "GHSA-bbbb-0000-0000", "o/a", "flask", severity="low", cvss_score=2.0
+            ),
+            make_report(
+                "GHSA-cccc-0000-0000",
+                "o/b",
+                "lodash",
+                ecosystem="npm",
+                cvss_score=9.8,
+                stars=500,
+            ),
+            make_report("GHSA-dddd-0000-0000", None, "django", cvss_score=None),
+        ],
+    )
+
+    def search(**filters: Any) -> List[str]:
+        page: Dict[str, Any] = mongo.get_reports_by_pkg(ReportFilters(**filters))
+        assert page["total_findings"] == len(ghsas(page))
+        return ghsas(page)
+
+    assert search(ecosystem="NPM") == ["GHSA-cccc-0000-0000"]
+    # only the matching finding of the o/a flask group
+    assert search(severity="Low") == ["GHSA-bbbb-0000-0000"]
+    assert search(cvss_min=7.0, cvss_max=9.0) == ["GHSA-aaaa-0000-0000"]
+    # findings without a score are never in a range
+    assert search(cvss_max=5.0) == ["GHSA-bbbb-0000-0000"]
+    assert search(min_stars=100) == ["GHSA-cccc-0000-0000"]
+    assert search(has_repo=False) == ["GHSA-dddd-0000-0000"]
+    assert search(has_repo=True) == [
+        "GHSA-aaaa-0000-0000",
+        "GHSA-bbbb-0000-0000",
+        "GHSA-cccc-0000-0000",
+    ]
+    assert search(ecosystem="pip", cvss_min=5.0, has_repo=True) == [
+        "GHSA-aaaa-0000-0000"
+    ]
+
+
+def test_advisory_id_searches_match_exactly(mongo) -> None:
+    store(
+        mongo,
+        [
+            make_report(
+                "GHSA-aaaa-bbbb-cccc",
+                "o/a",
+                "flask",
+                cve="CVE-2024-1234",
+                cwes=[Cwe("CWE-89", "SQL Injection"), Cwe("CWE-79", "XSS")],
+            ),
+            make_report("GHSA-dddd-eeee-ffff", "o/a", "flask", cve="CVE-2024-5678"),
+            make_report("GHSA-gggg-hhhh-jjjj", "o/b", "django"),
+        ],
+    )
+
+    for query in ["GHSA-AAAA-BBBB-CCCC", "cve-2024-1234", " CWE-79 "]:
+        page = mongo.get_reports_by_pkg(ReportFilters(query=query))
+        assert ghsas(page) == ["GHSA-aaaa-bbbb-cccc"], query
+        assert page["total_groups"] == 1
+
+
+def test_free_text_searches_are_phrases_sorted_by_relevance(mongo) -> None:
+    pipelines: List[List[Dict[str, Any]]] = []
+
+    def aggregate(pipeline: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        pipelines.append(pipeline)
+        return iter([])
+
+    # mongomock has no $text, check what would be sent to MongoDB
+    mongo.report_groups_collection.aggregate = aggregate
+    mongo.get_reports_by_pkg(ReportFilters(query='sql "injection'))
+
+    page_pipeline: List[Dict[str, Any]] = pipelines[0]
+    assert page_pipeline[0] == {"$match": {"$text": {"$search": '"sql  injection"'}}}
+    assert page_pipeline[1] == {"$addFields": {"score": {"$meta": "textScore"}}}
+    assert {"$sort": {"score": -1, "repo_key": 1, "pkg_key": 1}} in page_pipeline
+
+    cursor: str = mongo._encode_reports_cursor([1.5, "o/a", "flask"])
+    mongo.get_reports_by_pkg(ReportFilters(query="sql"), cursor=cursor)
+    assert pipelines[-1][2]["$match"]["$or"][0] == {"score": {"$lt": 1.5}}
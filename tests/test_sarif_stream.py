@@ -0,0 +1,112 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import pytest
+
+from scanner.sarif_stream import SarifReader
+
+SARIF: Dict[str, Any] = {
+    "version": "2.1.0",
+    "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+    "runs": [
+        {
+            "tool": {"driver": {"name": "semgrep", "rules": [{"id": "py.a"}]}},
+            "results": [
+                {
+                    "ruleId": "py.a",
+                    "message": {"text": 'quote " backslash \\ tab \t newline \n'},
+                    "locations": [
+                        {
+                            "physicalLocation": {
+                                "artifactLocation": {"uri": "src/app.py"},
+                                "region": {
+                                    "startLine": 1500,
+                                    "startColumn": 12,
+                                    "snippet": {"text": "héllo → wörld 😀 \u0000"},
+                                },
+                            }
+                        }
+                    ],
+                    "properties": {
+                        "score": -1.5e-3,
+                        "flags": [True, False, None],
+                        "empty": {},
+                        "nothing": [],
+                    },
+                },
+                {"ruleId": "py.b", "message": {"text": "}]{[,:"}, "level": "note"},
+            ],
+            "invocations": [{"executionSuccessful": True}],
+        },
+        {"tool": {"driver": {"name": "semgrep"}}, "results": []},
+        {"tool": {"driver": {"name": "other"}}},
+    ],
+    "trailing": 12345678901234567890,
+}
+
+
+def read(path: Path) -> Tuple[List[Tuple[int, Dict[str, Any]]], Dict[str, Any]]:
+    reader = SarifReader(path)
+    results: List[Tuple[int, Dict[str, Any]]] = list(reader.iter_results())
+    return results, reader.envelope
+
+
+def expected_results(document: Dict[str, Any]) -> List[Tuple[int, Dict[str, Any]]]:
+    return [
+        (index, result)
+        for index, run in enumerate(document["runs"])
+        for result in run.get("results", [])
+    ]
+
+
+def expected_envelope(document: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **document,
+        "runs": [
+            {key: value for key, value in run.items() if key != "results"}
+            for run in document["runs"]
+        ],
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_matches_json_loads(
+    monkeypatch, tmp_path: Path, chunk_size: int, ensure_ascii: bool, indent
+) -> None:
+    # escapes, multi-byte characters and numbers land on chunk boundaries
+    monkeypatch.setattr(SarifReader, "CHUNK_SIZE", chunk_size)
+    path: Path = tmp_path / "scan.sarif"
+    path.write_text(
+        json.dumps(SARIF, ensure_ascii=ensure_ascii, indent=indent), encoding="utf-8"
+    )
+    document: Dict[str, Any] = json.loads(path.read_text(encoding="utf-8"))
+
+    results, envelope = read(path)
+
+    assert results == expected_results(document)
+    assert envelope == expected_envelope(document)
+
+
+def test_every_split_point_of_an_escaped_string(monkeypatch, tmp_path) -> None:
+    monkeypatch.setattr(SarifReader, "CHUNK_SIZE", 1)
+    text: str = json.dumps(
+        {"runs": [{"results": [{"t": 'a\\"b\\u00e9\\ud83d\\ude00c'}]}]}
+    )
+    for padding in range(8):
+        path: Path = tmp_path / f"scan{padding}.sarif"
+        path.write_text(" " * padding + text, encoding="utf-8")
+
+        results, _ = read(path)
+
+        assert results == expected_results(json.loads(text))
+
+
+def test_malformed_documents_raise(tmp_path: Path) -> None:
+    for text in ['{"runs": [{"results": [1, 2}]}', '{"runs": [', "[]"]:
+        path: Path = tmp_path / "bad.sarif"
+        path.write_text(text)
+        with pytest.raises(ValueError):
+            read(path)
@@ -0,0 +1,32 @@
+from typing import Any, Dict
+
+from flask import Flask
+
+CACHE_KEY: Dict[str, str] = {"rules_hash": "rules", "config_hash": "config"}
+
+
+def make_result(rule_id: str, uri: str) -> Dict[str, Any]:
+    return {
+        "ruleId": rule_id,
+        "fingerprints": {"paladin": f"{rule_id}-{uri}"},
+        "locations": [{"physicalLocation": {"artifactLocation": {"uri": uri}}}],
+    }
+
+
+def test_scans_are_listed_after_a_cache_hit(mongo) -> None:
+    scan_id = mongo.create_scan("owner/repo", "abc123")
+    mongo.add_findings(scan_id, 0, [make_result("py.a", "app.py")])
+    mongo.finish_scan(scan_id, {"runs": [{}]}, 1, CACHE_KEY)
+
+    cached_id = mongo.find_cached_scan("owner/repo", "abc123", CACHE_KEY)
+    assert cached_id == scan_id
+    copy_id = mongo.copy_scan(cached_id)
+
+    scans: Dict[str, Any] = mongo.get_scans_from_db("owner/repo")
+
+    # what /api/scans/<repo> returns
+    Flask(__name__).json.dumps(scans)
+    assert scans["total"] == 2
+    copy = next(scan for scan in scans["scans"] if scan["_id"] == str(copy_id))
+    assert copy["cached_from"] == str(scan_id)
+    assert mongo.findings_collection.count_documents({"scan_id": copy_id}) == 1
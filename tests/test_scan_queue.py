@@ -0,0 +1,61 @@
+import time
+from dataclasses import asdict
+from datetime import datetime, timedelta, timezone
+
+from bson import ObjectId
+
+from models.data_models import ScanResult
+from models.enums import JobStatus
+from models.response_models import JobResponse
+
+
+def test_stale_claimed_jobs_are_requeued(mongo) -> None:
+    job_id: ObjectId = mongo.add_job_to_db(JobResponse(repo="https://github.com/o/r"))
+
+    job = mongo.claim_next_scan_job("worker-1")
+    assert job._id == job_id
+    stored = mongo.jobs_collection.find_one({"_id": job_id})
+    for key in ["created_at", "updated_at", "heartbeat_at"]:
+        assert isinstance(stored[key], datetime)
+
+    # a heartbeat keeps the job with its worker
+    mongo.heartbeat_jobs([job_id])
+    assert mongo.requeue_stale_jobs(stale_after=60, max_attempts=3) == 0
+
+    mongo.jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {"heartbeat_at": stored["heartbeat_at"] - timedelta(minutes=5)}},
+    )
+    assert mongo.requeue_stale_jobs(stale_after=60, max_attempts=3) == 1
+    assert mongo.get_job_by_id(str(job_id)).status == JobStatus.PENDING
+
+
+def test_scans_left_incomplete_are_hidden_and_cleaned_up(mongo) -> None:
+    job_id: ObjectId = mongo.add_job_to_db(JobResponse(repo="https://github.com/o/r"))
+    mongo.claim_next_scan_job("worker-1")
+
+    complete_id: ObjectId = mongo.create_scan("o/r", "abc123")
+    mongo.finish_scan(complete_id, {"runs": [{}]}, 0)
+    # written by the worker before it died
+    started: datetime = datetime.now(timezone.utc) - timedelta(minutes=5)
+    partial_id: ObjectId = mongo.scan_result_collection.insert_one(
+        {
+            **asdict(ScanResult("o/r", {"runs": [{}]}, commit="def456")),
+            "_id": ObjectId.from_datetime(started),
+            "job_id": job_id,
+        }
+    ).inserted_id
+    mongo.scan_result_collection.update_one(
+        {"_id": partial_id}, {"$set": {"timestamp": int(time.time()) + 60}}
+    )
+
+    assert mongo.get_latest_scan("o/r")["_id"] == complete_id
+    assert mongo.get_latest_scans(["o/r"])["o/r"]["commit"] == "abc123"
+    assert mongo.get_scans_from_db("o/r")["total"] == 1
+
+    mongo.jobs_collection.update_one(
+        {"_id": job_id}, {"$set": {"heartbeat_at": started}}
+    )
+    assert mongo.requeue_stale_jobs(stale_after=60, max_attempts=3) == 1
+    assert mongo.scan_result_collection.find_one({"_id": partial_id}) is None
+    assert mongo.scan_result_collection.find_one({"_id": complete_id})
@@ -0,0 +1,11 @@
+from utils.schema import SchemaManager
+
+
+def test_workers_only_start_once_migrations_are_applied(mongo) -> None:
+    schema = SchemaManager(mongo)
+    assert not schema.check()
+
+    schema.bootstrap()
+
+    assert schema.check()
+    assert schema.get_applied() == {version for version, _, _ in schema.migrations}
@@ -0,0 +1,62 @@
+from scanner.suppression import SuppressionMatcher
+
+
+def test_paths_match_anywhere_in_the_rule_id() -> None:
+    matcher = SuppressionMatcher(paths=["best-practice", "audit"])
+
+    assert matcher.is_suppressed("python.lang.best-practice.open-never-closed")
+    assert matcher.is_suppressed("go.lang.security.audit.xss")
+    assert not matcher.is_suppressed("python.lang.security.eval")
+
+
+def test_rules_match_exactly() -> None:
+    matcher = SuppressionMatcher(rules=["python.lang.security.eval"])
+
+    assert matcher.is_suppressed("python.lang.security.eval")
+    assert not matcher.is_suppressed("python.lang.security.eval-injection")
+
+
+def test_globs_match_the_whole_rule_id() -> None:
+    matcher = SuppressionMatcher(patterns=["go.lang.*.unsafe-*"])
+
+    assert matcher.is_suppressed("go.lang.security.unsafe-reflect")
+    assert not matcher.is_suppressed("go.lang.security.safe-reflect")
+    assert not matcher.is_suppressed("x.go.lang.security.unsafe-reflect")
+
+
+def test_regexes_match_the_whole_rule_id() -> None:
+    matcher = SuppressionMatcher(patterns=[r"re:python\.django\..*-(csrf|xss)"])
+
+    assert matcher.is_suppressed("python.django.security.missing-csrf")
+    assert not matcher.is_suppressed("python.django.security.missing-csrf-token")
+
+
+def test_invalid_patterns_are_skipped() -> None:
+    matcher = SuppressionMatcher(patterns=["re:python.(unclosed", "java.*"])
+
+    assert matcher.is_suppressed("java.lang.security.xxe")
+    assert not matcher.is_suppressed("python.(unclosed")
+
+
+def test_patterns_with_the_same_group_name_still_match() -> None:
+    matcher = SuppressionMatcher(
+        patterns=[r"re:(?P<lang>go)\..*", r"re:(?P<lang>java)\.lang\..*"]
+    )
+
+    assert matcher.is_suppressed("go.lang.security.xss")
+    assert matcher.is_suppressed("java.lang.security.xxe")
+    assert not matcher.is_suppressed("python.lang.security.eval")
+
+
+def test_repo_overrides_replace_the_global_settings() -> None:
+    settings = {
+        "suppress_rules": ["python.lang.security.eval"],
+        "repo_overrides": {"o/r": {"suppress_rules": []}},
+    }
+
+    assert SuppressionMatcher.from_settings(settings).is_suppressed(
+        "python.lang.security.eval"
+    )
+    assert not SuppressionMatcher.from_settings(settings, "o/r").is_suppressed(
+        "python.lang.security.eval"
+    )
@@ -0,0 +1,142 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from pymongo import UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from models.data_models import BulkWriteSummary
+
+logging.basicConfig(level=logging.INFO)
+
+
+class BulkWriter:
+    """
+    Buffers documents and writes them as unordered bulk_write batches, once
+    `batch_size` documents are buffered or the oldest has waited
+    `flush_interval` seconds. Only the operations that failed are retried.
+    `on_flush` is called with the items of each batch that were written.
+    """
+
+    def __init__(
+        self,
+        collection: Collection,
+        to_operation: Callable[[Any], UpdateOne],
+        batch_size: int = 500,
+        flush_interval: float = 2,
+        max_retries: int = 3,
+        on_flush: Optional[Callable[[List[Any]], None]] = None,
+    ) -> None:
+        self.collection = collection
+        self.to_operation = to_operation
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.on_flush = on_flush
+        self.logger = logging.getLogger(__name__)
+
+        self._buffer: List[Any] = []
+        self._first_added: float = 0
+        self._lock = threading.Lock()
+
+    def add(self, item: Any) -> Optional[BulkWriteSummary]:
+        """
+        Buffer an item. Returns the summary of the batch if this flushed one.
+        """
+        with self._lock:
+            if not self._buffer:
+                self._first_added = time.monotonic()
+            self._buffer.append(item)
+
+        return self.flush() if self.is_due() else None
+
+    def is_due(self) -> bool:
+        with self._lock:
+            return bool(self._buffer) and (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._first_added >= self.flush_interval
+            )
+
+    def flush(self) -> Optional[BulkWriteSummary]:
+        with self._lock:
+            items: List[Any] = self._buffer
+            self._buffer = []
+
+        if not items:
+            return None
+
+        try:
+            summary: BulkWriteSummary = self._write(items)
+        except Exception as e:
+            # report the whole batch as failed rather than dropping it
+            self.logger.error(f"Bulk write to {self.collection.name} failed: {e}")
+            summary = BulkWriteSummary(failed=list(items))
+
+        if self.on_flush:
+            failed: Set[int] = {id(item) for item in summary.failed}
+            written: List[Any] = [item for item in items if id(item) not in failed]
+            try:
+                self.on_flush(written)
+            except PyMongoError as e:
+                # report them as failed so the caller writes them again
+                self.logger.error(
+                    f"Post-write update of {self.collection.name} failed: {e}"
+                )
+                summary.failed.extend(written)
+
+        self.logger.info(
+            f"Bulk wrote {len(items)} to {self.collection.name}: "
+            f"{summary.matched} matched, {summary.modified} modified, "
+            f"{summary.upserted} upserted, {len(summary.failed)} failed"
+        )
+        return summary
+
+    def _write(self, items: List[Any]) -> BulkWriteSummary:
+        summary = BulkWriteSummary()
+        pending: List[Any] = items
+
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                # full jitter, the same backoff as the GitHub client
+                time.sleep(random.uniform(0, min(10, 0.5 * 2**attempt)))
+
+            try:
+                result = self.collection.bulk_write(
+                    [self.to_operation(item) for item in pending], ordered=False
+                )
+                summary.matched += result.matched_count
+                summary.modified += result.modified_count
+                summary.upserted += result.upserted_count
+                return summary
+            except BulkWriteError as e:
+                details: Dict[str, Any] = e.details
+                write_errors: List[Dict[str, Any]] = details.get("writeErrors", [])
+                if not write_errors:
+                    # only write concern errors: the writes may not be durable,
+                    # retry the whole batch (the upserts are idempotent)
+                    self.logger.warning(
+                        f"Bulk write to {self.collection.name} was not "
+                        f"acknowledged: {details.get('writeConcernErrors')}"
+                    )
+                    continue
+
+                # unordered: everything but the reported errors was applied
+                summary.matched += details.get("nMatched", 0)
+                summary.modified += details.get("nModified", 0)
+                summary.upserted += details.get("nUpserted", 0)
+                failed: List[int] = [error["index"] for error in write_errors]
+                self.logger.warning(
+                    f"{len(failed)} of {len(pending)} writes to "
+                    f"{self.collection.name} failed: "
+                    f"{write_errors[0].get('errmsg')}"
+                )
+                pending = [pending[i] for i in failed]
+            except PyMongoError as e:
+                # nothing is known to be applied, retry the whole batch
+                self.logger.warning(f"Bulk write to {self.collection.name} failed: {e}")
+
+        summary.failed = pending
+        return summary
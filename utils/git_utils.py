@@ -0,0 +1,26 @@
+import logging
+from typing import Optional
+
+import git
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO)
+
+
+def get_remote_head(repo_url: str) -> Optional[str]:
+    """
+    The commit HEAD points to on the remote, read with ls-remote without
+    cloning. None if the remote cannot be reached.
+    """
+    try:
+        output: str = git.cmd.Git().ls_remote(
+            repo_url,
+            "HEAD",
+            env={"GIT_TERMINAL_PROMPT": "0"},
+            kill_after_timeout=30,
+        )
+    except git.GitCommandError as e:
+        logger.info(f"ls-remote of {repo_url} failed: {e}")
+        return None
+
+    return output.split()[0] if output else None
@@ -1,18 +1,35 @@
+import base64
+import json
+import re
 from dataclasses import asdict
-from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 from urllib.parse import unquote
 
 from bson import ObjectId
-from pymongo import MongoClient
+from pymongo import (ASCENDING, DESCENDING, DeleteOne, MongoClient, ReplaceOne,
+                     ReturnDocument, UpdateOne)
 from pymongo.results import DeleteResult
 
-from models.data_models import Cwe, ScanResult, VulnReport
-from models.enums import JobStatus
+from models.data_models import (Cwe, Finding, RefreshState, RepoInfo,
+                                ReportFilters, ReviewFilters, ScanResult,
+                                ScanStats, VulnReport)
+from models.enums import JobStatus, JobType
 from models.response_models import JobResponse
+from utils.bulk_writer import BulkWriter
 
 
 class MongoUtils:
+    REPORT_GROUPS_BATCH_SIZE = 500
+    # scans still being written are never used or listed
+    COMPLETE_SCANS: Dict[str, Any] = {"complete": {"$ne": False}}
+    # searches for an advisory id match the finding field exactly
+    ADVISORY_ID_PATTERNS: Dict[str, re.Pattern] = {
+        "ghsa": re.compile(r"GHSA(-[0-9a-z]{4}){3}", re.IGNORECASE),
+        "cve": re.compile(r"CVE-\d{4}-\d{4,}", re.IGNORECASE),
+        "cwes.id": re.compile(r"CWE-\d+", re.IGNORECASE),
+    }
+
     def __init__(self, config: Dict[str, Any]):
         self.mongo_path: str = "mongo:27017"
         self.client: MongoClient = MongoClient(f"mongodb://{self.mongo_path}")
@@ -21,79 +38,888 @@ class MongoUtils:
         self.scan_metadata = self.db.scan_metadata
         self.jobs_collection = self.db.scan_jobs
         self.scan_result_collection = self.db.scan_results
+        self.findings_collection = self.db.findings
         self.cwe_collection = self.db.cwes
+        self.refresh_state_collection = self.db.refresh_state
+        self.advisory_hashes_collection = self.db.advisory_hashes
+        self.repo_info_cache_collection = self.db.repo_info_cache
+        self.cache_stats_collection = self.db.cache_stats
+        self.review_cache_collection = self.db.review_cache
+        self.report_groups_collection = self.db.report_groups
+
+    def get_reports_by_pkg(
+        self,
+        filters: Optional[ReportFilters] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        Reports grouped by repo and package, read from the report_groups view,
+        filtered on the server and paged by an opaque cursor over the
+        (repo, package) sort order. Totals are only counted for the first
+        page. A text search is sorted by relevance first. Raises ValueError
+        for an invalid cursor.
+        """
+        filters = filters or ReportFilters()
+        finding_match: Dict[str, Any] = self._build_finding_match(filters)
+        match: Dict[str, Any] = self._build_reports_match(filters, finding_match)
+        scored: bool = "$text" in match
 
-    def get_reports_by_pkg(self):
-        pipeline = [
+        page_match: Dict[str, Any] = {}
+        if cursor:
+            keys: List[Any] = self._decode_reports_cursor(cursor, scored)
+            repo_key, pkg_key = keys[-2:]
+            page_match = {
+                "$or": [
+                    {"repo_key": {"$gt": repo_key}},
+                    {"repo_key": repo_key, "pkg_key": {"$gt": pkg_key}},
+                ]
+            }
+            if scored:
+                page_match = {
+                    "$or": [
+                        {"score": {"$lt": keys[0]}},
+                        {"score": keys[0], **page_match},
+                    ]
+                }
+
+        # only the findings of a group that match the filters are returned
+        findings: Any = (
             {
-                "$group": {
-                    "_id": {"repo": "$repo", "pkg": "$package"},
-                    "findings": {
-                        "$push": {
-                            "ghsa": "$ghsa",
-                            "cve": "$cve",
-                            "cwe": "$cwe",
-                            "forks": "$forks",
-                            "stars": "$stars",
-                            "title": "$title",
-                            "cvss_score": "$cvss_score",
-                            "cvss_vector": "$cvss_vector",
-                            "severity": "$severity",
-                            "ecosystem": "$ecosystem",
-                        }
-                    },
+                "$filter": {
+                    "input": "$findings",
+                    "as": "finding",
+                    "cond": self._build_finding_expr(finding_match),
                 }
-            },
+            }
+            if finding_match
+            else "$findings"
+        )
+
+        sort: Dict[str, int] = {"repo_key": 1, "pkg_key": 1}
+        pipeline: List[Dict[str, Any]] = [{"$match": match}]
+        if scored:
+            # $text has to be in the first stage, the cursor is matched after
+            pipeline.append({"$addFields": {"score": {"$meta": "textScore"}}})
+            sort = {"score": -1, **sort}
+        pipeline += [
+            {"$match": page_match},
+            {"$sort": sort},
+            # one extra to know whether there is a next page
+            {"$limit": limit + 1},
             {
                 "$project": {
                     "_id": 0,
-                    "repo": "$_id.repo",
-                    "pkg": "$_id.pkg",
-                    "findings": 1,
+                    "repo": 1,
+                    "pkg": 1,
+                    "repo_key": 1,
+                    "pkg_key": 1,
+                    "score": 1,
+                    "findings": findings,
                 }
             },
-            {"$sort": {"repo": 1}},
         ]
-        return list(self.vuln_reports_collection.aggregate(pipeline))
+        groups: List[Dict[str, Any]] = list(
+            self.report_groups_collection.aggregate(pipeline)
+        )
+
+        next_cursor: Optional[str] = None
+        if len(groups) > limit:
+            groups = groups[:limit]
+            next_cursor = self._encode_reports_cursor([groups[-1][key] for key in sort])
+
+        for group in groups:
+            del group["repo_key"], group["pkg_key"]
+            group.pop("score", None)
+
+        totals: Dict[str, Any] = {}
+        if not cursor:
+            totals = next(
+                self.report_groups_collection.aggregate(
+                    [
+                        {"$match": match},
+                        {
+                            "$group": {
+                                "_id": None,
+                                "groups": {"$sum": 1},
+                                "findings": {"$sum": {"$size": findings}},
+                            }
+                        },
+                    ]
+                ),
+                {"groups": 0, "findings": 0},
+            )
+
+        return {
+            "groups": groups,
+            "total_groups": totals.get("groups"),
+            "total_findings": totals.get("findings"),
+            "next_cursor": next_cursor,
+        }
+
+    def _build_reports_match(
+        self, filters: ReportFilters, finding_match: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        match: Dict[str, Any] = {}
+
+        # advisory ids are matched exactly by _build_finding_match
+        if filters.query and not self._parse_advisory_id(filters.query):
+            # a phrase, $text would otherwise match any of its words
+            phrase: str = filters.query.replace('"', " ").strip()
+            if phrase:
+                match["$text"] = {"$search": f'"{phrase}"'}
+        if finding_match:
+            match["findings"] = {"$elemMatch": finding_match}
+
+        if filters.has_repo is True:
+            match["repo"] = {"$nin": [None, ""]}
+        elif filters.has_repo is False:
+            match["repo"] = {"$in": [None, ""]}
+
+        return match
+
+    def _build_finding_match(self, filters: ReportFilters) -> Dict[str, Any]:
+        """
+        Conditions on a single finding of a group, as {field: {operator: value}}.
+        """
+        match: Dict[str, Any] = {}
+
+        advisory_id: Optional[Tuple[str, str]] = (
+            self._parse_advisory_id(filters.query) if filters.query else None
+        )
+        if advisory_id:
+            match[advisory_id[0]] = {"$eq": advisory_id[1]}
+        if filters.ecosystem:
+            match["ecosystem"] = {"$eq": filters.ecosystem.lower()}
+        if filters.severity:
+            match["severity"] = {"$eq": filters.severity.lower()}
+
+        cvss: Dict[str, float] = {}
+        if filters.cvss_min is not None:
+            cvss["$gte"] = filters.cvss_min
+        if filters.cvss_max is not None:
+            cvss["$lte"] = filters.cvss_max
+        if cvss:
+            match["cvss_score"] = cvss
+
+        if filters.min_stars is not None:
+            match["stars"] = {"$gte": filters.min_stars}
 
-    def add_scan_result_to_db(self, repo: str, sarif: Dict[str, Any]):
+        return match
+
+    def _build_finding_expr(self, finding_match: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The same conditions as an expression on $$finding, for $filter.
+        """
+        conditions: List[Dict[str, Any]] = []
+        for field, operators in finding_match.items():
+            value_path: str = f"$$finding.{field}"
+            if field == "cwes.id":
+                # a path into an array of CWEs resolves to the list of ids
+                conditions.append(
+                    {"$in": [operators["$eq"], {"$ifNull": [value_path, []]}]}
+                )
+                continue
+
+            for operator, value in operators.items():
+                conditions.append({operator: [value_path, value]})
+            if "$eq" not in operators:
+                # null sorts below numbers, but a query range never matches it
+                conditions.append({"$ne": [value_path, None]})
+
+        return {"$and": conditions}
+
+    def _parse_advisory_id(self, query: str) -> Optional[Tuple[str, str]]:
+        """
+        The finding field and stored form of a GHSA, CVE or CWE id query.
+        """
+        query = query.strip()
+        for field, pattern in self.ADVISORY_ID_PATTERNS.items():
+            if pattern.fullmatch(query):
+                # GHSA ids are stored as GHSA-xxxx-xxxx-xxxx
+                if field == "ghsa":
+                    return field, "GHSA" + query[4:].lower()
+                return field, query.upper()
+        return None
+
+    def _encode_reports_cursor(self, keys: List[Any]) -> str:
+        raw: bytes = json.dumps(keys).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii")
+
+    def _decode_reports_cursor(self, cursor: str, scored: bool = False) -> List[Any]:
+        """
+        The (repo, package) keys of the last group on the previous page,
+        after its text score for a text search.
+        """
+        try:
+            keys = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except (ValueError, UnicodeError) as e:
+            raise ValueError(f"invalid cursor: {e}")
+
+        if (
+            not isinstance(keys, list)
+            or len(keys) != 2 + scored
+            or not all(isinstance(k, str) for k in keys[-2:])
+            or (scored and not isinstance(keys[0], (int, float)))
+        ):
+            raise ValueError("invalid cursor")
+
+        return keys
+
+    def create_scan(
+        self,
+        repo: str,
+        commit: Optional[str] = None,
+        job_id: Optional[ObjectId] = None,
+    ) -> ObjectId:
+        """
+        Insert a scan header with no findings yet. Findings are added in
+        batches with add_findings and the SARIF envelope with finish_scan,
+        which marks the scan complete.
+        """
         scan_result = ScanResult(
             repo=repo,
-            scan_result=sarif,
+            scan_result={"runs": [{"results": []}]},
+            commit=commit,
+            job_id=job_id,
         )
 
-        self.scan_result_collection.insert_one(asdict(scan_result))
+        return self.scan_result_collection.insert_one(asdict(scan_result)).inserted_id
 
-    def get_scans_from_db(self, repo: str):
-        repo = unquote(repo)
+    def add_findings(
+        self, scan_id: ObjectId, start_seq: int, results: List[Dict[str, Any]]
+    ) -> None:
+        findings: List[Dict[str, Any]] = [
+            asdict(self._finding_from_result(scan_id, start_seq + i, result))
+            for i, result in enumerate(results)
+        ]
+        self.findings_collection.insert_many(findings, ordered=False)
 
-        results = self.scan_result_collection.find({"repo": repo}).to_list()
-        for r in results:
-            r["_id"] = str(r["_id"])
-            sarif = r.get("scan_result", None)
-            if not sarif:
-                continue
+    def finish_scan(
+        self,
+        scan_id: ObjectId,
+        envelope: Dict[str, Any],
+        findings_count: int,
+        cache_key: Optional[Dict[str, str]] = None,
+    ) -> None:
+        """
+        Store the SARIF envelope (everything but the results), the summary
+        stats of the findings and the result cache key on the scan header,
+        and mark the scan complete.
+        """
+        sarif: Dict[str, Any] = {
+            **envelope,
+            "runs": [
+                {key: value for key, value in run.items() if key != "results"}
+                for run in envelope.get("runs", [])
+            ],
+        }
+        self.scan_result_collection.update_one(
+            {"_id": scan_id},
+            {
+                "$set": {
+                    "scan_result": sarif,
+                    "findings_count": findings_count,
+                    "stats": asdict(self.compute_scan_stats(scan_id)),
+                    "complete": True,
+                    **(cache_key or {}),
+                }
+            },
+        )
+
+    def find_cached_scan(
+        self, repo: str, commit: str, cache_key: Dict[str, str]
+    ) -> Optional[ObjectId]:
+        """
+        Latest complete scan of the repo at the commit with the same rules
+        and settings.
+        """
+        scan = self.scan_result_collection.find_one(
+            {"repo": repo, "commit": commit, **cache_key},
+            {"_id": 1},
+            sort=[("timestamp", DESCENDING)],
+        )
+        return scan["_id"] if scan else None
+
+    def copy_scan(
+        self,
+        scan_id: ObjectId,
+        batch_size: int = 1000,
+        job_id: Optional[ObjectId] = None,
+    ) -> ObjectId:
+        """
+        New scan with copies of the findings of scan_id, keeping their
+        suppressions and AI reviews.
+        """
+        scan: Dict[str, Any] = self.scan_result_collection.find_one({"_id": scan_id})
+        cache_key: Dict[str, str] = {
+            "rules_hash": scan.pop("rules_hash"),
+            "config_hash": scan.pop("config_hash"),
+        }
+        del scan["_id"]
+        scan["timestamp"] = int(datetime.now(timezone.utc).timestamp())
+        scan["cached_from"] = scan_id
+        scan["job_id"] = job_id
+        scan["complete"] = False
+        copy_id: ObjectId = self.scan_result_collection.insert_one(scan).inserted_id
+
+        try:
+            batch: List[Dict[str, Any]] = []
+            for finding in self.findings_collection.find(
+                {"scan_id": scan_id}, {"_id": 0}
+            ):
+                finding["scan_id"] = copy_id
+                batch.append(finding)
+                if len(batch) >= batch_size:
+                    self.findings_collection.insert_many(batch, ordered=False)
+                    batch = []
+            if batch:
+                self.findings_collection.insert_many(batch, ordered=False)
+        except Exception:
+            self.delete_scan_by_id(str(copy_id))
+            raise
+
+        # a partial copy must never be a cache hit itself
+        self.scan_result_collection.update_one(
+            {"_id": copy_id}, {"$set": {**cache_key, "complete": True}}
+        )
+        return copy_id
+
+    def compute_scan_stats(self, scan_id: ObjectId) -> ScanStats:
+        """
+        Per-severity and per-rule counts of a scan's findings, counted on the
+        server. Rules are kept as a list since rule ids contain dots.
+        """
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"scan_id": scan_id}},
+            {
+                "$facet": {
+                    "by_severity": [
+                        {
+                            "$group": {
+                                # warning is the SARIF default level
+                                "_id": {"$ifNull": ["$result.level", "warning"]},
+                                "count": {"$sum": 1},
+                            }
+                        }
+                    ],
+                    "by_rule": [
+                        {"$group": {"_id": "$rule_id", "count": {"$sum": 1}}},
+                        {"$sort": {"count": -1, "_id": 1}},
+                    ],
+                    "suppressed": [
+                        {"$match": {"suppressed": True}},
+                        {"$count": "count"},
+                    ],
+                }
+            },
+        ]
+        facets: Dict[str, Any] = next(self.findings_collection.aggregate(pipeline), {})
+
+        return ScanStats(
+            by_severity={
+                group["_id"]: group["count"] for group in facets.get("by_severity", [])
+            },
+            by_rule=[
+                {"rule_id": group["_id"], "count": group["count"]}
+                for group in facets.get("by_rule", [])
+            ],
+            suppressed=(facets.get("suppressed") or [{}])[0].get("count", 0),
+        )
+
+    def iter_scan_results(self, scan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        SARIF results of a scan header in order, read from the findings
+        collection, or from the embedded SARIF of scans stored before findings
+        were split out.
+        """
+        embedded: List[Dict[str, Any]] = (
+            scan["scan_result"].get("runs", [{}])[0].get("results", [])
+        )
+        if embedded:
+            yield from embedded
+            return
+
+        for finding in self.findings_collection.find({"scan_id": scan["_id"]}).sort(
+            "seq", ASCENDING
+        ):
+            yield self._result_from_finding(finding)
+
+    def iter_triaged_results(self, scan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        SARIF results of a scan header that were suppressed or AI reviewed.
+        """
+        embedded: List[Dict[str, Any]] = (
+            scan["scan_result"].get("runs", [{}])[0].get("results", [])
+        )
+        if embedded:
+            yield from (
+                result
+                for result in embedded
+                if result.get("suppressed") or result.get("aiReview")
+            )
+            return
+
+        for finding in self.findings_collection.find(
+            {
+                "scan_id": scan["_id"],
+                "$or": [
+                    {"suppressed": True},
+                    {"result.aiReview": {"$exists": True}},
+                ],
+            }
+        ).sort("seq", ASCENDING):
+            yield self._result_from_finding(finding)
+
+    def get_existing_fingerprints(
+        self, scan_id: ObjectId, fingerprints: List[str]
+    ) -> Set[str]:
+        """
+        The fingerprints that a finding of the scan has.
+        """
+        return {
+            finding["fingerprint"]
+            for finding in self.findings_collection.find(
+                {"scan_id": scan_id, "fingerprint": {"$in": fingerprints}},
+                {"_id": 0, "fingerprint": 1},
+            )
+        }
+
+    def find_findings_by_snippet(
+        self, scan_id: ObjectId, snippet_fingerprints: List[str]
+    ) -> List[Tuple[str, str]]:
+        """
+        Fingerprint and snippet fingerprint of the findings of a scan with
+        one of the snippet fingerprints, in SARIF order.
+        """
+        cursor = self.findings_collection.find(
+            {
+                "scan_id": scan_id,
+                "result.fingerprints.paladinSnippet": {"$in": snippet_fingerprints},
+            },
+            {"_id": 0, "fingerprint": 1, "result.fingerprints.paladinSnippet": 1},
+        ).sort("seq", ASCENDING)
+
+        return [
+            (
+                finding["fingerprint"],
+                finding["result"]["fingerprints"]["paladinSnippet"],
+            )
+            for finding in cursor
+        ]
+
+    def set_findings_triage(
+        self, scan_id: ObjectId, triage: Dict[str, Dict[str, Any]]
+    ) -> None:
+        """
+        Set the suppressed state and AI review of findings of a scan that is
+        still being written, by fingerprint. Stats are computed by finish_scan.
+        """
+        updates: List[UpdateOne] = []
+        for fingerprint, state in triage.items():
+            fields: Dict[str, Any] = {}
+            if state.get("suppressed"):
+                fields["suppressed"] = True
+            if state.get("aiReview"):
+                fields["result.aiReview"] = state["aiReview"]
+            if fields:
+                updates.append(
+                    UpdateOne(
+                        {"scan_id": scan_id, "fingerprint": fingerprint},
+                        {"$set": fields},
+                    )
+                )
+
+        if updates:
+            self.findings_collection.bulk_write(updates, ordered=False)
+
+    def get_finding(self, scan_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+        """
+        SARIF result of a single finding, without loading the rest of the scan.
+        """
+        finding = self.findings_collection.find_one(
+            {"scan_id": ObjectId(scan_id), "fingerprint": fingerprint}
+        )
+        if finding:
+            return self._result_from_finding(finding)
+
+        embedded: List[Dict[str, Any]] = self._get_embedded_results(
+            scan_id, [fingerprint]
+        )
+        return embedded[0] if embedded else None
+
+    def find_findings(
+        self,
+        scan_id: str,
+        rule_id: Optional[str] = None,
+        file: Optional[str] = None,
+        suppressed: Optional[bool] = None,
+        offset: int = 0,
+        limit: int = 100,
+        index_only: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Findings of a scan for a rule and/or file in SARIF order, read from
+        the findings index without loading the rest of the scan. With
+        index_only, only fingerprint, seq, rule_id, file and suppressed are
+        returned instead of the SARIF results.
+        """
+        query: Dict[str, Any] = {"scan_id": ObjectId(scan_id)}
+        if rule_id:
+            query["rule_id"] = rule_id
+        if file:
+            query["file"] = file
+        if suppressed is not None:
+            query["suppressed"] = suppressed
+
+        projection: Optional[Dict[str, int]] = (
+            {
+                "_id": 0,
+                "fingerprint": 1,
+                "seq": 1,
+                "rule_id": 1,
+                "file": 1,
+                "suppressed": 1,
+            }
+            if index_only
+            else None
+        )
+        cursor = (
+            self.findings_collection.find(query, projection)
+            .sort("seq", ASCENDING)
+            .skip(offset)
+            .limit(limit)
+        )
+
+        return {
+            "findings": (
+                list(cursor)
+                if index_only
+                else [self._result_from_finding(finding) for finding in cursor]
+            ),
+            "total": self.findings_collection.count_documents(query),
+        }
+
+    def get_review_fingerprints(
+        self, scan_id: str, filters: ReviewFilters
+    ) -> List[str]:
+        """
+        Fingerprints of the findings of a scan to review, in SARIF order.
+        Only the fingerprints are read so no cursor is held open while the
+        reviews run.
+        """
+        query: Dict[str, Any] = {"scan_id": ObjectId(scan_id)}
+        if filters.rule_id:
+            query["rule_id"] = filters.rule_id
+        if filters.file:
+            query["file"] = filters.file
+        if not filters.include_suppressed:
+            query["suppressed"] = False
+        if not filters.include_reviewed:
+            query["result.aiReview"] = {"$exists": False}
+
+        return [
+            finding["fingerprint"]
+            for finding in self.findings_collection.find(
+                query, {"_id": 0, "fingerprint": 1}
+            ).sort("seq", ASCENDING)
+        ]
+
+    def scan_exists(self, scan_id: str) -> bool:
+        return (
+            self.scan_result_collection.count_documents(
+                {"_id": ObjectId(scan_id)}, limit=1
+            )
+            > 0
+        )
+
+    def set_finding_suppressed(
+        self, scan_id: str, fingerprint: str, suppress: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically set the suppressed state of one finding and return it.
+        """
+        query: Dict[str, Any] = {
+            "scan_id": ObjectId(scan_id),
+            "fingerprint": fingerprint,
+        }
+        finding = self.findings_collection.find_one_and_update(
+            {**query, "suppressed": {"$ne": suppress}},
+            {"$set": {"suppressed": suppress}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if finding:
+            self._inc_suppressed_count(scan_id, 1 if suppress else -1)
+            return self._result_from_finding(finding)
+
+        # already in the requested state
+        finding = self.findings_collection.find_one(query)
+        if finding:
+            return self._result_from_finding(finding)
+
+        updated: List[Dict[str, Any]] = self._set_embedded_suppressed(
+            scan_id, [fingerprint], suppress
+        )
+        return updated[0] if updated else None
+
+    def set_findings_suppressed(
+        self, scan_id: str, fingerprints: List[str], suppress: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Set the suppressed state of many findings in one update and return them.
+        """
+        query: Dict[str, Any] = {
+            "scan_id": ObjectId(scan_id),
+            "fingerprint": {"$in": fingerprints},
+        }
+        result = self.findings_collection.update_many(
+            {**query, "suppressed": {"$ne": suppress}},
+            {"$set": {"suppressed": suppress}},
+        )
+        if result.modified_count:
+            self._inc_suppressed_count(
+                scan_id, result.modified_count if suppress else -result.modified_count
+            )
+
+        findings: List[Dict[str, Any]] = [
+            self._result_from_finding(f)
+            for f in self.findings_collection.find(query).sort("seq", ASCENDING)
+        ]
+        if findings:
+            return findings
+
+        return self._set_embedded_suppressed(scan_id, fingerprints, suppress)
+
+    def _inc_suppressed_count(self, scan_id: str, delta: int) -> None:
+        self.scan_result_collection.update_one(
+            {"_id": ObjectId(scan_id)}, {"$inc": {"stats.suppressed": delta}}
+        )
+
+    def set_finding_review(
+        self, scan_id: str, fingerprint: str, review: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Atomically store the AI review of one finding and return the finding.
+        """
+        finding = self.findings_collection.find_one_and_update(
+            {"scan_id": ObjectId(scan_id), "fingerprint": fingerprint},
+            {"$set": {"result.aiReview": review}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if finding:
+            return self._result_from_finding(finding)
+
+        updated: List[Dict[str, Any]] = self._update_embedded_results(
+            scan_id, [fingerprint], "aiReview", review
+        )
+        return updated[0] if updated else None
+
+    def _set_embedded_suppressed(
+        self, scan_id: str, fingerprints: List[str], suppress: bool
+    ) -> List[Dict[str, Any]]:
+        """
+        Set the suppressed state of results of a scan that still embeds its
+        SARIF results. Each result is only updated if its state changes, in
+        the same update as stats.suppressed.
+        """
+        if not fingerprints:
+            return []
+
+        self.scan_result_collection.bulk_write(
+            [
+                UpdateOne(
+                    {
+                        "_id": ObjectId(scan_id),
+                        "scan_result.runs.results": {
+                            "$elemMatch": {
+                                "fingerprints.paladin": fingerprint,
+                                # results that were never suppressed lack the field
+                                "suppressed": {"$ne": True} if suppress else True,
+                            }
+                        },
+                    },
+                    {
+                        "$set": {
+                            "scan_result.runs.$[].results.$[result].suppressed": (
+                                suppress
+                            )
+                        },
+                        "$inc": {"stats.suppressed": 1 if suppress else -1},
+                    },
+                    array_filters=[{"result.fingerprints.paladin": fingerprint}],
+                )
+                for fingerprint in dict.fromkeys(fingerprints)
+            ],
+            ordered=False,
+        )
+        return self._get_embedded_results(scan_id, fingerprints)
+
+    def _update_embedded_results(
+        self, scan_id: str, fingerprints: List[str], field: str, value: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        Set a field on matching results of a scan that still embeds its SARIF
+        results, touching only those array elements.
+        """
+        self.scan_result_collection.update_one(
+            {"_id": ObjectId(scan_id)},
+            {"$set": {f"scan_result.runs.$[].results.$[result].{field}": value}},
+            array_filters=[{"result.fingerprints.paladin": {"$in": fingerprints}}],
+        )
+        return self._get_embedded_results(scan_id, fingerprints)
+
+    def _get_embedded_results(
+        self, scan_id: str, fingerprints: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Matching results of a scan that still embeds its SARIF results,
+        filtered on the server.
+        """
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"_id": ObjectId(scan_id)}},
+            {"$unwind": "$scan_result.runs"},
+            {"$unwind": "$scan_result.runs.results"},
+            {
+                "$match": {
+                    "scan_result.runs.results.fingerprints.paladin": {
+                        "$in": fingerprints
+                    }
+                }
+            },
+            {"$replaceWith": "$scan_result.runs.results"},
+        ]
+        return list(self.scan_result_collection.aggregate(pipeline))
+
+    def _finding_from_result(
+        self, scan_id: ObjectId, seq: int, result: Dict[str, Any]
+    ) -> Finding:
+        sarif_result: Dict[str, Any] = {
+            key: value for key, value in result.items() if key != "suppressed"
+        }
+        locations: List[Dict[str, Any]] = result.get("locations", [])
+        file: str = (
+            locations[0]
+            .get("physicalLocation", {})
+            .get("artifactLocation", {})
+            .get("uri", "")
+            if locations
+            else ""
+        )
 
-            findings_count = len(sarif["runs"][0]["results"])
-            r["findings_count"] = findings_count
-            del r["scan_result"]
+        return Finding(
+            scan_id=scan_id,
+            fingerprint=result.get("fingerprints", {}).get("paladin", ""),
+            seq=seq,
+            rule_id=result.get("ruleId", ""),
+            file=file,
+            suppressed=result.get("suppressed", False),
+            result=sarif_result,
+        )
+
+    def _result_from_finding(self, finding: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = finding["result"]
+        if finding.get("suppressed"):
+            result["suppressed"] = True
+        return result
+
+    def get_latest_scan(self, repo: str) -> Optional[Dict[str, Any]]:
+        """
+        Latest complete scan of the repo that recorded the commit it was run
+        against.
+        """
+        return self.scan_result_collection.find_one(
+            {"repo": repo, "commit": {"$ne": None}, **self.COMPLETE_SCANS},
+            sort=[("timestamp", DESCENDING)],
+        )
+
+    def get_latest_scans(self, repos: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Commit and timestamp of the latest complete scan of each repo that
+        recorded the commit it was run against.
+        """
+        pipeline: List[Dict[str, Any]] = [
+            {
+                "$match": {
+                    "repo": {"$in": repos},
+                    "commit": {"$ne": None},
+                    **self.COMPLETE_SCANS,
+                }
+            },
+            {"$sort": {"timestamp": -1}},
+            {
+                "$group": {
+                    "_id": "$repo",
+                    "commit": {"$first": "$commit"},
+                    "timestamp": {"$first": "$timestamp"},
+                }
+            },
+        ]
+        return {
+            scan["_id"]: {"commit": scan["commit"], "timestamp": scan["timestamp"]}
+            for scan in self.scan_result_collection.aggregate(pipeline)
+        }
+
+    def get_scans_from_db(
+        self, repo: str, offset: int = 0, limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Complete scans of a repo, newest first, without their SARIF.
+        """
+        query: Dict[str, Any] = {"repo": unquote(repo), **self.COMPLETE_SCANS}
+
+        scans: List[Dict[str, Any]] = list(
+            self.scan_result_collection.find(query, {"scan_result": 0})
+            .sort([("timestamp", DESCENDING), ("_id", DESCENDING)])
+            .skip(offset)
+            .limit(limit)
+        )
+        for scan in scans:
+            scan["_id"] = str(scan["_id"])
+            if scan.get("cached_from"):
+                scan["cached_from"] = str(scan["cached_from"])
+
+        return {
+            "scans": scans,
+            "total": self.scan_result_collection.count_documents(query),
+        }
 
-        return results
+    def get_sarif_by_id(self, id: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the full SARIF of a scan from its header and findings.
+        """
+        scan = self.scan_result_collection.find_one({"_id": ObjectId(id)})
+        if not scan:
+            return None
+
+        sarif: Dict[str, Any] = scan["scan_result"]
+        runs: List[Dict[str, Any]] = sarif.setdefault("runs", [{}])
+        runs[0]["results"] = list(self.iter_scan_results(scan))
 
-    def get_sarif_by_id(self, id: str) -> Dict[str, Any]:
-        sarif = self.scan_result_collection.find_one({"_id": ObjectId(id)})
-        return sarif["scan_result"]  # type: ignore
+        return sarif
 
     def delete_scan_by_id(self, id: str) -> bool:
         result: DeleteResult = self.scan_result_collection.delete_one(
             {"_id": ObjectId(id)}
         )
+        self.findings_collection.delete_many({"scan_id": ObjectId(id)})
         return result.deleted_count > 0
 
-    def update_scan_by_id(self, id: str, sarif: Dict[str, Any]) -> None:
-        self.scan_result_collection.update_one(
-            {"_id": ObjectId(id)}, {"$set": {"scan_result": sarif}}
+    def delete_incomplete_scans(self, job_ids: List[ObjectId], before: datetime) -> int:
+        """
+        Delete the scans the jobs left incomplete that were created before
+        `before`, with their findings. Returns the number deleted.
+        """
+        scan_ids: List[ObjectId] = self.scan_result_collection.distinct(
+            "_id",
+            {
+                "job_id": {"$in": job_ids},
+                "complete": False,
+                "_id": {"$lt": ObjectId.from_datetime(before)},
+            },
         )
+        for scan_id in scan_ids:
+            self.delete_scan_by_id(str(scan_id))
+        return len(scan_ids)
 
     def add_job_to_db(self, job: JobResponse) -> ObjectId:
         job_dict: Dict[str, Any] = job.to_dict()
@@ -117,17 +943,477 @@ class MongoUtils:
             },
         )
 
+    def update_job_metrics(self, job_id: ObjectId, metrics: Dict[str, Any]) -> None:
+        self.jobs_collection.update_one(
+            {"_id": job_id},
+            {"$set": {f"metrics.{key}": value for key, value in metrics.items()}},
+        )
+
+    def update_job_progress(self, job_id: ObjectId, processed: int, total: int) -> None:
+        self.jobs_collection.update_one(
+            {"_id": job_id}, {"$set": {"processed": processed, "total": total}}
+        )
+
     def get_job_by_id(self, job_id: str) -> Optional[JobResponse]:
         res = self.jobs_collection.find_one({"_id": ObjectId(job_id)})
         if not res:
             return None
 
         res["status"] = JobStatus(res["status"])
+        res["job_type"] = JobType(res.get("job_type", JobType.SCAN.value))
         return JobResponse(**res)
 
-    def upsert_vuln_report_to_db(self, report: VulnReport):
-        self.vuln_reports_collection.update_one(
-            {"ghsa": report.ghsa},
-            {"$set": asdict(report)},
+    def claim_next_scan_job(
+        self, worker: str, max_auto_running: Optional[int] = None
+    ) -> Optional[JobResponse]:
+        """
+        Atomically move the next pending scan job to RUNNING and assign it to
+        the given worker. Scans queued by users go first, oldest first; auto
+        scans go highest priority first while fewer than max_auto_running
+        are running. Returns None when there is nothing to claim.
+        """
+        job: Optional[JobResponse] = self._claim_scan_job(
+            worker, {"auto": {"$ne": True}}, [("created_at", ASCENDING)]
+        )
+        if job:
+            return job
+
+        # a soft cap, workers claiming at the same time can both get under it
+        if max_auto_running is not None and (
+            self.jobs_collection.count_documents(
+                {
+                    "job_type": JobType.SCAN.value,
+                    "status": JobStatus.RUNNING.value,
+                    "auto": True,
+                }
+            )
+            >= max_auto_running
+        ):
+            return None
+
+        return self._claim_scan_job(
+            worker,
+            {"auto": True},
+            [("priority", DESCENDING), ("created_at", ASCENDING)],
+        )
+
+    def _claim_scan_job(
+        self, worker: str, query: Dict[str, Any], sort: List[Tuple[str, int]]
+    ) -> Optional[JobResponse]:
+        now: datetime = datetime.now(timezone.utc)
+        res = self.jobs_collection.find_one_and_update(
+            {
+                "status": JobStatus.PENDING.value,
+                "job_type": JobType.SCAN.value,
+                **query,
+            },
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING.value,
+                    "worker": worker,
+                    "heartbeat_at": now,
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=sort,
+            return_document=ReturnDocument.AFTER,
+        )
+        if not res:
+            return None
+
+        res["status"] = JobStatus(res["status"])
+        res["job_type"] = JobType(res["job_type"])
+        return JobResponse(**res)
+
+    def get_queued_scan_repos(self, repo_urls: List[str]) -> Set[str]:
+        """
+        The repos that already have a pending or running scan job.
+        """
+        return set(
+            self.jobs_collection.distinct(
+                "repo",
+                {
+                    "repo": {"$in": repo_urls},
+                    "job_type": JobType.SCAN.value,
+                    "status": {
+                        "$in": [JobStatus.PENDING.value, JobStatus.RUNNING.value]
+                    },
+                },
+            )
+        )
+
+    def enqueue_auto_scans(self, jobs: List[JobResponse]) -> int:
+        """
+        Queue auto scan jobs, at most one pending per repo. A repo that is
+        already queued keeps the higher of the two priorities.
+        Returns the number of jobs added.
+        """
+        if not jobs:
+            return 0
+
+        operations: List[UpdateOne] = []
+        for job in jobs:
+            job_dict: Dict[str, Any] = job.to_dict()
+            for key in ["_id", "priority", "repo", "status", "job_type", "auto"]:
+                job_dict.pop(key)
+
+            operations.append(
+                UpdateOne(
+                    {
+                        "repo": job.repo,
+                        "job_type": JobType.SCAN.value,
+                        "status": JobStatus.PENDING.value,
+                        "auto": True,
+                    },
+                    {"$max": {"priority": job.priority}, "$setOnInsert": job_dict},
+                    upsert=True,
+                )
+            )
+
+        result = self.jobs_collection.bulk_write(operations, ordered=False)
+        return result.upserted_count
+
+    def get_scan_queue_stats(self) -> Dict[str, int]:
+        """
+        Pending and running scan jobs, split by who queued them.
+        """
+        stats: Dict[str, int] = {}
+        for kind, auto in [("manual", {"$ne": True}), ("auto", True)]:
+            for status in [JobStatus.PENDING, JobStatus.RUNNING]:
+                stats[f"{kind}_{status.value}"] = self.jobs_collection.count_documents(
+                    {
+                        "job_type": JobType.SCAN.value,
+                        "status": status.value,
+                        "auto": auto,
+                    }
+                )
+        return stats
+
+    def heartbeat_jobs(self, job_ids: List[ObjectId]) -> None:
+        if not job_ids:
+            return
+
+        self.jobs_collection.update_many(
+            {"_id": {"$in": job_ids}, "status": JobStatus.RUNNING.value},
+            {"$set": {"heartbeat_at": datetime.now(timezone.utc)}},
+        )
+
+    def requeue_stale_jobs(self, stale_after: int, max_attempts: int) -> int:
+        """
+        Return RUNNING scan jobs whose worker stopped heartbeating to the queue.
+        Jobs that already used up max_attempts are marked as errored instead.
+        The scans those workers left incomplete are deleted.
+        """
+        now: datetime = datetime.now(timezone.utc)
+        cutoff: datetime = now - timedelta(seconds=stale_after)
+        stale_filter: Dict[str, Any] = {
+            "status": JobStatus.RUNNING.value,
+            "job_type": JobType.SCAN.value,
+            "$or": [
+                {"heartbeat_at": {"$lt": cutoff}},
+                {"heartbeat_at": None},
+            ],
+        }
+        stale_ids: List[ObjectId] = self.jobs_collection.distinct("_id", stale_filter)
+        if not stale_ids:
+            return 0
+
+        self.jobs_collection.update_many(
+            {**stale_filter, "attempts": {"$gte": max_attempts}},
+            {
+                "$set": {
+                    "status": JobStatus.ERROR.value,
+                    "error": "scan worker stopped responding",
+                    "worker": None,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            },
+        )
+        result = self.jobs_collection.update_many(
+            stale_filter,
+            {
+                "$set": {
+                    "status": JobStatus.PENDING.value,
+                    "worker": None,
+                    "updated_at": datetime.now(timezone.utc),
+                }
+            },
+        )
+
+        # jobs that heartbeated again in the meantime keep their worker
+        released: List[ObjectId] = self.jobs_collection.distinct(
+            "_id", {"_id": {"$in": stale_ids}, "worker": None}
+        )
+        self.delete_incomplete_scans(released, now)
+        return result.modified_count
+
+    def get_vuln_report_writer(
+        self,
+        batch_size: int = 500,
+        flush_interval: float = 2,
+        insert_only: Tuple[str, ...] = (),
+    ) -> BulkWriter:
+        """
+        Buffered writer that upserts VulnReports in unordered batches and
+        updates the report_groups view after each batch. Fields in
+        insert_only are only written when the report is new.
+        """
+        return BulkWriter(
+            self.vuln_reports_collection,
+            lambda report: self._vuln_report_upsert(report, insert_only),
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            on_flush=lambda reports: self.update_report_groups(
+                [report.ghsa for report in reports]
+            ),
+        )
+
+    def get_vuln_reports(self, ghsas: List[str]) -> List[Dict[str, Any]]:
+        return list(
+            self.vuln_reports_collection.find({"ghsa": {"$in": ghsas}}, {"_id": 0})
+        )
+
+    def _vuln_report_upsert(
+        self, report: VulnReport, insert_only: Tuple[str, ...] = ()
+    ) -> UpdateOne:
+        fields: Dict[str, Any] = asdict(report)
+        update: Dict[str, Any] = {
+            "$set": {
+                key: value for key, value in fields.items() if key not in insert_only
+            }
+        }
+        if insert_only:
+            update["$setOnInsert"] = {key: fields[key] for key in insert_only}
+
+        return UpdateOne({"ghsa": report.ghsa}, update, upsert=True)
+
+    def update_report_groups(self, ghsas: List[str]) -> None:
+        """
+        Recompute the report_groups entries the advisories are part of, or
+        were part of before their last write. Call after writing them.
+        """
+        keys: Set[Tuple[Optional[str], str]] = set()
+        for report in self.vuln_reports_collection.find(
+            {"ghsa": {"$in": ghsas}}, {"repo": 1, "affected.package": 1}
+        ):
+            keys.update(
+                (report.get("repo"), affected["package"])
+                for affected in report.get("affected", [])
+            )
+        # the view still has the packages an advisory no longer lists
+        for group in self.report_groups_collection.find(
+            {"findings.ghsa": {"$in": ghsas}}, {"repo": 1, "pkg": 1}
+        ):
+            keys.add((group["repo"], group["pkg"]))
+
+        pending: List[Tuple[Optional[str], str]] = list(keys)
+        for start in range(0, len(pending), self.REPORT_GROUPS_BATCH_SIZE):
+            batch = pending[start : start + self.REPORT_GROUPS_BATCH_SIZE]
+            groups: Dict[Tuple[Optional[str], str], Dict[str, Any]] = {
+                (group["repo"], group["pkg"]): group
+                for group in self._build_report_groups(
+                    {
+                        "$or": [
+                            {"repo": repo, "affected.package": pkg}
+                            for repo, pkg in batch
+                        ]
+                    }
+                )
+            }
+
+            operations: List[Any] = []
+            for repo, pkg in batch:
+                key: Dict[str, str] = {"repo_key": repo or "", "pkg_key": pkg or ""}
+                group: Optional[Dict[str, Any]] = groups.get((repo, pkg))
+                operations.append(
+                    ReplaceOne(key, group, upsert=True) if group else DeleteOne(key)
+                )
+            self.report_groups_collection.bulk_write(operations, ordered=False)
+
+    def rebuild_report_groups(self) -> None:
+        """
+        Rebuild the whole report_groups view from vuln_reports. Groups
+        written by a refresh running at the same time may be lost.
+        """
+        build: ObjectId = ObjectId()
+        operations: List[ReplaceOne] = []
+
+        for group in self._build_report_groups({}):
+            operations.append(
+                ReplaceOne(
+                    {"repo_key": group["repo_key"], "pkg_key": group["pkg_key"]},
+                    {**group, "build": build},
+                    upsert=True,
+                )
+            )
+            if len(operations) >= self.REPORT_GROUPS_BATCH_SIZE:
+                self.report_groups_collection.bulk_write(operations, ordered=False)
+                operations = []
+
+        if operations:
+            self.report_groups_collection.bulk_write(operations, ordered=False)
+
+        # groups whose packages no longer have any advisory
+        self.report_groups_collection.delete_many({"build": {"$ne": build}})
+
+    def _build_report_groups(self, match: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """
+        report_groups documents for the (repo, affected package) pairs that
+        `match` selects, computed from vuln_reports.
+        """
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": match},
+            {"$unwind": "$affected"},
+            # drop the other packages of the matched advisories
+            {"$match": match},
+            {"$sort": {"ghsa": 1}},
+            {
+                "$group": {
+                    "_id": {"repo": "$repo", "pkg": "$affected.package"},
+                    "findings": {
+                        "$push": {
+                            "ghsa": "$ghsa",
+                            "cve": "$cve",
+                            "cwes": "$cwes",
+                            "forks": "$forks",
+                            "stars": "$stars",
+                            "title": "$title",
+                            "cvss_score": "$cvss_score",
+                            "cvss_vector": "$cvss_vector",
+                            "severity": "$severity",
+                            "ecosystem": "$affected.ecosystem",
+                            "vulnerable_version_range": (
+                                "$affected.vulnerable_version_range"
+                            ),
+                            "first_patched_version": "$affected.first_patched_version",
+                        }
+                    },
+                }
+            },
+        ]
+
+        for group in self.vuln_reports_collection.aggregate(
+            pipeline, allowDiskUse=True
+        ):
+            repo: Optional[str] = group["_id"].get("repo")
+            pkg: str = group["_id"]["pkg"]
+            for finding in group["findings"]:
+                # the first CWE, as reports were shown before they kept them all
+                finding["cwe"] = finding["cwes"][0] if finding["cwes"] else None
+
+            yield {
+                "repo": repo,
+                "pkg": pkg,
+                "repo_key": repo or "",
+                "pkg_key": pkg or "",
+                "findings": group["findings"],
+            }
+
+    def get_refresh_state(self, source: str) -> RefreshState:
+        state: Optional[Dict[str, Any]] = self.refresh_state_collection.find_one(
+            {"_id": source}, {"_id": 0}
+        )
+        return RefreshState(source=source, **(state or {}))
+
+    def set_refresh_state(self, state: RefreshState) -> None:
+        fields: Dict[str, Any] = asdict(state)
+        del fields["source"]
+        self.refresh_state_collection.update_one(
+            {"_id": state.source}, {"$set": fields}, upsert=True
+        )
+
+    def get_advisory_hashes(self, ghsa_ids: List[str]) -> Dict[str, str]:
+        return {
+            doc["_id"]: doc["hash"]
+            for doc in self.advisory_hashes_collection.find({"_id": {"$in": ghsa_ids}})
+        }
+
+    def set_advisory_hashes(self, hashes: Dict[str, str]) -> None:
+        if not hashes:
+            return
+
+        now: int = int(datetime.now(timezone.utc).timestamp())
+        self.advisory_hashes_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": ghsa_id},
+                    {"$set": {"hash": content_hash, "updated_at": now}},
+                    upsert=True,
+                )
+                for ghsa_id, content_hash in hashes.items()
+            ],
+            ordered=False,
+        )
+
+    def get_cached_repo_infos(self, repos: List[str]) -> Dict[str, Optional[RepoInfo]]:
+        """
+        Unexpired cache entries for the repos. Repos cached as not found map
+        to None.
+        """
+        cached = self.repo_info_cache_collection.find(
+            # the TTL monitor only deletes expired entries once a minute
+            {"_id": {"$in": repos}, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        return {
+            doc["_id"]: (
+                RepoInfo(repo=doc["repo"], stars=doc["stars"], forks=doc["forks"])
+                if doc["found"]
+                else None
+            )
+            for doc in cached
+        }
+
+    def cache_repo_infos(
+        self, infos: Dict[str, Optional[RepoInfo]], ttl: int, negative_ttl: int
+    ) -> None:
+        if not infos:
+            return
+
+        now: datetime = datetime.now(timezone.utc)
+        operations: List[UpdateOne] = []
+        for repo, info in infos.items():
+            entry: Dict[str, Any] = (
+                {**asdict(info), "found": True}
+                if info
+                else {"repo": "", "stars": 0, "forks": 0, "found": False}
+            )
+            entry["expires_at"] = now + timedelta(seconds=ttl if info else negative_ttl)
+            operations.append(UpdateOne({"_id": repo}, {"$set": entry}, upsert=True))
+
+        self.repo_info_cache_collection.bulk_write(operations, ordered=False)
+
+    def get_cached_review(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Unexpired cached AI review for the key.
+        """
+        cached = self.review_cache_collection.find_one(
+            # the TTL monitor only deletes expired entries once a minute
+            {"_id": key, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        return cached["review"] if cached else None
+
+    def cache_review(
+        self, key: str, review: Dict[str, Any], model: str, ttl: int
+    ) -> None:
+        now: datetime = datetime.now(timezone.utc)
+        self.review_cache_collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "review": review,
+                    "model": model,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=ttl),
+                }
+            },
             upsert=True,
         )
+
+    def inc_cache_stats(self, name: str, hits: int, misses: int) -> None:
+        self.cache_stats_collection.update_one(
+            {"_id": name}, {"$inc": {"hits": hits, "misses": misses}}, upsert=True
+        )
+
+    def get_cache_stats(self) -> List[Dict[str, Any]]:
+        return list(self.cache_stats_collection.find())
@@ -0,0 +1,435 @@
+import argparse
+import logging
+import os
+import socket
+import sys
+import time
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from models.data_models import AffectedPackage
+from utils.config_verifier import ConfigVerifier
+from utils.mongo_utils import MongoUtils
+
+logging.basicConfig(level=logging.INFO)
+
+
+class SchemaManager:
+    """
+    Creates the indexes Paladin relies on and applies versioned data
+    migrations. They run from the CLI before gunicorn starts, app workers
+    only check that none are pending. Indexes are created idempotently and
+    migrations run under a lock, once.
+
+    Migrations must keep the data readable by the code that is already
+    deployed (the previous document shape stays readable until a later
+    migration removes it), so they can run while the app is serving.
+    """
+
+    LOCK_ID = "lock"
+    LOCK_TTL = 600  # seconds before a lock left by a dead process expires
+    LOCK_WAIT = 900  # seconds to wait for another process to finish migrating
+    BATCH_SIZE = 500
+
+    def __init__(self, mongo: MongoUtils) -> None:
+        self.mongo = mongo
+        self.migrations_collection = mongo.db.schema_migrations
+        self.owner: str = f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logging.getLogger(__name__)
+
+        # (version, description, migration) in the order they must be applied.
+        # Never renumber or remove an entry once it has shipped.
+        self.migrations: List[Tuple[int, str, Callable[[], None]]] = [
+            (
+                1,
+                "Remove duplicate advisories so ghsa can be unique",
+                self._dedupe_vuln_reports,
+            ),
+            (
+                2,
+                "Move embedded SARIF results into the findings collection",
+                self._split_embedded_scan_results,
+            ),
+            (
+                3,
+                "Store findings count and stats on every scan",
+                self._backfill_scan_stats,
+            ),
+            (
+                4,
+                "Store one document per advisory and build the report_groups view",
+                self._split_vuln_reports_by_advisory,
+            ),
+            (
+                5,
+                "Drop finding indexes replaced by ones ordered by seq",
+                self._drop_unordered_finding_indexes,
+            ),
+            (
+                6,
+                "Store job timestamps as dates",
+                self._convert_job_timestamps,
+            ),
+        ]
+
+    def get_indexes(self) -> Dict[Any, List[IndexModel]]:
+        return {
+            self.mongo.vuln_reports_collection: [
+                IndexModel([("ghsa", ASCENDING)], name="ghsa_unique", unique=True),
+                # update_report_groups reads the advisories of a group
+                IndexModel(
+                    [("repo", ASCENDING), ("affected.package", ASCENDING)],
+                    name="repo_affected_package",
+                ),
+            ],
+            self.mongo.report_groups_collection: [
+                # the sort order and cursor of /api/reports
+                IndexModel(
+                    [("repo_key", ASCENDING), ("pkg_key", ASCENDING)],
+                    name="repo_key_pkg_key_unique",
+                    unique=True,
+                ),
+                IndexModel([("findings.ghsa", ASCENDING)], name="findings_ghsa"),
+                # backs the search box
+                IndexModel(
+                    [
+                        ("pkg", TEXT),
+                        ("repo", TEXT),
+                        ("findings.title", TEXT),
+                        ("findings.cve", TEXT),
+                        ("findings.ghsa", TEXT),
+                        ("findings.cwes.id", TEXT),
+                        ("findings.cwes.title", TEXT),
+                    ],
+                    name="report_groups_text",
+                ),
+            ],
+            self.mongo.scan_result_collection: [
+                IndexModel(
+                    [("repo", ASCENDING), ("timestamp", DESCENDING)],
+                    name="repo_timestamp",
+                ),
+                IndexModel(
+                    [
+                        ("repo", ASCENDING),
+                        ("commit", ASCENDING),
+                        ("rules_hash", ASCENDING),
+                        ("config_hash", ASCENDING),
+                        ("timestamp", DESCENDING),
+                    ],
+                    name="scan_cache",
+                ),
+            ],
+            self.mongo.jobs_collection: [
+                IndexModel(
+                    [("status", ASCENDING), ("updated_at", ASCENDING)],
+                    name="status_updated_at",
+                ),
+                # claim_next_scan_job takes the oldest pending job of a type
+                IndexModel(
+                    [
+                        ("job_type", ASCENDING),
+                        ("status", ASCENDING),
+                        ("created_at", ASCENDING),
+                    ],
+                    name="job_type_status_created_at",
+                ),
+                IndexModel(
+                    [
+                        ("job_type", ASCENDING),
+                        ("status", ASCENDING),
+                        ("auto", ASCENDING),
+                        ("priority", DESCENDING),
+                        ("created_at", ASCENDING),
+                    ],
+                    name="auto_scan_queue",
+                ),
+                # get_queued_scan_repos
+                IndexModel(
+                    [
+                        ("repo", ASCENDING),
+                        ("job_type", ASCENDING),
+                        ("status", ASCENDING),
+                    ],
+                    name="repo_job_type_status",
+                ),
+            ],
+            self.mongo.repo_info_cache_collection: [
+                IndexModel(
+                    [("expires_at", ASCENDING)],
+                    name="expires_at_ttl",
+                    expireAfterSeconds=0,
+                ),
+            ],
+            self.mongo.review_cache_collection: [
+                IndexModel(
+                    [("expires_at", ASCENDING)],
+                    name="expires_at_ttl",
+                    expireAfterSeconds=0,
+                ),
+            ],
+            # not unique: scans stored before fingerprints included the file
+            # can repeat one
+            self.mongo.findings_collection: [
+                IndexModel(
+                    [("scan_id", ASCENDING), (field, ASCENDING)],
+                    name=f"scan_id_{field}",
+                )
+                for field in ["fingerprint", "seq", "suppressed"]
+            ]
+            # find_findings by rule or file, in SARIF order
+            + [
+                IndexModel(
+                    [("scan_id", ASCENDING), (field, ASCENDING), ("seq", ASCENDING)],
+                    name=f"scan_id_{field}_seq",
+                )
+                for field in ["rule_id", "file"]
+            ],
+        }
+
+    def bootstrap(self) -> None:
+        """
+        Apply pending migrations, then make sure every index exists.
+        """
+        if self.get_pending():
+            self._acquire_lock()
+            try:
+                self.migrate()
+            finally:
+                self._release_lock()
+
+        self.ensure_indexes()
+
+    def check(self) -> bool:
+        """
+        Whether every migration has been applied.
+        """
+        pending: List[int] = [version for version, _, _ in self.get_pending()]
+        if pending:
+            self.logger.error(
+                f"Schema migrations {pending} are pending, "
+                "run `python -m utils.schema migrate` first"
+            )
+        return not pending
+
+    def ensure_indexes(self) -> None:
+        for collection, indexes in self.get_indexes().items():
+            try:
+                collection.create_indexes(indexes)
+            except OperationFailure as e:
+                # an index with the same name but a different definition has
+                # to be dropped by a migration first
+                self.logger.error(f"Could not create indexes on {collection.name}: {e}")
+
+    def get_applied(self) -> Set[int]:
+        return {
+            doc["_id"]
+            for doc in self.migrations_collection.find(
+                {"_id": {"$ne": self.LOCK_ID}}, {"_id": 1}
+            )
+        }
+
+    def get_pending(self) -> List[Tuple[int, str, Callable[[], None]]]:
+        applied: Set[int] = self.get_applied()
+        return [m for m in self.migrations if m[0] not in applied]
+
+    def migrate(self) -> None:
+        """
+        Apply pending migrations in order. The caller must hold the lock.
+        """
+        for version, description, migration in self.get_pending():
+            self.logger.info(f"Applying migration {version}: {description}")
+            start: float = time.monotonic()
+
+            migration()
+
+            self.migrations_collection.insert_one(
+                {
+                    "_id": version,
+                    "description": description,
+                    "applied_at": int(time.time()),
+                    "duration": round(time.monotonic() - start, 3),
+                    "applied_by": self.owner,
+                }
+            )
+            self._refresh_lock()
+
+    def _acquire_lock(self) -> None:
+        deadline: float = time.monotonic() + self.LOCK_WAIT
+        while True:
+            now: int = int(time.time())
+            try:
+                # matches only a free or expired lock; otherwise the upsert
+                # collides with the lock held by another process
+                self.migrations_collection.update_one(
+                    {"_id": self.LOCK_ID, "expires_at": {"$lt": now}},
+                    {"$set": {"owner": self.owner, "expires_at": now + self.LOCK_TTL}},
+                    upsert=True,
+                )
+                return
+            except DuplicateKeyError:
+                pass
+
+            if time.monotonic() > deadline:
+                raise RuntimeError("Timed out waiting for the schema migration lock")
+
+            self.logger.info("Waiting for another process to finish migrating")
+            time.sleep(1)
+
+    def _refresh_lock(self) -> None:
+        self.migrations_collection.update_one(
+            {"_id": self.LOCK_ID, "owner": self.owner},
+            {"$set": {"expires_at": int(time.time()) + self.LOCK_TTL}},
+        )
+
+    def _release_lock(self) -> None:
+        self.migrations_collection.delete_one(
+            {"_id": self.LOCK_ID, "owner": self.owner}
+        )
+
+    # --- Migrations ---
+    def _dedupe_vuln_reports(self) -> None:
+        pipeline: List[Dict[str, Any]] = [
+            {"$group": {"_id": "$ghsa", "ids": {"$push": "$_id"}}},
+            {"$match": {"ids.1": {"$exists": True}}},
+        ]
+        for group in self.mongo.vuln_reports_collection.aggregate(pipeline):
+            # keep the oldest document, later upserts matched it anyway
+            duplicates: List[ObjectId] = sorted(group["ids"])[1:]
+            self.mongo.vuln_reports_collection.delete_many({"_id": {"$in": duplicates}})
+
+    def _split_embedded_scan_results(self) -> None:
+        legacy = self.mongo.scan_result_collection.find(
+            {"scan_result.runs.results.0": {"$exists": True}}, {"_id": 1}
+        )
+        for scan in legacy:
+            self._split_scan(scan["_id"])
+
+    def _split_scan(self, scan_id: ObjectId) -> None:
+        scan: Dict[str, Any] = self.mongo.scan_result_collection.find_one(
+            {"_id": scan_id}
+        )
+        envelope: Dict[str, Any] = scan["scan_result"]
+        results: List[Dict[str, Any]] = [
+            result
+            for run in envelope.get("runs", [])
+            for result in run.get("results", [])
+        ]
+
+        # findings left by an interrupted run of this migration
+        self.mongo.findings_collection.delete_many({"scan_id": scan_id})
+        for start in range(0, len(results), self.BATCH_SIZE):
+            self.mongo.add_findings(
+                scan_id, start, results[start : start + self.BATCH_SIZE]
+            )
+
+        self.mongo.finish_scan(scan_id, envelope, len(results))
+        self._refresh_lock()
+
+    def _backfill_scan_stats(self) -> None:
+        for scan in self.mongo.scan_result_collection.find(
+            {"stats": {"$exists": False}}, {"_id": 1}
+        ):
+            self.mongo.scan_result_collection.update_one(
+                {"_id": scan["_id"]},
+                {
+                    "$set": {
+                        "findings_count": self.mongo.findings_collection.count_documents(
+                            {"scan_id": scan["_id"]}
+                        ),
+                        "stats": asdict(self.mongo.compute_scan_stats(scan["_id"])),
+                    }
+                },
+            )
+        self._refresh_lock()
+
+    def _split_vuln_reports_by_advisory(self) -> None:
+        # replaced by repo_affected_package and the report_groups text index
+        for name in ["repo_package", "vuln_reports_text"]:
+            try:
+                self.mongo.vuln_reports_collection.drop_index(name)
+            except OperationFailure:
+                pass
+
+        # package, ecosystem and cwe are left for the code already deployed
+        operations: List[UpdateOne] = []
+        for report in self.mongo.vuln_reports_collection.find(
+            {"affected": {"$exists": False}}
+        ):
+            affected: List[Dict[str, Any]] = (
+                [asdict(AffectedPackage(report["ecosystem"], report["package"]))]
+                if report.get("package")
+                else []
+            )
+            operations.append(
+                UpdateOne(
+                    {"_id": report["_id"]},
+                    {
+                        "$set": {
+                            "affected": affected,
+                            "cwes": [report["cwe"]] if report.get("cwe") else [],
+                        }
+                    },
+                )
+            )
+            if len(operations) >= self.BATCH_SIZE:
+                self.mongo.vuln_reports_collection.bulk_write(operations, ordered=False)
+                operations = []
+                self._refresh_lock()
+
+        if operations:
+            self.mongo.vuln_reports_collection.bulk_write(operations, ordered=False)
+
+        # Only one package per advisory was kept, so make the next refresh or
+        # import process every advisory again to recover the others
+        self.mongo.advisory_hashes_collection.delete_many({})
+        self.mongo.refresh_state_collection.delete_one({"_id": "ghsa"})
+
+        self.mongo.rebuild_report_groups()
+        self._refresh_lock()
+
+    def _drop_unordered_finding_indexes(self) -> None:
+        for name in ["scan_id_rule_id", "scan_id_file"]:
+            try:
+                self.mongo.findings_collection.drop_index(name)
+            except OperationFailure:
+                pass
+
+    def _convert_job_timestamps(self) -> None:
+        # jobs were created with epoch seconds and updated with dates
+        for key in ["created_at", "updated_at", "heartbeat_at"]:
+            self.mongo.jobs_collection.update_many(
+                {key: {"$type": "number"}},
+                [{"$set": {key: {"$toDate": {"$multiply": [f"${key}", 1000]}}}}],
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage Paladin's MongoDB schema")
+    parser.add_argument(
+        "command",
+        choices=["migrate", "status", "rebuild-groups"],
+        help="migrate: apply pending migrations and create indexes; "
+        "status: list applied and pending migrations; "
+        "rebuild-groups: rebuild the report_groups view from vuln_reports",
+    )
+    args = parser.parse_args()
+
+    config = ConfigVerifier("config.toml").verify()
+    if not config:
+        sys.exit(1)
+
+    schema = SchemaManager(MongoUtils(config))
+    if args.command == "migrate":
+        schema.bootstrap()
+    elif args.command == "rebuild-groups":
+        schema.mongo.rebuild_report_groups()
+    else:
+        applied: Set[int] = schema.get_applied()
+        for version, description, _ in schema.migrations:
+            state: str = "applied" if version in applied else "pending"
+            print(f"{version:>4}  {state:<8} {description}")